@@ -0,0 +1 @@
+"""Benchmarks of the movie loading and production phases."""
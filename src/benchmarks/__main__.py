@@ -0,0 +1,42 @@
+"""Run the benchmarks and write the results as json."""
+import argparse
+import json
+import sys
+from typing import List
+
+from .suite import run_benchmarks
+
+
+def main(args: List[str]) -> None:
+    """Entry Function.
+
+    Args:
+        args: Command line arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Time loading and producing a movie of a synthetic trajectory."
+    )
+    parser.add_argument("--atoms", type=int, default=5000)
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-mpg", dest="mpg", action="store_false")
+    parser.add_argument("--output", default="benchmark.json")
+    parsed_args = parser.parse_args(args)
+
+    results = run_benchmarks(
+        parsed_args.atoms,
+        parsed_args.frames,
+        repeat=parsed_args.repeat,
+        workers=parsed_args.workers,
+        mpg=parsed_args.mpg,
+    )
+    with open(parsed_args.output, "w", encoding="utf-8") as output_file:
+        json.dump(results, output_file, indent=2)
+
+    for phase, seconds in results["phases"].items():
+        print(f"{phase}: {seconds['min']:.3f} s")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,141 @@
+"""Time the phases of loading and producing a movie of a synthetic trajectory."""
+import copy
+import os
+import platform
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pymol import cmd
+
+from pymol_movie.movie.loaders import ObjectLoader, index_frames
+from pymol_movie.movie.movie import MovieMaker
+
+from .synthetic import movie_config, write_trajectory
+
+PHASES = (
+    "index",
+    "load",
+    "setup_scene",
+    "produce_pse",
+    "produce_mpg",
+)
+
+
+def _run_once(
+    config: Dict[str, Any], workers: Optional[int], mpg: bool, manifest_dir: str
+) -> Dict[str, float]:
+    """Load and produce the movie of a configuration once, timing every phase.
+
+    Args:
+        config: A nested dictionary in the format of the .yaml configuration.
+        workers: Number of processes used to parse the trajectory.
+        mpg: Whether to time producing a low resolution mpg movie.
+        manifest_dir: Empty directory to store the manifest of the trajectory in, so the
+            trajectory files are listed and sorted.
+
+    Returns:
+        A dictionary of phase to seconds.
+    """
+    cmd.reinitialize()
+    timings = {}
+
+    object_dict = config["setup"]["objects"][0]
+    start = time.perf_counter()
+    index_frames(object_dict["directory"], manifest_dir)
+    timings["index"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    object_loader = ObjectLoader(
+        object_dict["directory"], object_dict["name"], workers=workers
+    )
+    object_loader.load_up_to_state(object_dict["states"])
+    timings["load"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    movie_maker = MovieMaker()
+    for scene in copy.deepcopy(config["scenes"]):
+        movie_maker.setup_scene(scene)
+    timings["setup_scene"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    movie_maker.produce_movie(copy.deepcopy(config["produce"]))
+    timings["produce_pse"] = time.perf_counter() - start
+
+    if mpg:
+        start = time.perf_counter()
+        movie_maker.produce_movie({**config["produce"], "produce": "mpg"})
+        timings["produce_mpg"] = time.perf_counter() - start
+
+    return timings
+
+
+def run_benchmarks(
+    atoms: int,
+    frames: int,
+    repeat: int = 1,
+    workers: Optional[int] = None,
+    mpg: bool = True,
+) -> Dict[str, Any]:
+    """Benchmark a synthetic trajectory of the given size.
+
+    The trajectory and the movie files are written to a temporary directory. The mpg phase is
+    skipped if ffmpeg is not installed.
+
+    Args:
+        atoms: The number of atoms of the trajectory.
+        frames: The number of frames of the trajectory and the movie.
+        repeat: The number of times every phase is timed.
+        workers: Number of processes used to parse the trajectory.
+        mpg: Whether to time producing a low resolution mpg movie.
+
+    Returns:
+        A dictionary with the benchmark parameters, the environment and the seconds of every run
+        of every phase.
+    """
+    mpg = mpg and shutil.which("ffmpeg") is not None
+    runs: Dict[str, List[float]] = {phase: [] for phase in PHASES}
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            config = movie_config(Path(directory) / "trajectory", frames)
+
+            start = time.perf_counter()
+            write_trajectory(config["setup"]["objects"][0]["directory"], atoms, frames)
+            generate = time.perf_counter() - start
+
+            for run in range(repeat):
+                manifest_dir = str(Path(directory) / "manifests" / str(run))
+                for phase, seconds in _run_once(
+                    config, workers, mpg, manifest_dir
+                ).items():
+                    runs[phase].append(seconds)
+        finally:
+            os.chdir(cwd)
+            cmd.reinitialize()
+
+    return {
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pymol": cmd.get_version()[0],
+        "atoms": atoms,
+        "frames": frames,
+        "repeat": repeat,
+        "workers": workers,
+        "generate": generate,
+        "phases": {
+            phase: {
+                "min": min(seconds),
+                "mean": sum(seconds) / len(seconds),
+                "runs": seconds,
+            }
+            for phase, seconds in runs.items()
+            if seconds
+        },
+    }
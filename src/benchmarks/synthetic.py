@@ -0,0 +1,107 @@
+"""Functions for generating synthetic trajectories and movie configurations."""
+import string
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+import numpy as np
+
+RESIDUES_PER_CHAIN = 1000
+
+
+def write_trajectory(
+    directory: Union[str, Path], atoms: int, frames: int, seed: int = 0
+) -> List[Path]:
+    """Write a synthetic pdb trajectory with one file per frame.
+
+    The atoms are the alpha carbons of a random walk chain which drifts a little every frame.
+    Every 1000 residues start a new chain.
+
+    Args:
+        directory: Directory to write the trajectory files to.
+        atoms: The number of atoms of each frame.
+        frames: The number of frames.
+        seed: Seed of the random number generator.
+
+    Returns:
+        Filepaths to the trajectory files named traj_1.pdb, traj_2.pdb...
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    bonds = rng.normal(size=(atoms, 3))
+    bonds *= 3.8 / np.linalg.norm(bonds, axis=1, keepdims=True)
+    coords = np.cumsum(bonds, axis=0)
+    coords -= coords.mean(axis=0)
+
+    prefixes = [
+        f"ATOM  {(atom + 1) % 100000:5d}  CA  ALA "
+        f"{string.ascii_uppercase[atom // RESIDUES_PER_CHAIN % 26]}"
+        f"{atom % RESIDUES_PER_CHAIN + 1:4d}    "
+        for atom in range(atoms)
+    ]
+
+    files = []
+    for frame in range(1, frames + 1):
+        lines = [
+            f"{prefix}{x:8.3f}{y:8.3f}{z:8.3f}  1.00  0.00           C\n"
+            for prefix, (x, y, z) in zip(prefixes, coords.tolist())
+        ]
+        file = directory / f"traj_{frame}.pdb"
+        file.write_text("".join(lines) + "END\n", encoding="utf-8")
+        files.append(file)
+        coords += rng.normal(scale=0.1, size=coords.shape)
+
+    return files
+
+
+def movie_config(
+    directory: Union[str, Path], frames: int, name: str = "synthetic"
+) -> Dict[str, Any]:
+    """Build a movie configuration of a synthetic trajectory.
+
+    The movie has one frame per trajectory state and four scenes with camera and model actions.
+
+    Args:
+        directory: Directory containing the trajectory files.
+        frames: The number of frames of the trajectory.
+        name: Name of the object.
+
+    Returns:
+        A nested dictionary in the format of the .yaml configuration.
+    """
+    scene_frames = sorted({1 + (frames - 1) * scene // 3 for scene in range(4)})
+    actions = [
+        {"representation": {"selection": "all", "representation": "cartoon"}},
+        {"color": {"selection": "chain A", "color": "red"}},
+        {"representation": {"selection": "all", "representation": "sticks"}},
+        {"color": {"selection": "all", "color": "green"}},
+    ]
+    scenes = [
+        {
+            "scene": scene + 1,
+            "frame": frame,
+            "objects": [
+                {"name": name, "state": frame, "actions": [actions[scene % 4]]}
+            ],
+            "camera": [{"turn": {"axis": "y", "angle": 30}}],
+        }
+        for scene, frame in enumerate(scene_frames)
+    ]
+
+    return {
+        "setup": {
+            "objects": [{"name": name, "directory": str(directory), "states": frames}]
+        },
+        "produce": {
+            "filename": name,
+            "mode": "normal",
+            "width": 160,
+            "height": 120,
+            "framerate": 30,
+            "quality": 50,
+            "frames": frames,
+            "produce": "pse",
+        },
+        "scenes": scenes,
+    }
@@ -1,29 +1,105 @@
 """Program entry point."""
+import argparse
 import sys
-from typing import cast
+import time
 
-from .cli import parsers
-from .movie import loaders, movie
+from .cli import batch, commands, compiler, daemon, parsers
+from .movie import movie, planning
+from .movie.cpus import available_cpus
+from .movie.profiling import Profiler
 
 
 def main() -> None:
     """Entry Function."""
     args = parsers.parse_args(sys.argv[1:])
+    if args.command == "batch":
+        sys.exit(batch.run(args))
+    if args.command in ("serve", "submit", "stop"):
+        sys.exit(daemon.run(args))
+    if args.command != "render":
+        sys.exit(commands.run(args))
 
-    yaml_dict: dict = cast(dict, parsers.parse_yaml(args.yaml_filepath))
+    profiler = Profiler(enabled=args.profile is not None)
+    try:
+        _render(args, profiler)
+    finally:
+        # The profile is written whichever command ran and whether or not it failed
+        if args.profile:
+            profiler.write(args.profile)
+            for phase, totals in profiler.summary().items():
+                print(
+                    f'{phase}: {totals["wall_s"]:.3f} s wall, {totals["cpu_s"]:.3f} s cpu, '
+                    f'{totals["count"]:.0f} calls'
+                )
+
+
+def _render(args: argparse.Namespace, profiler: Profiler) -> None:
+    """Render the movie, a preview or an estimate of a configuration.
+
+    Args:
+        args: Parsed command line arguments.
+        profiler: Profiler the phases are recorded with.
+    """
+    start = time.perf_counter()
+
+    with profiler.phase("compile yaml"):
+        try:
+            plan = compiler.compile_yaml(args.yaml_filepath, args.plan_cache)
+        except ValueError as error:
+            sys.exit(str(error))
+    yaml_dict = plan.config
 
     print(yaml_dict)
 
+    # Plans which states the scenes show
+    frame_states = planning.plan_config_frame_states(yaml_dict)
+    stream = planning.is_streamed(yaml_dict)
+
+    movie_maker = movie.MovieMaker(profiler, args.plan_cache)
+
     # Loads all objects
-    for pymol_object in yaml_dict["setup"]["objects"]:
-        loaders.ObjectLoader(
-            pymol_object["directory"], pymol_object["name"]
-        ).load_up_to_state(pymol_object["states"])
+    movie_maker.load_objects(yaml_dict["setup"]["objects"], frame_states, stream)
 
     # Creates scenes
-    movie_maker = movie.MovieMaker()
-    for scene in yaml_dict["scenes"]:
-        movie_maker.setup_scene(scene)
+    if frame_states:
+        movie_maker.set_frame_states(frame_states)
+    movie_maker.plan_selections(yaml_dict["scenes"])
+    for scene_plan in plan.scenes:
+        with profiler.phase(f'setup scene {scene_plan.scene_dict["scene"]}', "scene"):
+            movie_maker.setup_scene_plan(scene_plan)
+
+    stats = movie_maker.stats()
+    profiler.stats.update(stats)
+    print(
+        f'selection cache: {stats["selection_cache"]["hits"]:.0f} hits, '
+        f'{stats["selection_cache"]["hit_rate"]:.0%} hit rate'
+    )
+
+    if args.preview:
+        movie_maker.produce_preview(
+            yaml_dict["produce"], args.preview, args.preview_scale, args.refine
+        )
+        return
+
+    if args.estimate:
+        produce_dict = yaml_dict["produce"]
+        workers = (
+            args.estimate_workers or produce_dict.get("workers") or available_cpus()
+        )
+        estimate = movie_maker.estimate_movie(
+            produce_dict, args.estimate, workers, time.perf_counter() - start
+        )
+        print(estimate.format())
+        wall_s, peak_mb = (
+            (estimate.parallel_s, estimate.parallel_peak_mb)
+            if workers > 1
+            else (estimate.serial_s, estimate.serial_peak_mb)
+        )
+        if args.max_hours and wall_s > args.max_hours * 3600:
+            sys.exit(f"estimate: {wall_s / 3600:.2f} hours is over the budget.")
+        if args.max_mb and peak_mb > args.max_mb:
+            sys.exit(f"estimate: {peak_mb:.0f} MB is over the budget.")
+        return
 
     # Produce movie
     movie_maker.produce_movie(yaml_dict["produce"])
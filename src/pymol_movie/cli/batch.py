@@ -0,0 +1,197 @@
+"""Render many configurations, loading the trajectories they share once."""
+import argparse
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from ..movie import planning
+from ..movie.lazy import cmd
+from ..movie.movie import MovieMaker
+from .compiler import MoviePlan, compile_yaml
+
+
+class JobResult(NamedTuple):
+    """Result of rendering one configuration.
+
+    `load_s` is the time spent loading the objects of the job's group, which is shared by
+    every job of the group.
+    """
+
+    yaml_filepath: str
+    group: int
+    load_s: float
+    render_s: float
+    error: Optional[str] = None
+
+
+def load_key(config: Dict[str, Any]) -> Optional[str]:
+    """Get a key identifying the objects a configuration loads.
+
+    Configurations with the same key load the same trajectories and states.
+
+    Args:
+        config: Nested dictionary of a validated .yaml configuration.
+
+    Returns:
+        The key or None if the objects are streamed and can not be shared.
+    """
+    if planning.is_streamed(config):
+        return None
+
+    frame_states = planning.plan_config_frame_states(config) or {}
+    return json.dumps(
+        [
+            {
+                **object_dict,
+                "load_states": sorted(set(frame_states.get(object_dict["name"], []))),
+            }
+            for object_dict in config["setup"]["objects"]
+        ],
+        sort_keys=True,
+    )
+
+
+def group_jobs(yaml_filepaths: List[str]) -> List[List[str]]:
+    """Group configurations by the objects they load.
+
+    Args:
+        yaml_filepaths: Filepaths to the .yaml configurations.
+
+    Returns:
+        The groups of filepaths in order of their first configuration. Configurations that
+        can not be shared or compiled are in a group of their own.
+    """
+    groups: Dict[Any, List[str]] = {}
+    for yaml_filepath in yaml_filepaths:
+        try:
+            key = load_key(compile_yaml(yaml_filepath).config)
+        except (OSError, ValueError):
+            key = None
+        groups.setdefault(key or yaml_filepath, []).append(yaml_filepath)
+
+    return list(groups.values())
+
+
+def render_plan(movie_maker: MovieMaker, plan: MoviePlan) -> None:
+    """Set up the scenes of a configuration and produce its movie.
+
+    Args:
+        movie_maker: Movie maker with the objects of the configuration loaded.
+        plan: The compiled configuration.
+    """
+    if frame_states := planning.plan_config_frame_states(plan.config):
+        movie_maker.set_frame_states(frame_states)
+    movie_maker.plan_selections(plan.config["scenes"])
+    for scene_plan in plan.scenes:
+        movie_maker.setup_scene_plan(scene_plan)
+    movie_maker.produce_movie(plan.config["produce"])
+
+
+def render_group(yaml_filepaths: List[str], group: int = 0) -> List[JobResult]:
+    """Load the objects of a group of configurations once and render every configuration.
+
+    Runs in a batch worker process. Between jobs the movie maker is reset, so only the scenes,
+    views, representations and movie are set up again.
+
+    Args:
+        yaml_filepaths: Filepaths to configurations that load the same objects.
+        group: Index of the group.
+
+    Returns:
+        The result of every configuration.
+    """
+    # Worker processes are reused, so the objects of the previous group are removed
+    cmd.reinitialize()
+    start = time.perf_counter()
+    try:
+        plans = [compile_yaml(yaml_filepath) for yaml_filepath in yaml_filepaths]
+        config = plans[0].config
+        movie_maker = MovieMaker()
+        movie_maker.load_objects(
+            config["setup"]["objects"],
+            planning.plan_config_frame_states(config),
+            planning.is_streamed(config),
+        )
+        movie_maker.store_baseline()
+    except Exception as load_error:  # pylint: disable=broad-except
+        load_s = time.perf_counter() - start
+        return [
+            JobResult(yaml_filepath, group, load_s, 0.0, str(load_error))
+            for yaml_filepath in yaml_filepaths
+        ]
+    load_s = time.perf_counter() - start
+
+    results = []
+    for yaml_filepath, plan in zip(yaml_filepaths, plans):
+        start = time.perf_counter()
+        error = None
+        try:
+            render_plan(movie_maker, plan)
+        except Exception as job_error:  # pylint: disable=broad-except
+            error = str(job_error)
+        finally:
+            movie_maker.reset()
+        results.append(
+            JobResult(yaml_filepath, group, load_s, time.perf_counter() - start, error)
+        )
+
+    return results
+
+
+def render_batch(yaml_filepaths: List[str], workers: int = 1) -> List[JobResult]:
+    """Render many configurations across a pool of processes.
+
+    Configurations are grouped by the objects they load. If there are fewer groups than
+    workers, groups are split so every worker has jobs. Each part of a group is rendered by
+    one worker, which loads the trajectories of the group once.
+
+    Args:
+        yaml_filepaths: Filepaths to the .yaml configurations.
+        workers: The number of processes.
+
+    Returns:
+        The result of every configuration, in the order of the groups.
+    """
+    groups = group_jobs(yaml_filepaths)
+    parts = max(1, workers // len(groups)) if groups else 1
+    # Spawned workers start from a clean PyMol
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = [
+            executor.submit(render_group, group_filepaths[part::parts], group)
+            for group, group_filepaths in enumerate(groups)
+            for part in range(min(parts, len(group_filepaths)))
+        ]
+        return [result for future in futures for result in future.result()]
+
+
+def run(args: argparse.Namespace) -> int:
+    """Run the batch command and print a summary of every job.
+
+    Args:
+        args: Parsed command line arguments.
+
+    Returns:
+        Exit status, 1 if any job failed.
+    """
+    start = time.perf_counter()
+    results = render_batch(args.yaml_filepaths, args.workers)
+
+    status = 0
+    for result in results:
+        summary = (
+            f"{result.yaml_filepath}: group {result.group}, "
+            f"{result.render_s:.1f} s render, {result.load_s:.1f} s shared load"
+        )
+        if result.error:
+            status = 1
+            summary += f", failed: {result.error}"
+        print(summary)
+    print(
+        f"{len(results)} jobs in {len({result.group for result in results})} groups, "
+        f"{time.perf_counter() - start:.1f} s"
+    )
+
+    return status
@@ -0,0 +1,159 @@
+"""Commands that check and plan configurations without importing pymol."""
+import argparse
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..movie import planning
+from ..movie.loaders import index_frames
+from ..movie.readers import open_trajectory
+from .compiler import compile_yaml
+
+
+def resolve_objects(
+    config: Dict[str, Any]
+) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """Resolve the trajectory files of every object and check they have enough states.
+
+    Args:
+        config: Nested dictionary of a validated .yaml configuration.
+
+    Returns:
+        A dictionary of object name to its source, number of available and requested states
+        and warnings such as gaps in the frame numbers, and a list of every error found.
+    """
+    objects = {}
+    errors = []
+    for index, object_dict in enumerate(config["setup"]["objects"]):
+        path = f"setup.objects[{index}]"
+        warnings: List[str] = []
+        try:
+            if trajectory := object_dict.get("trajectory"):
+                source = trajectory
+                available = len(
+                    open_trajectory(
+                        trajectory,
+                        object_dict.get("topology"),
+                        start=object_dict.get("start"),
+                        stop=object_dict.get("stop"),
+                        stride=object_dict.get("stride"),
+                    )
+                )
+            else:
+                source = object_dict["directory"]
+                files, warnings = index_frames(source)
+                frames = slice(
+                    object_dict.get("start"),
+                    object_dict.get("stop"),
+                    object_dict.get("stride"),
+                )
+                available = len(range(len(files))[frames])
+        except (OSError, ValueError) as error:
+            errors.append(f"{path}: {error}")
+            continue
+
+        states = object_dict.get("states", available)
+        if available == 0:
+            errors.append(f"{path}: no trajectory files found in {source}")
+        elif states > available:
+            errors.append(
+                f"{path}: {states} states requested but only {available} available"
+            )
+        objects[object_dict["name"]] = {
+            "source": source,
+            "available_states": available,
+            "states": states,
+            "warnings": warnings,
+        }
+
+    return objects, errors
+
+
+def plan_config(
+    config: Dict[str, Any], objects: Dict[str, Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Plan the states every object loads and shows at each frame.
+
+    Args:
+        config: Nested dictionary of a validated .yaml configuration.
+        objects: Resolved objects returned by `resolve_objects`.
+
+    Returns:
+        A dictionary with the frames and the plan of every object.
+    """
+    planned: Optional[Dict[str, List[int]]] = planning.plan_config_frame_states(config)
+    frame_states = planned or planning.plan_frame_states(
+        config["scenes"], config["produce"]["frames"]
+    )
+    keyframes = planning.scene_keyframes(config["scenes"])
+    streamed = planning.is_streamed(config)
+
+    plan = {}
+    for object_dict in config["setup"]["objects"]:
+        name = object_dict["name"]
+        if planned and name in planned:
+            load_states = sorted(set(planned[name]))
+        else:
+            load_states = list(range(1, objects[name]["states"] + 1))
+        plan[name] = {
+            **objects[name],
+            "streamed": streamed
+            and ("window_states" in object_dict or "window_mb" in object_dict),
+            "load_states": load_states,
+            "keyframes": keyframes.get(name, []),
+            "frame_states": frame_states.get(name, []),
+        }
+
+    return {"frames": config["produce"]["frames"], "objects": plan}
+
+
+def _check(yaml_filepath: str) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """Compile a configuration and resolve its objects.
+
+    Args:
+        yaml_filepath: Filepath to the .yaml configuration.
+
+    Returns:
+        The plan of the configuration, None if it is not valid, and a list of every error.
+    """
+    try:
+        config = compile_yaml(yaml_filepath).config
+    except (OSError, ValueError) as error:
+        return None, [str(error)]
+
+    objects, errors = resolve_objects(config)
+    if errors:
+        return None, errors
+
+    return plan_config(config, objects), []
+
+
+def run(args: argparse.Namespace) -> int:
+    """Run the validate or plan command on every configuration.
+
+    Args:
+        args: Parsed command line arguments.
+
+    Returns:
+        Exit status, 1 if any configuration is not valid.
+    """
+    status = 0
+    plans = {}
+    for yaml_filepath in args.yaml_filepaths:
+        plan, errors = _check(yaml_filepath)
+        if errors:
+            status = 1
+            print(f"{yaml_filepath}: invalid")
+            for error in errors:
+                print(f"  {error}")
+        elif args.command == "validate":
+            print(f"{yaml_filepath}: ok")
+            for name, object_plan in plan["objects"].items():  # type: ignore[index]
+                for warning in object_plan["warnings"]:
+                    print(f"  warning: {name}: {warning}")
+        else:
+            plans[yaml_filepath] = plan
+
+    if args.command == "plan":
+        print(json.dumps(plans, indent=1))
+
+    return status
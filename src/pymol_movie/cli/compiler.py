@@ -0,0 +1,293 @@
+"""Functions for compiling a .yaml configuration into a validated movie plan."""
+import hashlib
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Type, Union
+
+import yaml
+
+from ..movie import actions
+from .parsers import YAML_LOADER
+
+# Bumped when the plan format changes so cached plans are not reused
+PLAN_VERSION = 1
+
+Schema = Dict[str, Tuple[Union[Type, Tuple[Type, ...]], bool]]
+
+NUMBER = (int, float)
+
+STATE_PLAN_SCHEMA: Schema = {
+    "stride": (int, False),
+    "states_per_frame": (NUMBER, False),
+}
+
+SETUP_SCHEMA: Schema = {"objects": (list, True), "state_plan": (dict, False)}
+
+OBJECT_SCHEMA: Schema = {
+    "name": (str, True),
+    "directory": (str, False),
+    "states": (int, False),
+    "workers": (int, False),
+    "cache_dir": (str, False),
+    "trajectory": (str, False),
+    "topology": (str, False),
+    "start": (int, False),
+    "stop": (int, False),
+    "stride": (int, False),
+    "window_states": (int, False),
+    "window_mb": (NUMBER, False),
+    "atoms": (str, False),
+}
+
+PRODUCE_SCHEMA: Schema = {
+    "filename": (str, False),
+    "mode": (str, False),
+    "width": (int, False),
+    "height": (int, False),
+    "framerate": (NUMBER, False),
+    "quality": (int, False),
+    "frames": (int, True),
+    "produce": (str, False),
+    "workers": (int, False),
+    "cache_dir": (str, False),
+    "cache_mb": (NUMBER, False),
+    "resume": (bool, False),
+    "camera_path": (str, False),
+    "tiles": (int, False),
+    "encoders": (int, False),
+}
+
+SCENE_SCHEMA: Schema = {
+    "scene": ((int, str), True),
+    "frame": (int, True),
+    "objects": (list, True),
+    "camera": (list, False),
+}
+
+SCENE_OBJECT_SCHEMA: Schema = {
+    "name": (str, True),
+    "state": (int, True),
+    "actions": (list, False),
+}
+
+CONFIG_SCHEMA: Schema = {
+    "setup": (dict, True),
+    "produce": (dict, True),
+    "scenes": (list, True),
+}
+
+
+class MoviePlan(NamedTuple):
+    """A validated configuration with the actions of every scene compiled.
+
+    Attributes:
+        config: Nested dictionary of the .yaml configuration.
+        scenes: The compiled scenes in order.
+    """
+
+    config: Dict[str, Any]
+    scenes: List[actions.ScenePlan]
+
+
+def _check(value: Any, schema: Schema, path: str, errors: List[str]) -> bool:
+    """Check a dictionary has the required keys and the types of its values.
+
+    Args:
+        value: The value to check.
+        schema: Dictionary of key to the allowed types and whether the key is required.
+        path: Location of the value in the configuration used in error messages.
+        errors: List the errors are appended to.
+
+    Returns:
+        True if the value is a dictionary.
+    """
+    if not isinstance(value, dict):
+        errors.append(f"{path}: expected a mapping, got {value!r}")
+        return False
+
+    for key in value.keys() - schema.keys():
+        errors.append(f'{path}: unknown key "{key}". Options: {", ".join(schema)}')
+    for key, (types, required) in schema.items():
+        if key not in value:
+            if required:
+                errors.append(f'{path}: missing required key "{key}"')
+        elif not isinstance(value[key], types) or (
+            isinstance(value[key], bool) and types is not bool
+        ):
+            errors.append(f"{path}.{key}: invalid value {value[key]!r}")
+
+    return True
+
+
+def _check_actions(
+    action_dicts: Any,
+    registry: Dict[str, actions.Action],
+    path: str,
+    errors: List[str],
+) -> None:
+    """Check actions are registered and have the details they require.
+
+    Args:
+        action_dicts: A list of dictionaries containing action information.
+        registry: The registered actions.
+        path: Location of the actions in the configuration used in error messages.
+        errors: List the errors are appended to.
+    """
+    for index, action in enumerate(action_dicts):
+        action_path = f"{path}[{index}]"
+        if not isinstance(action, dict) or len(action) != 1:
+            errors.append(f"{action_path}: expected a single action, got {action!r}")
+            continue
+
+        choice, details = next(iter(action.items()))
+        if choice not in registry:
+            errors.append(
+                f'{action_path}: the choice "{choice}" is not recognized. Options: '
+                f'{", ".join(registry)}'
+            )
+        elif not isinstance(details, dict):
+            errors.append(
+                f"{action_path}.{choice}: expected a mapping, got {details!r}"
+            )
+        else:
+            for key in registry[choice].required:
+                if key not in details:
+                    errors.append(
+                        f'{action_path}.{choice}: missing required key "{key}"'
+                    )
+
+
+def validate_config(config: Any) -> List[str]:
+    """Validate a configuration against the schema and the registered actions.
+
+    Args:
+        config: Nested dictionary of the .yaml configuration.
+
+    Returns:
+        A list of every error found. Empty if the configuration is valid.
+    """
+    errors: List[str] = []
+    if not _check(config, CONFIG_SCHEMA, "config", errors):
+        return errors
+
+    names = set()
+    setup = config.get("setup")
+    if _check(setup, SETUP_SCHEMA, "setup", errors):
+        if isinstance(setup.get("state_plan"), dict):
+            _check(setup["state_plan"], STATE_PLAN_SCHEMA, "setup.state_plan", errors)
+        for index, object_dict in enumerate(setup.get("objects") or []):
+            path = f"setup.objects[{index}]"
+            if not _check(object_dict, OBJECT_SCHEMA, path, errors):
+                continue
+            names.add(object_dict.get("name"))
+            if ("directory" in object_dict) == ("trajectory" in object_dict):
+                errors.append(f'{path}: requires one of "directory" or "trajectory"')
+            elif "directory" in object_dict and "states" not in object_dict:
+                errors.append(f'{path}: missing required key "states"')
+
+    _check(config.get("produce"), PRODUCE_SCHEMA, "produce", errors)
+
+    for index, scene_dict in enumerate(config.get("scenes") or []):
+        path = f"scenes[{index}]"
+        if not _check(scene_dict, SCENE_SCHEMA, path, errors):
+            continue
+        if isinstance(scene_dict.get("camera"), list):
+            _check_actions(
+                scene_dict["camera"], actions.CAMERA_ACTIONS, f"{path}.camera", errors
+            )
+        for object_index, object_dict in enumerate(scene_dict.get("objects") or []):
+            object_path = f"{path}.objects[{object_index}]"
+            if not _check(object_dict, SCENE_OBJECT_SCHEMA, object_path, errors):
+                continue
+            if object_dict.get("name") not in names:
+                errors.append(
+                    f'{object_path}: object "{object_dict.get("name")}" is not in setup'
+                )
+            if isinstance(object_dict.get("actions"), list):
+                _check_actions(
+                    object_dict["actions"],
+                    actions.MODEL_ACTIONS,
+                    f"{object_path}.actions",
+                    errors,
+                )
+
+    return errors
+
+
+def compile_config(config: Any) -> MoviePlan:
+    """Validate a configuration and compile the actions of every scene.
+
+    Args:
+        config: Nested dictionary of the .yaml configuration.
+
+    Returns:
+        The movie plan.
+
+    Raises:
+        ValueError: If the configuration is not valid. The message lists every error.
+    """
+    if errors := validate_config(config):
+        raise ValueError(
+            "Invalid configuration:\n" + "\n".join(f"  {error}" for error in errors)
+        )
+
+    return MoviePlan(
+        config, [actions.compile_scene(scene_dict) for scene_dict in config["scenes"]]
+    )
+
+
+def _plan_key(data: bytes) -> str:
+    """Hash the contents of a .yaml file together with the plan format and registry.
+
+    Args:
+        data: Contents of the .yaml file.
+
+    Returns:
+        A hex digest.
+    """
+    digest = hashlib.sha1(data)
+    digest.update(str(PLAN_VERSION).encode())
+    for registry in (actions.MODEL_ACTIONS, actions.CAMERA_ACTIONS):
+        for choice, action in sorted(registry.items()):
+            function = f"{action.function.__module__}.{action.function.__qualname__}"
+            digest.update(repr((choice, function, action.required)).encode())
+    return digest.hexdigest()
+
+
+def compile_yaml(yaml_filepath: str, cache_dir: Optional[str] = None) -> MoviePlan:
+    """Parse, validate and compile a .yaml configuration.
+
+    Compiled plans are cached by the hash of the file, so compiling the same file again skips
+    parsing and validation.
+
+    Args:
+        yaml_filepath: Filepath to the .yaml configuration.
+        cache_dir: Directory to cache compiled plans in. If None plans are not cached.
+
+    Returns:
+        The movie plan.
+
+    Raises:
+        ValueError: If the configuration is not valid.
+    """
+    data = Path(yaml_filepath).read_bytes()
+    plan_file = None
+    if cache_dir:
+        plan_file = Path(cache_dir) / "plans" / f"{_plan_key(data)}.pickle"
+        try:
+            with open(plan_file, "rb") as cached_plan:
+                return pickle.load(cached_plan)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            pass
+
+    plan = compile_config(yaml.load(data, YAML_LOADER))
+
+    if plan_file:
+        plan_file.parent.mkdir(parents=True, exist_ok=True)
+        plan_tmp = plan_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(plan_tmp, "wb") as cached_plan:
+            pickle.dump(plan, cached_plan)
+        os.replace(plan_tmp, plan_file)
+
+    return plan
@@ -0,0 +1,290 @@
+"""Render daemon keeping loaded objects warm between jobs submitted over a UNIX socket."""
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from ..movie import planning
+from ..movie.encoding import CODECS
+from ..movie.lazy import cmd
+from ..movie.manifest import MTIME_RESOLUTION_NS
+from ..movie.movie import MovieMaker
+from .batch import load_key, render_plan
+from .compiler import compile_config
+from .parsers import YAML_LOADER
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), f"pymol_movie-{os.getuid()}.sock")
+
+Job = Dict[str, Any]
+
+
+def source_key(config: Dict[str, Any]) -> List[list]:
+    """Get a key that changes when the trajectory files of a configuration change on disk.
+
+    Like the `FrameManifest` of a directory, the files of a directory are not stat'ed. The
+    mtime of the directory changes when files are added, removed or renamed, and files
+    rewritten in place are not detected.
+
+    Args:
+        config: Nested dictionary of a validated .yaml configuration.
+
+    Returns:
+        A list of [path, size, mtime] lists of every trajectory file, directory, archive and
+        topology.
+    """
+    key = []
+    for object_dict in config["setup"]["objects"]:
+        for path in (
+            object_dict.get("trajectory"),
+            object_dict.get("topology"),
+            object_dict.get("directory"),
+        ):
+            if path:
+                stat = os.stat(path)
+                key.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+                # Changes in the same mtime tick would not change the mtime, so paths modified
+                # this recently never match
+                if time.time_ns() - stat.st_mtime_ns < MTIME_RESOLUTION_NS:
+                    key[-1].append(time.time_ns())
+    return key
+
+
+def output_path(produce_dict: Dict[str, Any]) -> str:
+    """Get the filepath of the movie a produce block writes.
+
+    Args:
+        produce_dict: Nested dictionary containing produce movie information.
+
+    Returns:
+        The absolute filepath of the movie.
+    """
+    suffix = produce if (produce := produce_dict.get("produce")) in CODECS else "pse"
+    return os.path.abspath(f'{produce_dict["filename"]}.{suffix}')
+
+
+class RenderDaemon:
+    """Run submitted jobs one at a time against the objects loaded by the previous job.
+
+    The objects are only loaded again if a job loads different objects or states or the
+    trajectory files changed on disk. Otherwise the movie maker is reset to the loaded objects.
+
+    Attributes:
+        _jobs: Queue of submitted jobs and the queue their result is put on.
+        _key: Key of the loaded objects, None if nothing can be reused.
+        _movie_maker: Movie maker of the loaded objects.
+        _server: Server accepting jobs.
+        socket_path: Filepath of the UNIX socket.
+        jobs_run: Number of jobs run.
+        loads: Number of times objects were loaded.
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET) -> None:
+        """Initialize the instance.
+
+        Args:
+            socket_path: Filepath of the UNIX socket to listen on.
+        """
+        self._jobs: "queue.Queue[Tuple[Job, queue.Queue[Job]]]" = queue.Queue()
+        self._key: Optional[list] = None
+        self._movie_maker = MovieMaker()
+        self._server: Optional[socketserver.UnixStreamServer] = None
+        self.socket_path = socket_path
+        self.jobs_run = 0
+        self.loads = 0
+
+    def submit(self, job: Job) -> Job:
+        """Queue a job and wait for its result.
+
+        Args:
+            job: The job.
+
+        Returns:
+            The result of the job.
+        """
+        result: "queue.Queue[Job]" = queue.Queue(maxsize=1)
+        self._jobs.put((job, result))
+        return result.get()
+
+    def serve(self) -> None:
+        """Accept jobs on the socket and run them until a stop job is received.
+
+        Jobs are accepted by a background thread and run in this thread, since the pymol api
+        is not thread safe.
+        """
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            """Read a job from a connection and write its result."""
+
+            def handle(self) -> None:
+                """Handle a connection."""
+                try:
+                    job = json.loads(self.rfile.readline())
+                except ValueError as error:
+                    result: Job = {"error": f"Invalid job: {error}"}
+                else:
+                    if isinstance(job, dict):
+                        result = daemon.submit(job)
+                    else:
+                        result = {"error": "Invalid job: a job must be a JSON object"}
+                self.wfile.write(json.dumps(result).encode() + b"\n")
+
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        thread.start()
+        print(f"pymol_movie daemon listening on {self.socket_path}")
+
+        try:
+            while True:
+                job, result = self._jobs.get()
+                # A result is always put, as the connection of the job waits for it
+                try:
+                    if job.get("stop"):
+                        result.put({"stopped": True, "jobs": self.jobs_run})
+                        break
+                    result.put(self.run_job(job))
+                except Exception as error:  # pylint: disable=broad-except
+                    result.put({"error": str(error)})
+                except BaseException:
+                    result.put({"error": "The daemon stopped."})
+                    raise
+        finally:
+            self._server.shutdown()
+            while not self._jobs.empty():
+                self._jobs.get()[1].put({"error": "The daemon stopped."})
+            # Waits for the results to be written
+            self._server.server_close()
+            os.remove(self.socket_path)
+
+    def run_job(self, job: Job) -> Job:
+        """Render the movie of a job.
+
+        Args:
+            job: The job. `config` is the configuration as a dictionary or .yaml or json text
+                and `cwd` is the directory relative filepaths are resolved from.
+
+        Returns:
+            The result of the job with the `output` filepath or an `error`.
+        """
+        start = time.perf_counter()
+        try:
+            os.chdir(job.get("cwd") or os.getcwd())
+            config = job["config"]
+            if isinstance(config, str):
+                config = yaml.load(config, YAML_LOADER)
+            plan = compile_config(config)
+
+            key = [os.getcwd(), load_key(plan.config), source_key(plan.config)]
+            reloaded = key[1] is None or key != self._key
+            if reloaded:
+                self._load(plan.config)
+                self._key = key if key[1] is not None else None
+
+            try:
+                render_plan(self._movie_maker, plan)
+            finally:
+                self._movie_maker.reset()
+        except Exception as error:  # pylint: disable=broad-except
+            # The objects may be partly loaded or changed, so they are loaded again
+            self._key = None
+            return {"error": str(error)}
+        finally:
+            self.jobs_run += 1
+
+        return {
+            "output": output_path(plan.config["produce"]),
+            "reloaded": reloaded,
+            "seconds": time.perf_counter() - start,
+        }
+
+    def _load(self, config: Dict[str, Any]) -> None:
+        """Remove all objects and load the objects of a configuration.
+
+        Args:
+            config: Nested dictionary of a validated .yaml configuration.
+        """
+        cmd.reinitialize()
+        self._movie_maker = MovieMaker()
+        self._movie_maker.load_objects(
+            config["setup"]["objects"],
+            planning.plan_config_frame_states(config),
+            planning.is_streamed(config),
+        )
+        self._movie_maker.store_baseline()
+        self.loads += 1
+
+
+def send_job(job: Job, socket_path: str = DEFAULT_SOCKET) -> Job:
+    """Send a job to a daemon and wait for its result.
+
+    Args:
+        job: The job.
+        socket_path: Filepath of the UNIX socket of the daemon.
+
+    Returns:
+        The result of the job.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(json.dumps(job).encode() + b"\n")
+        with client.makefile("rb") as reply:
+            return json.loads(reply.readline())
+
+
+def submit_yaml(yaml_filepath: str, socket_path: str = DEFAULT_SOCKET) -> Job:
+    """Submit a .yaml or json configuration to a daemon and wait for its result.
+
+    Args:
+        yaml_filepath: Filepath to the configuration.
+        socket_path: Filepath of the UNIX socket of the daemon.
+
+    Returns:
+        The result of the job.
+    """
+    config = Path(yaml_filepath).read_text(encoding="utf-8")
+    return send_job({"config": config, "cwd": os.getcwd()}, socket_path)
+
+
+def run(args: argparse.Namespace) -> int:
+    """Run the serve, submit or stop command.
+
+    Args:
+        args: Parsed command line arguments.
+
+    Returns:
+        Exit status, 1 if a job failed or the daemon is not running.
+    """
+    socket_path = args.socket or DEFAULT_SOCKET
+    if args.command == "serve":
+        RenderDaemon(socket_path).serve()
+        return 0
+
+    status = 0
+    try:
+        if args.command == "stop":
+            send_job({"stop": True}, socket_path)
+            return 0
+        for yaml_filepath in args.yaml_filepaths:
+            result = submit_yaml(yaml_filepath, socket_path)
+            if error := result.get("error"):
+                status = 1
+                print(f"{yaml_filepath}: failed: {error}")
+            else:
+                print(result["output"])
+    except OSError as error:
+        print(f"The daemon is not running on {socket_path}: {error}")
+        return 1
+
+    return status
@@ -4,22 +4,126 @@ from typing import List, Optional
 
 import yaml
 
+# The C loader is much faster but only available if pyyaml was built with libyaml
+YAML_LOADER = getattr(yaml, "CLoader", yaml.Loader)
+
+
+COMMANDS = {
+    "validate": "Check configurations and their trajectory files without importing pymol.",
+    "plan": "Print the frame and state plan of configurations without importing pymol.",
+    "batch": "Render many configurations, loading the trajectories they share once.",
+    "serve": "Run a daemon rendering submitted configurations with the objects kept loaded.",
+    "submit": "Submit configurations to the daemon and wait for the movie filepaths.",
+    "stop": "Stop the daemon.",
+}
+
 
 def parse_args(args: List[str]) -> argparse.Namespace:
     """Parse args.
 
     Takes two command line arguments: Filepath to directory containing numbered pdb trajectories,
-    filepath to yaml file.
+    filepath to yaml file. If the first argument is a command, the filepaths of one or more
+    yaml files follow it.
 
     Returns:
-        A argparse namespace object.
+        A argparse namespace object with the command, "render" if none is given.
     """
-    parser = argparse.ArgumentParser()
+    if args and args[0] in COMMANDS:
+        command_parser = argparse.ArgumentParser(
+            prog=f"pymol_movie {args[0]}", description=COMMANDS[args[0]]
+        )
+        if args[0] not in ("serve", "stop"):
+            command_parser.add_argument("yaml_filepaths", nargs="+")
+        if args[0] in ("serve", "submit", "stop"):
+            command_parser.add_argument(
+                "--socket",
+                help="Filepath of the UNIX socket of the daemon. Defaults to a socket in the "
+                "temporary directory.",
+            )
+        if args[0] == "batch":
+            command_parser.add_argument(
+                "--workers",
+                type=int,
+                default=1,
+                help="Number of processes rendering groups of configurations.",
+            )
+        namespace = command_parser.parse_args(args[1:])
+        namespace.command = args[0]
+        return namespace
+
+    parser = argparse.ArgumentParser(
+        epilog="commands: "
+        + "; ".join(f"{command}: {text}" for command, text in COMMANDS.items())
+    )
 
     # parser.add_argument("directory")
     parser.add_argument("yaml_filepath")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile.json",
+        metavar="TRACE_FILEPATH",
+        help="Record the time and memory of every phase to a chrome trace json file.",
+    )
+    parser.add_argument(
+        "--plan-cache",
+        nargs="?",
+        const=".pymol_movie_cache",
+        metavar="CACHE_DIR",
+        help="Cache the compiled .yaml plan so running the same file again skips parsing.",
+    )
+
+    parser.add_argument(
+        "--preview",
+        nargs="?",
+        const=4,
+        type=int,
+        metavar="STRIDE",
+        help="Render every nth frame at a fraction of the size with cheap settings to a "
+        "<filename>_preview.mpg movie instead of producing the movie.",
+    )
+    parser.add_argument(
+        "--preview-scale",
+        type=float,
+        default=0.25,
+        help="Fraction of the width and height the preview is rendered at.",
+    )
+    parser.add_argument(
+        "--refine",
+        action="store_true",
+        help="Keep refining the preview, filling in skipped frames and then raising the "
+        "resolution.",
+    )
+    parser.add_argument(
+        "--estimate",
+        nargs="?",
+        const=8,
+        type=int,
+        metavar="SAMPLES",
+        help="Render sample frames and project the time, memory and size of the movie "
+        "instead of producing it.",
+    )
+    parser.add_argument(
+        "--estimate-workers",
+        type=int,
+        metavar="WORKERS",
+        help="Number of render workers of the estimate. Defaults to the produce workers or "
+        "the number of cpus.",
+    )
+    parser.add_argument(
+        "--max-hours",
+        type=float,
+        help="Exit with an error if the estimated wall time is longer.",
+    )
+    parser.add_argument(
+        "--max-mb",
+        type=float,
+        help="Exit with an error if the estimated peak memory is larger.",
+    )
 
-    return parser.parse_args(args)
+    namespace = parser.parse_args(args)
+    namespace.command = "render"
+    return namespace
 
 
 def parse_yaml(yaml_filepath: str) -> Optional[dict]:
@@ -29,4 +133,4 @@ def parse_yaml(yaml_filepath: str) -> Optional[dict]:
         A nested dictionary.
     """
     with open(yaml_filepath, encoding="utf-8") as yaml_file:
-        return yaml.load(yaml_file, yaml.Loader)
+        return yaml.load(yaml_file, YAML_LOADER)
@@ -0,0 +1,238 @@
+"""Registry of scene object and camera actions.
+
+Actions are looked up by the key of the action in the .yaml configuration. Custom actions can be
+added with the `register_model_action` and `register_camera_action` decorators.
+"""
+import functools
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+from .lazy import cmd
+from .selections import select
+
+ModelAction = Callable[[str, Dict[str, Any]], None]
+CameraAction = Callable[[Dict[str, Any]], None]
+
+
+class Action(NamedTuple):
+    """A registered action.
+
+    Attributes:
+        function: Function performing the action.
+        required: Keys the action details must contain.
+    """
+
+    function: Callable[..., None]
+    required: Tuple[str, ...]
+
+
+class ActionCall(NamedTuple):
+    """An action bound to its arguments.
+
+    Attributes:
+        choice: Key of the action in the .yaml configuration.
+        call: Function performing the action without arguments.
+    """
+
+    choice: str
+    call: Callable[[], None]
+
+
+class ScenePlan(NamedTuple):
+    """A scene with its actions bound to their arguments.
+
+    Attributes:
+        scene_dict: Nested dictionary containing scene information.
+        objects: Name and bound model actions of every object in the scene.
+        camera: Bound camera actions of the scene.
+    """
+
+    scene_dict: Dict[str, Any]
+    objects: List[Tuple[str, List[ActionCall]]]
+    camera: List[ActionCall]
+
+
+MODEL_ACTIONS: Dict[str, Action] = {}
+CAMERA_ACTIONS: Dict[str, Action] = {}
+
+# Settings changed by actions, which are unset when a movie maker is reset
+ACTION_SETTINGS: List[str] = ["transparency"]
+
+
+def register_model_action(
+    choice: str, required: Tuple[str, ...] = ()
+) -> Callable[[ModelAction], ModelAction]:
+    """Register a function performing a model action.
+
+    The function is called with the object name and the action details.
+
+    Args:
+        choice: Key of the action in the .yaml configuration.
+        required: Keys the action details must contain.
+
+    Returns:
+        A function decorator.
+    """
+
+    def decorator(function: ModelAction) -> ModelAction:
+        MODEL_ACTIONS[choice] = Action(function, required)
+        return function
+
+    return decorator
+
+
+def register_camera_action(
+    choice: str, required: Tuple[str, ...] = ()
+) -> Callable[[CameraAction], CameraAction]:
+    """Register a function performing a camera action.
+
+    The function is called with the action details.
+
+    Args:
+        choice: Key of the action in the .yaml configuration.
+        required: Keys the action details must contain.
+
+    Returns:
+        A function decorator.
+    """
+
+    def decorator(function: CameraAction) -> CameraAction:
+        CAMERA_ACTIONS[choice] = Action(function, required)
+        return function
+
+    return decorator
+
+
+def _not_recognized(choice: str) -> None:
+    """Report an action that is not registered.
+
+    Args:
+        choice: Key of the action in the .yaml configuration.
+    """
+    print(f'The choice "{choice}" is not recognized.')
+
+
+def compile_model_actions(name: str, action_dicts: List[dict]) -> List[ActionCall]:
+    """Bind model actions to the object and their details.
+
+    Args:
+        name: Name of the model to perform actions.
+        action_dicts: A list of dictionaries containing model action information.
+
+    Returns:
+        The bound actions in order. Actions that are not registered report so when called.
+    """
+    action_calls = []
+    for action in action_dicts:
+        choice, details = next(iter(action.items()))
+        if choice in MODEL_ACTIONS:
+            call = functools.partial(MODEL_ACTIONS[choice].function, name, details)
+        else:
+            call = functools.partial(_not_recognized, choice)
+        action_calls.append(ActionCall(choice, call))
+
+    return action_calls
+
+
+def compile_camera_actions(camera_dicts: List[dict]) -> List[ActionCall]:
+    """Bind camera actions to their details.
+
+    Args:
+        camera_dicts: A list of dictionaries containing camera action information.
+
+    Returns:
+        The bound actions in order. Actions that are not registered report so when called.
+    """
+    action_calls = []
+    for camera_action in camera_dicts:
+        choice, details = next(iter(camera_action.items()))
+        if choice in CAMERA_ACTIONS:
+            call = functools.partial(CAMERA_ACTIONS[choice].function, details)
+        else:
+            call = functools.partial(_not_recognized, choice)
+        action_calls.append(ActionCall(choice, call))
+
+    return action_calls
+
+
+def compile_scene(scene_dict: Dict[str, Any]) -> ScenePlan:
+    """Bind the object and camera actions of a scene.
+
+    Args:
+        scene_dict: Nested dictionary containing scene information.
+
+    Returns:
+        The scene plan.
+    """
+    return ScenePlan(
+        scene_dict,
+        [
+            (
+                object_dict["name"],
+                compile_model_actions(
+                    object_dict["name"], object_dict.get("actions") or []
+                ),
+            )
+            for object_dict in scene_dict["objects"]
+        ],
+        compile_camera_actions(scene_dict.get("camera") or []),
+    )
+
+
+# Camera actions
+@register_camera_action("turn", ("axis", "angle"))
+def turn(details: Dict[str, Any]) -> None:
+    """Turn the camera about an axis."""
+    cmd.turn(details["axis"], details["angle"])
+
+
+@register_camera_action("move", ("axis", "magnitude"))
+def move(details: Dict[str, Any]) -> None:
+    """Move the camera along an axis."""
+    cmd.move(details["axis"], details["magnitude"])
+
+
+@register_camera_action("zoom", ("selection",))
+def zoom(details: Dict[str, Any]) -> None:
+    """Zoom the camera on a selection."""
+    cmd.zoom(details["selection"], animate=-1)
+
+
+@register_camera_action("orient", ("selection",))
+def orient(details: Dict[str, Any]) -> None:
+    """Orient the camera on a selection."""
+    cmd.orient(details["selection"])
+
+
+# Basic model actions
+@register_model_action("color", ("selection", "color"))
+def color(name: str, details: Dict[str, Any]) -> None:
+    """Color a selection of the object."""
+    cmd.color(details["color"], select(name, details["selection"]))
+
+
+@register_model_action("representation", ("selection", "representation"))
+def representation(name: str, details: Dict[str, Any]) -> None:
+    """Show a selection of the object only as a representation."""
+    cmd.show_as(details["representation"], select(name, details["selection"]))
+
+
+@register_model_action("rotate", ("axis", "angle", "selection"))
+def rotate(name: str, details: Dict[str, Any]) -> None:
+    """Rotate a selection of the object about an axis."""
+    cmd.rotate(details["axis"], details["angle"], select(name, details["selection"]))
+
+
+@register_model_action("translate", ("vector", "selection"))
+def translate(name: str, details: Dict[str, Any]) -> None:
+    """Translate a selection of the object by a vector."""
+    cmd.translate(details["vector"], select(name, details["selection"]))
+
+
+# Presets
+@register_model_action("surface_sticks", ("selection",))
+def surface_sticks(name: str, details: Dict[str, Any]) -> None:
+    """Show a selection of the object as transparent surface and sticks."""
+    cmd.hide(selection=f"{name}")
+    cmd.show("surface", select(name, details["selection"]))
+    cmd.show("sticks", select(name, details["selection"]))
+    cmd.set("transparency", 0.5, select(name, details["selection"]))
@@ -0,0 +1,372 @@
+"""Reading compressed pdb frames and pdb frames packed in tar archives.
+
+Frames are decompressed in memory, no uncompressed copy is written to disk. These functions do
+not use the pymol api so they can run in worker processes.
+"""
+import bz2
+import gzip
+import io
+import lzma
+import os
+import queue
+import tarfile
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Union,
+)
+
+# Threads used to decompress frames, the decompressors release the GIL
+DECOMPRESS_THREADS = min(4, os.cpu_count() or 1)
+# Frames decompressed ahead of the frame being loaded
+FRAMES_AHEAD = 16
+
+
+def _open_zstd(fileobj: IO[bytes]) -> Any:
+    """Open a zstd compressed stream.
+
+    Args:
+        fileobj: The compressed stream.
+
+    Returns:
+        The decompressed stream.
+
+    Raises:
+        ValueError: If no zstd decompressor is installed.
+    """
+    try:
+        from compression import (
+            zstd,  # type: ignore # pylint: disable=import-outside-toplevel
+        )
+
+        return zstd.ZstdFile(fileobj)
+    except ImportError:
+        pass
+    try:
+        import zstandard  # type: ignore # pylint: disable=import-outside-toplevel
+    except ImportError as error:
+        raise ValueError(
+            "Reading .zst files requires the zstandard package."
+        ) from error
+    return zstandard.ZstdDecompressor().stream_reader(fileobj)
+
+
+COMPRESSIONS: Dict[str, Callable[[IO[bytes]], Any]] = {
+    ".gz": lambda fileobj: gzip.GzipFile(fileobj=fileobj),
+    ".bz2": bz2.BZ2File,
+    ".xz": lzma.LZMAFile,
+    ".zst": _open_zstd,
+}
+
+
+class ArchiveMember(NamedTuple):
+    """A pdb frame packed in a tar archive.
+
+    Has the parts of the `Path` interface used for trajectory files, so members can be used
+    in place of files.
+    """
+
+    archive: Path
+    name: str
+
+    @property
+    def parent(self) -> Path:
+        """The archive, which takes the place of the trajectory directory."""
+        return self.archive
+
+    def stat(self) -> os.stat_result:
+        """Get the status of the archive.
+
+        Returns:
+            The status of the archive.
+        """
+        return self.archive.stat()
+
+
+Frame = Union[Path, ArchiveMember]
+
+
+def _compression(name: str) -> Optional[str]:
+    """Get the compression suffix of a filename.
+
+    Args:
+        name: The filename.
+
+    Returns:
+        The compression suffix or None if the file is not compressed.
+    """
+    suffix = os.path.splitext(name)[1].lower()
+    return suffix if suffix in COMPRESSIONS else None
+
+
+def strip_compression(name: str) -> str:
+    """Remove the compression suffix of a filename.
+
+    Args:
+        name: The filename e.g. "traj_1.pdb.gz".
+
+    Returns:
+        The filename without the compression suffix e.g. "traj_1.pdb".
+    """
+    return name[: -len(suffix)] if (suffix := _compression(name)) else name
+
+
+def is_pdb_frame(name: str) -> bool:
+    """Check a filename is a pdb file, which may be compressed.
+
+    Args:
+        name: The filename.
+
+    Returns:
+        True if the file is a pdb file.
+    """
+    return strip_compression(name).lower().endswith(".pdb")
+
+
+def is_archive(path: Union[str, Path]) -> bool:
+    """Check a path is a tar archive, which may be compressed.
+
+    Args:
+        path: The path.
+
+    Returns:
+        True if the path is a tar archive file.
+    """
+    name = strip_compression(str(path)).lower()
+    return (name.endswith(".tar") or name.endswith(".tgz")) and os.path.isfile(path)
+
+
+def is_compressed_archive(path: Union[str, Path]) -> bool:
+    """Check a path is a compressed tar archive.
+
+    Args:
+        path: The path.
+
+    Returns:
+        True if the path is a tar archive file compressed as a whole.
+    """
+    return is_archive(path) and (
+        str(path).lower().endswith(".tgz") or _compression(str(path)) is not None
+    )
+
+
+def decompress(name: str, data: bytes) -> bytes:
+    """Decompress the contents of a file based on its suffix.
+
+    Args:
+        name: The filename.
+        data: The contents of the file.
+
+    Returns:
+        The decompressed contents, or the contents if the file is not compressed.
+    """
+    if (suffix := _compression(name)) is None:
+        return data
+    with COMPRESSIONS[suffix](io.BytesIO(data)) as stream:
+        return stream.read()
+
+
+@contextmanager
+def _open_tar(archive: Path) -> Iterator[tarfile.TarFile]:
+    """Open a tar archive as a stream, so it is decompressed once from start to end.
+
+    Args:
+        archive: Filepath to the tar archive.
+
+    Yields:
+        The tar archive opened for streaming.
+    """
+    suffix = ".gz" if archive.suffix.lower() == ".tgz" else _compression(archive.name)
+    with open(archive, "rb") as file:
+        stream = COMPRESSIONS[suffix](file) if suffix is not None else file
+        try:
+            with tarfile.open(fileobj=stream, mode="r|") as tar:
+                yield tar
+        finally:
+            stream.close()
+
+
+def archive_members(archive: Union[str, Path]) -> List[ArchiveMember]:
+    """List the pdb frames of a tar archive.
+
+    Args:
+        archive: Filepath to the tar archive.
+
+    Returns:
+        The pdb frames, in the order of the archive.
+    """
+    archive = Path(archive)
+    with _open_tar(archive) as tar:
+        return [
+            ArchiveMember(archive, info.name)
+            for info in tar
+            if info.isfile() and is_pdb_frame(info.name)
+        ]
+
+
+def read_frame(frame: Frame) -> bytes:
+    """Read and decompress a pdb frame.
+
+    A frame in a compressed archive is found by decompressing the archive up to the frame, use
+    `iter_frame_bytes` to read many frames of an archive.
+
+    Args:
+        frame: Filepath to a pdb file or a member of a tar archive.
+
+    Returns:
+        The contents of the pdb file.
+
+    Raises:
+        ValueError: If the frame is not found in its archive.
+    """
+    if isinstance(frame, ArchiveMember):
+        with _open_tar(frame.archive) as tar:
+            for info in tar:
+                if info.name == frame.name:
+                    return decompress(
+                        info.name, tar.extractfile(info).read()  # type: ignore[union-attr]
+                    )
+        raise ValueError(f"{frame.name} is not found in {frame.archive}.")
+
+    with open(frame, "rb") as file:
+        return decompress(frame.name, file.read())
+
+
+def map_ahead(
+    executor: Executor,
+    function: Callable[[Any], Any],
+    items: Iterable[Any],
+    ahead: int,
+) -> Iterator[Any]:
+    """Map a function over items in an executor, keeping a bounded number of results ahead.
+
+    Unlike `Executor.map` the items are not all submitted at once, so at most `ahead` results
+    are held in memory before they are consumed.
+
+    Args:
+        executor: The executor.
+        function: The function.
+        items: The items.
+        ahead: Maximum number of items submitted ahead of the consumed result.
+
+    Yields:
+        The result of each item in order.
+    """
+    pending: Deque[Future] = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) > ahead:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _stream_archive(members: Sequence[ArchiveMember], ahead: int) -> Iterator[bytes]:
+    """Read members of a tar archive in one pass.
+
+    The archive is decompressed by a background thread which keeps a bounded queue of frames
+    ahead of the consumer. Frames are yielded in the order of `members`, so frames packed out
+    of that order are held in memory until they are reached.
+
+    Args:
+        members: Members of one archive.
+        ahead: Maximum number of frames in the queue.
+
+    Yields:
+        The contents of each member.
+
+    Raises:
+        ValueError: If a member is not found in the archive.
+    """
+    archive = members[0].archive
+    positions: Dict[str, List[int]] = {}
+    for position, member in enumerate(members):
+        positions.setdefault(member.name, []).append(position)
+    frames: "queue.Queue[Any]" = queue.Queue(maxsize=ahead)
+    stop = threading.Event()
+
+    def put(item: Any) -> None:
+        while not stop.is_set():
+            try:
+                frames.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def produce() -> None:
+        try:
+            remaining = len(positions)
+            with _open_tar(archive) as tar:
+                for info in tar:
+                    if stop.is_set() or not remaining:
+                        break
+                    if info.name in positions:
+                        remaining -= 1
+                        data = tar.extractfile(info).read()  # type: ignore[union-attr]
+                        put((positions[info.name], decompress(info.name, data)))
+            put(None)
+        except Exception as error:  # pylint: disable=broad-except
+            put(error)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    buffered: Dict[int, bytes] = {}
+    try:
+        for position, member in enumerate(members):
+            while position not in buffered:
+                item = frames.get()
+                if item is None:
+                    raise ValueError(f"{member.name} is not found in {archive}.")
+                if isinstance(item, Exception):
+                    raise item
+                buffered.update((index, item[1]) for index in item[0])
+            yield buffered.pop(position)
+    finally:
+        stop.set()
+        thread.join()
+
+
+def iter_frame_bytes(
+    frames: Sequence[Frame],
+    threads: int = DECOMPRESS_THREADS,
+    ahead: int = FRAMES_AHEAD,
+) -> Iterator[bytes]:
+    """Read and decompress pdb frames in order ahead of the consumer.
+
+    Files are read and decompressed in a thread pool. Members of a tar archive are read in one
+    pass over the archive by a background thread.
+
+    Args:
+        frames: Filepaths to pdb files or members of one tar archive.
+        threads: Number of threads used to decompress files.
+        ahead: Maximum number of frames read ahead of the consumed frame.
+
+    Yields:
+        The contents of each frame.
+    """
+    if not frames:
+        return
+    if isinstance(frames[0], ArchiveMember):
+        yield from _stream_archive(frames, ahead)  # type: ignore[arg-type]
+        return
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        yield from map_ahead(executor, read_frame, frames, ahead)
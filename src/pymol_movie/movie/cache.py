@@ -0,0 +1,200 @@
+"""Binary coordinate cache for pdb trajectory directories."""
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .archives import Frame, read_frame
+from .coordinates import iter_pdb_coordinates, parse_pdb_coordinates
+
+
+class TrajectoryCache:
+    """Store the coordinates of a pdb trajectory in a memory-mapped float32 block.
+
+    The cache is kept in a subdirectory of `cache_dir` named after the trajectory directory and
+    contains a copy of the first pdb file as topology, a `coords.npy` block of shape
+    (states, atoms, 3) and an `index.json` with the name, size and mtime of every trajectory file.
+    If any of those change the cache is stale and is rebuilt.
+
+    Attributes:
+        _files: Sorted trajectory pdb files.
+        path: Directory containing the cache files.
+    """
+
+    def __init__(self, files: Sequence[Frame], cache_dir: str) -> None:
+        """Initialize the instance.
+
+        Args:
+            files: Sorted trajectory pdb files or members of a tar archive.
+            cache_dir: Directory to store caches in.
+        """
+        self._files = files
+        directory = str(files[0].parent.resolve()) if files else ""
+        self.path = Path(cache_dir) / hashlib.sha1(directory.encode()).hexdigest()[:16]
+
+    @property
+    def topology(self) -> Path:
+        """Filepath to cached topology pdb file."""
+        return self.path / "topology.pdb"
+
+    @property
+    def _coords(self) -> Path:
+        return self.path / "coords.npy"
+
+    @property
+    def _index(self) -> Path:
+        return self.path / "index.json"
+
+    def key(self) -> List[list]:
+        """Cache key made of the name, size and mtime of every trajectory file.
+
+        Returns:
+            A list of [name, size, mtime] lists.
+        """
+        key = []
+        for file in self._files:
+            stat = file.stat()
+            key.append([file.name, stat.st_size, stat.st_mtime_ns])
+        return key
+
+    def is_valid(self) -> bool:
+        """Check the cache exists and matches the trajectory files.
+
+        Returns:
+            True if the cache can be used.
+        """
+        try:
+            with open(self._index, encoding="utf-8") as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            return False
+
+        return index.get("key") == self.key() and self._coords.exists()
+
+    def build(self, workers: Optional[int] = None) -> None:
+        """Parse every trajectory file and write the cache.
+
+        Args:
+            workers: Number of processes used to parse coordinates. If None files are parsed in
+                this process.
+
+        Raises:
+            ValueError: If the trajectory files do not have the same number of atoms.
+        """
+        if self.path.exists():
+            shutil.rmtree(self.path)
+        self.path.mkdir(parents=True)
+        self.topology.write_bytes(read_frame(self._files[0]))
+
+        key = self.key()
+        atoms = len(parse_pdb_coordinates(self._files[0]))
+        coords_tmp = self.path / "coords.tmp.npy"
+        coords = np.lib.format.open_memmap(
+            coords_tmp, mode="w+", dtype=np.float32, shape=(len(self._files), atoms, 3)
+        )
+        for state, state_coords in enumerate(
+            iter_pdb_coordinates(self._files, workers)
+        ):
+            if len(state_coords) != atoms:
+                raise ValueError(
+                    f"{self._files[state]} has {len(state_coords)} atoms, expected {atoms}."
+                )
+            coords[state] = state_coords
+        coords.flush()
+        del coords
+        os.replace(coords_tmp, self._coords)
+
+        with open(self._index, "w", encoding="utf-8") as index_file:
+            json.dump({"key": key}, index_file)
+
+    def coordinates(self) -> np.ndarray:
+        """Memory-map the cached coordinates.
+
+        Returns:
+            A read only float32 array of shape (states, atoms, 3).
+        """
+        return np.load(self._coords, mmap_mode="r")
+
+
+class FrameCache:
+    """Store rendered movie frames as png files named after their fingerprint.
+
+    Frames are evicted least recently used first once the cache is larger than `max_mb`.
+    Reading a frame updates its modification time, which is used as the time of last use.
+
+    Attributes:
+        path: Directory containing the cached frames.
+        max_bytes: Maximum size of the cache.
+        hits: Number of frames read from the cache.
+        misses: Number of frames not found in the cache.
+    """
+
+    def __init__(self, cache_dir: str, max_mb: Optional[float] = None) -> None:
+        """Initialize the instance.
+
+        Args:
+            cache_dir: Directory to store caches in.
+            max_mb: Maximum size of the frame cache in MB. If None frames are never evicted.
+        """
+        self.path = Path(cache_dir) / "frames"
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_mb * 1e6) if max_mb else None
+        self.hits = 0
+        self.misses = 0
+
+    def _frame(self, fingerprint: str) -> Path:
+        return self.path / f"{fingerprint}.png"
+
+    def get(self, fingerprint: str) -> Optional[bytes]:
+        """Read a cached frame.
+
+        Args:
+            fingerprint: Fingerprint of the frame.
+
+        Returns:
+            The contents of the png file of the frame or None if it is not cached.
+        """
+        frame = self._frame(fingerprint)
+        try:
+            data = frame.read_bytes()
+            os.utime(frame)
+        except OSError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return data
+
+    def put(self, fingerprint: str, data: bytes) -> None:
+        """Add a frame to the cache.
+
+        Args:
+            fingerprint: Fingerprint of the frame.
+            data: The contents of the png file of the frame.
+        """
+        frame_tmp = self.path / f"{fingerprint}.tmp"
+        frame_tmp.write_bytes(data)
+        os.replace(frame_tmp, self._frame(fingerprint))
+
+    def evict(self) -> None:
+        """Delete least recently used frames until the cache fits in `max_bytes`."""
+        if self.max_bytes is None:
+            return
+
+        frames = []
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if entry.name.endswith(".png"):
+                    stat = entry.stat()
+                    frames.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        size = sum(frame_size for _, frame_size, _ in frames)
+        for _, frame_size, frame_path in sorted(frames):
+            if size <= self.max_bytes:
+                break
+            os.remove(frame_path)
+            size -= frame_size
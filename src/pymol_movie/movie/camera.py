@@ -0,0 +1,263 @@
+"""Camera paths computed for every frame of a movie.
+
+A pymol view is 18 floats: a 3x3 rotation matrix, the camera position relative to the origin
+of rotation, the origin of rotation, the front and rear clipping planes and the orthoscopic
+flag. The views of every frame are interpolated between the scene views at once with numpy.
+"""
+import hashlib
+import os
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .lazy import cmd
+
+# "pymol" leaves the camera to the interpolation of the pymol movie
+CAMERA_PATHS = ("pymol", "linear", "ease", "spline")
+
+Keyframe = Tuple[int, Sequence[float]]
+
+
+def rotations_to_quaternions(rotations: np.ndarray) -> np.ndarray:
+    """Convert rotation matrices to unit quaternions.
+
+    The quaternion is the eigenvector of the largest eigenvalue of the symmetric matrix of
+    Bar-Itzhack, which also finds the nearest rotation of slightly skewed matrices.
+
+    Args:
+        rotations: Array of shape (n, 3, 3).
+
+    Returns:
+        Array of shape (n, 4) of (x, y, z, w) quaternions.
+    """
+    m = rotations
+    k = np.stack(
+        [
+            np.stack(
+                [
+                    m[:, 0, 0] - m[:, 1, 1] - m[:, 2, 2],
+                    m[:, 1, 0] + m[:, 0, 1],
+                    m[:, 2, 0] + m[:, 0, 2],
+                    m[:, 2, 1] - m[:, 1, 2],
+                ],
+                axis=-1,
+            ),
+            np.stack(
+                [
+                    m[:, 1, 0] + m[:, 0, 1],
+                    m[:, 1, 1] - m[:, 0, 0] - m[:, 2, 2],
+                    m[:, 2, 1] + m[:, 1, 2],
+                    m[:, 0, 2] - m[:, 2, 0],
+                ],
+                axis=-1,
+            ),
+            np.stack(
+                [
+                    m[:, 2, 0] + m[:, 0, 2],
+                    m[:, 2, 1] + m[:, 1, 2],
+                    m[:, 2, 2] - m[:, 0, 0] - m[:, 1, 1],
+                    m[:, 1, 0] - m[:, 0, 1],
+                ],
+                axis=-1,
+            ),
+            np.stack(
+                [
+                    m[:, 2, 1] - m[:, 1, 2],
+                    m[:, 0, 2] - m[:, 2, 0],
+                    m[:, 1, 0] - m[:, 0, 1],
+                    m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2],
+                ],
+                axis=-1,
+            ),
+        ],
+        axis=-2,
+    )
+    _, vectors = np.linalg.eigh(k / 3)
+    return vectors[:, :, -1]
+
+
+def quaternions_to_rotations(quaternions: np.ndarray) -> np.ndarray:
+    """Convert unit quaternions to rotation matrices.
+
+    Args:
+        quaternions: Array of shape (n, 4) of (x, y, z, w) quaternions.
+
+    Returns:
+        Array of shape (n, 3, 3).
+    """
+    x, y, z, w = quaternions.T
+    return np.stack(
+        [
+            np.stack(
+                [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)]
+            ),
+            np.stack(
+                [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)]
+            ),
+            np.stack(
+                [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)]
+            ),
+        ]
+    ).transpose(2, 0, 1)
+
+
+def slerp(start: np.ndarray, end: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """Spherically interpolate between pairs of unit quaternions.
+
+    Args:
+        start: Array of shape (n, 4) of the quaternions at t = 0.
+        end: Array of shape (n, 4) of the quaternions at t = 1.
+        t: Array of shape (n,) of the interpolation parameters.
+
+    Returns:
+        Array of shape (n, 4) of unit quaternions.
+    """
+    dot = np.sum(start * end, axis=1)
+    # q and -q are the same rotation, the shorter arc is taken
+    end = np.where(dot[:, np.newaxis] < 0, -end, end)
+    dot = np.clip(np.abs(dot), 0.0, 1.0)
+    angle = np.arccos(dot)
+    sin = np.sin(angle)
+    close = sin < 1e-6
+    safe_sin = np.where(close, 1.0, sin)
+    start_weight = np.where(close, 1 - t, np.sin((1 - t) * angle) / safe_sin)
+    end_weight = np.where(close, t, np.sin(t * angle) / safe_sin)
+    result = start_weight[:, np.newaxis] * start + end_weight[:, np.newaxis] * end
+    return result / np.linalg.norm(result, axis=1, keepdims=True)
+
+
+def camera_path(
+    keyframes: Sequence[Keyframe], frames: int, method: str = "spline"
+) -> np.ndarray:
+    """Compute the view of every frame from the views at keyframes.
+
+    The rotation is interpolated with slerp. The camera position, origin of rotation and
+    clipping planes are interpolated linearly by "linear" and "ease", or with a cubic hermite
+    spline through the keyframes by "spline", which keeps the speed of the camera continuous
+    across keyframes. "ease" slows the camera down into and out of every keyframe. Frames before
+    the first and after the last keyframe keep the view of that keyframe.
+
+    Args:
+        keyframes: The frame and view of each keyframe.
+        frames: The number of frames of the movie.
+        method: One of "linear", "ease" or "spline".
+
+    Returns:
+        A float64 array of shape (frames, 18) of the view at each frame starting at 1.
+
+    Raises:
+        ValueError: If there are no keyframes or the method is not known.
+    """
+    if method not in CAMERA_PATHS[1:]:
+        raise ValueError(
+            f'Unknown camera path "{method}". Options: {", ".join(CAMERA_PATHS[1:])}.'
+        )
+    if not keyframes:
+        raise ValueError("A camera path requires at least one keyframe.")
+
+    # A later keyframe at the same frame replaces an earlier one
+    by_frame = {frame: view for frame, view in keyframes}
+    key_frames = np.array(sorted(by_frame), dtype=np.float64)
+    key_views = np.array(
+        [by_frame[frame] for frame in sorted(by_frame)], dtype=np.float64
+    )
+    if len(key_frames) == 1:
+        return np.repeat(key_views, frames, axis=0)
+
+    frame = np.arange(1, frames + 1, dtype=np.float64)
+    span = np.clip(
+        np.searchsorted(key_frames, frame, side="right") - 1, 0, len(key_frames) - 2
+    )
+    lengths = key_frames[span + 1] - key_frames[span]
+    t = np.clip((frame - key_frames[span]) / lengths, 0.0, 1.0)
+    if method == "ease":
+        t = t * t * (3 - 2 * t)
+
+    quaternions = rotations_to_quaternions(key_views[:, :9].reshape(-1, 3, 3))
+    rotations = quaternions_to_rotations(
+        slerp(quaternions[span], quaternions[span + 1], t)
+    )
+
+    points = key_views[:, 9:17]
+    if method == "spline":
+        # Tangents are finite differences per frame, the camera is at rest at the ends
+        tangents = np.zeros_like(points)
+        tangents[1:-1] = (points[2:] - points[:-2]) / (
+            key_frames[2:] - key_frames[:-2]
+        )[:, np.newaxis]
+        t2, t3 = t * t, t * t * t
+        weights = [2 * t3 - 3 * t2 + 1, t3 - 2 * t2 + t, -2 * t3 + 3 * t2, t3 - t2]
+        interpolated = (
+            weights[0][:, np.newaxis] * points[span]
+            + (weights[1] * lengths)[:, np.newaxis] * tangents[span]
+            + weights[2][:, np.newaxis] * points[span + 1]
+            + (weights[3] * lengths)[:, np.newaxis] * tangents[span + 1]
+        )
+    else:
+        interpolated = points[span] + t[:, np.newaxis] * (
+            points[span + 1] - points[span]
+        )
+
+    orthoscopic = np.where(t < 1, key_views[span, 17], key_views[span + 1, 17])
+    return np.concatenate(
+        [rotations.reshape(-1, 9), interpolated, orthoscopic[:, np.newaxis]], axis=1
+    )
+
+
+def cached_camera_path(
+    keyframes: Sequence[Keyframe],
+    frames: int,
+    method: str = "spline",
+    cache_dir: Optional[str] = None,
+) -> np.ndarray:
+    """Compute the view of every frame, reusing a path stored in a cache directory.
+
+    Args:
+        keyframes: The frame and view of each keyframe.
+        frames: The number of frames of the movie.
+        method: One of "linear", "ease" or "spline".
+        cache_dir: Directory to store camera paths in. If None the path is not cached.
+
+    Returns:
+        A float64 array of shape (frames, 18) of the view at each frame starting at 1.
+    """
+    if cache_dir is None:
+        return camera_path(keyframes, frames, method)
+
+    digest = hashlib.sha1(f"{method}:{frames}".encode())
+    for frame, view in keyframes:
+        digest.update(np.array([frame, *view], dtype=np.float64).tobytes())
+    path = Path(cache_dir) / f"camera_{digest.hexdigest()[:16]}.npy"
+    try:
+        return np.load(path)
+    except (OSError, ValueError):
+        pass
+
+    views = camera_path(keyframes, frames, method)
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix(f".{os.getpid()}.npy")
+    np.save(partial, views)
+    os.replace(partial, path)
+    return views
+
+
+def apply_camera_path(views: np.ndarray, keyframes: Iterable[int] = ()) -> None:
+    """Store the view of every frame as a camera keyframe of the pymol movie.
+
+    The keyframes are stored without interpolating the movie, which is interpolated once at
+    the end. As every frame is a keyframe, showing any frame only looks up its view.
+
+    Args:
+        views: Array of shape (frames, 18) of the view at each frame starting at 1.
+        keyframes: Frames that already have a scene keyframe with their view, which are
+            skipped so the scene of the keyframe is kept.
+    """
+    skipped = set(keyframes)
+    view_list: List[List[float]] = views.tolist()
+    for frame, view in enumerate(view_list, start=1):
+        if frame in skipped:
+            continue
+        cmd.set_view(view)
+        cmd.mview("store", frame, freeze=1)
+    cmd.mview("reinterpolate")
@@ -0,0 +1,96 @@
+"""Manifest of completed frames for resumable renders."""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Union
+
+from .render import frame_path
+
+
+class RenderManifest:
+    """Record the frames of a render that are complete so the render can be resumed.
+
+    The manifest is a json lines file. The first line holds the hash of the movie configuration
+    and every following line the frame number and sha1 of a completed frame. Lines are appended as
+    frames are rendered, so a render that is stopped loses at most the frame being rendered.
+
+    Attributes:
+        path: Filepath to the manifest.
+        config_hash: Hash of the movie configuration.
+    """
+
+    def __init__(self, path: Union[str, Path], config_hash: str) -> None:
+        """Initialize the instance.
+
+        Args:
+            path: Filepath to the manifest.
+            config_hash: Hash of the movie configuration.
+        """
+        self.path = Path(path)
+        self.config_hash = config_hash
+
+    def completed(self, directory: Union[str, Path]) -> Dict[int, Path]:
+        """Validate the frames recorded in the manifest and rewrite it with the valid frames.
+
+        A new manifest is started if there is none.
+
+        Args:
+            directory: Directory containing the rendered frames.
+
+        Returns:
+            A dictionary of frame number to filepath of frames that match the manifest.
+
+        Raises:
+            ValueError: If the manifest was written for a different configuration.
+        """
+        records: Dict[int, str] = {}
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as manifest_file:
+                header = json.loads(manifest_file.readline() or "{}")
+                if header.get("config") != self.config_hash:
+                    raise ValueError(
+                        f"{self.path} was written for a different configuration. Delete it "
+                        "to render the movie again."
+                    )
+                for line in manifest_file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # The last line is cut short if the render stopped while writing it
+                        continue
+                    records[record["frame"]] = record["sha1"]
+
+        completed = {}
+        for frame, digest in records.items():
+            path = frame_path(directory, frame)
+            try:
+                data = path.read_bytes()
+            except OSError:
+                continue
+            if hashlib.sha1(data).hexdigest() == digest:
+                completed[frame] = path
+
+        manifest_tmp = self.path.with_suffix(".tmp")
+        with open(manifest_tmp, "w", encoding="utf-8") as manifest_file:
+            manifest_file.write(json.dumps({"config": self.config_hash}) + "\n")
+            for frame in sorted(completed):
+                manifest_file.write(
+                    json.dumps({"frame": frame, "sha1": records[frame]}) + "\n"
+                )
+        os.replace(manifest_tmp, self.path)
+
+        return completed
+
+    def add(self, frame: int, data: bytes) -> None:
+        """Record a completed frame.
+
+        Args:
+            frame: The frame number.
+            data: The contents of the png file of the frame.
+        """
+        with open(self.path, "a", encoding="utf-8") as manifest_file:
+            manifest_file.write(
+                json.dumps({"frame": frame, "sha1": hashlib.sha1(data).hexdigest()})
+                + "\n"
+            )
@@ -0,0 +1,98 @@
+"""PDB coordinate parsing functions.
+
+These functions do not use the pymol api so they can run in worker processes.
+"""
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, Optional, Sequence, Union
+
+import numpy as np
+
+from .archives import ArchiveMember, Frame, iter_frame_bytes, map_ahead, read_frame
+
+ATOM_RECORDS = (b"ATOM  ", b"HETATM")
+
+
+def parse_pdb_coordinates(
+    filepath: Union[str, Frame], atoms: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Parse atom coordinates from the first model of a pdb file.
+
+    Args:
+        filepath: Filepath to pdb file, which may be compressed, or a member of a tar archive.
+        atoms: Sorted file indices of the atoms to parse. If None every atom is parsed.
+
+    Returns:
+        A float32 array of shape (atoms, 3) in file order.
+    """
+    frame = filepath if isinstance(filepath, ArchiveMember) else Path(filepath)
+    return parse_pdb_coordinates_bytes(read_frame(frame), atoms)
+
+
+def parse_pdb_coordinates_bytes(
+    data: bytes, atoms: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Parse atom coordinates from the first model of pdb file contents.
+
+    Args:
+        data: Contents of a pdb file.
+        atoms: Sorted file indices of the atoms to parse. If None every atom is parsed.
+
+    Returns:
+        A float32 array of shape (atoms, 3) in file order.
+    """
+    # Only the coordinates of selected atoms are converted
+    selected = None
+    if atoms is not None:
+        selected = np.zeros(atoms[-1] + 1 if len(atoms) else 0, dtype=bool)
+        selected[atoms] = True
+
+    coords = []
+    atom = 0
+    for line in data.splitlines():
+        record = line[:6]
+        if record in ATOM_RECORDS:
+            if selected is None or (atom < len(selected) and selected[atom]):
+                coords.append(
+                    (float(line[30:38]), float(line[38:46]), float(line[46:54]))
+                )
+            atom += 1
+        elif record == b"ENDMDL":
+            break
+
+    return np.array(coords, dtype=np.float32).reshape(-1, 3)
+
+
+def iter_pdb_coordinates(
+    files: Sequence[Frame],
+    workers: Optional[int] = None,
+    atoms: Optional[np.ndarray] = None,
+) -> Iterator[np.ndarray]:
+    """Parse the coordinates of pdb files in order.
+
+    Args:
+        files: Pdb files to parse, which may be compressed, or members of one tar archive.
+        workers: Number of processes used to parse coordinates. If None files are parsed in
+            this process while a thread pool decompresses the next files.
+        atoms: Sorted file indices of the atoms to parse. If None every atom is parsed.
+
+    Yields:
+        Coordinates of each pdb file.
+    """
+    parse_bytes = functools.partial(parse_pdb_coordinates_bytes, atoms=atoms)
+    if workers is None:
+        yield from map(parse_bytes, iter_frame_bytes(files))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        if files and isinstance(files[0], ArchiveMember):
+            # The archive is read in one pass here and the frames are parsed in the workers
+            yield from map_ahead(
+                executor, parse_bytes, iter_frame_bytes(files), workers * 4
+            )
+            return
+
+        chunksize = max(1, len(files) // (workers * 4))
+        parse = functools.partial(parse_pdb_coordinates, atoms=atoms)
+        yield from executor.map(parse, files, chunksize=chunksize)
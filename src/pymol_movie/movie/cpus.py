@@ -0,0 +1,16 @@
+"""Number of cpus available to the worker pools."""
+import os
+
+
+def available_cpus() -> int:
+    """Get the number of cpus this process may run on.
+
+    The cpu affinity of the process is only known on Linux, other platforms fall back to the
+    number of cpus of the system.
+
+    Returns:
+        The number of cpus, at least 1.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
@@ -0,0 +1,340 @@
+"""Encode rendered frames with ffmpeg, in parallel segments."""
+import fractions
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from .cpus import available_cpus
+
+# Keyframes are this many seconds apart, segments are whole groups of pictures
+GOP_SECONDS = 2
+# Codecs only support frames with an even width and height in yuv420p
+EVEN_SIZE = ["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p"]
+# Frame rates mpeg1video can encode, other rates are refused by ffmpeg
+MPEG1_FRAMERATES = (24, 25, 30, 50, 60)
+
+
+def _mpg_arguments(quality: int) -> List[str]:
+    return ["-c:v", "mpeg1video", "-q:v", str(1 + (100 - quality) * 30 // 100)]
+
+
+def _mp4_arguments(quality: int) -> List[str]:
+    return [
+        "-c:v",
+        "libx264",
+        "-crf",
+        str(12 + (100 - quality) * 28 // 100),
+        *EVEN_SIZE,
+    ]
+
+
+def _webm_arguments(quality: int) -> List[str]:
+    return [
+        "-c:v",
+        "libvpx-vp9",
+        "-crf",
+        str(15 + (100 - quality) * 40 // 100),
+        "-b:v",
+        "0",
+        *EVEN_SIZE,
+    ]
+
+
+# Output arguments of the codec of each movie file extension
+CODECS: Dict[str, Callable[[int], List[str]]] = {
+    "mpg": _mpg_arguments,
+    "mp4": _mp4_arguments,
+    "webm": _webm_arguments,
+}
+
+
+def gop_size(produce_dict: Dict[str, Any]) -> int:
+    """Get the number of frames of a group of pictures.
+
+    Args:
+        produce_dict: Nested dictionary containing produce movie information.
+
+    Returns:
+        The number of frames from one keyframe to the next.
+    """
+    return max(1, round(produce_dict["framerate"] * GOP_SECONDS))
+
+
+def _codec(filename: str) -> Callable[[int], List[str]]:
+    """Get the output arguments function of the codec of a movie file.
+
+    Args:
+        filename: Output movie filepath.
+
+    Returns:
+        The codec of the extension of the file, `.mpg` if it is not known.
+    """
+    extension = os.path.splitext(filename)[1].lstrip(".").lower()
+    return CODECS.get(extension, _mpg_arguments)
+
+
+def output_framerate(filename: str, produce_dict: Dict[str, Any]) -> float:
+    """Get the frame rate a movie file is encoded at.
+
+    Mpg movies at a frame rate mpeg1video does not support are encoded at the lowest supported
+    rate above it, repeating frames so the movie plays as long.
+
+    Args:
+        filename: Output movie filepath.
+        produce_dict: Nested dictionary containing produce movie information.
+
+    Returns:
+        The frame rate of the movie file.
+    """
+    framerate = produce_dict["framerate"]
+    if _codec(filename) is not _mpg_arguments or framerate in MPEG1_FRAMERATES:
+        return framerate
+    return min(
+        (rate for rate in MPEG1_FRAMERATES if rate >= framerate),
+        default=MPEG1_FRAMERATES[-1],
+    )
+
+
+def output_arguments(filename: str, produce_dict: Dict[str, Any]) -> List[str]:
+    """Build the ffmpeg output arguments of the codec of a movie file.
+
+    The codec is chosen by the extension of the file, `.mpg` if it is not known.
+
+    Args:
+        filename: Output movie filepath.
+        produce_dict: Nested dictionary containing produce movie information.
+
+    Returns:
+        The ffmpeg output arguments.
+    """
+    framerate = output_framerate(filename, produce_dict)
+    return [
+        *_codec(filename)(produce_dict["quality"]),
+        *(["-r", str(framerate)] if framerate != produce_dict["framerate"] else []),
+        "-g",
+        str(gop_size({**produce_dict, "framerate": framerate})),
+        filename,
+    ]
+
+
+def split_segments(frames: int, segments: int, gop: int) -> List[range]:
+    """Split the frames of a movie into segments of whole groups of pictures.
+
+    Args:
+        frames: The number of frames of the movie.
+        segments: The maximum number of segments.
+        gop: The number of frames of a group of pictures.
+
+    Returns:
+        Non-empty contiguous ranges of frames starting at 1.
+    """
+    groups = math.ceil(frames / gop)
+    size = math.ceil(groups / max(1, min(segments, groups))) * gop
+    return [
+        range(start, min(start + size, frames + 1))
+        for start in range(1, frames + 1, size)
+    ]
+
+
+def segment_command(
+    directory: Union[str, Path],
+    filename: str,
+    produce_dict: Dict[str, Any],
+    frames: range,
+    threads: int = 0,
+) -> List[str]:
+    """Build the ffmpeg command that encodes a segment of the rendered frames.
+
+    Args:
+        directory: Directory containing rendered frames.
+        filename: Output segment filepath.
+        produce_dict: Nested dictionary containing produce movie information.
+        frames: The frames of the segment.
+        threads: Threads used by the encoder. If 0 ffmpeg chooses.
+
+    Returns:
+        The ffmpeg command line.
+    """
+    # Frames repeated to reach the output frame rate are counted by -frames:v
+    output_frames = math.ceil(
+        round(
+            len(frames)
+            * output_framerate(filename, produce_dict)
+            / produce_dict["framerate"],
+            6,
+        )
+    )
+    return [
+        "ffmpeg",
+        "-y",
+        "-v",
+        "warning",
+        "-f",
+        "image2",
+        "-framerate",
+        str(produce_dict["framerate"]),
+        "-start_number",
+        str(frames.start),
+        "-i",
+        str(Path(directory) / "frame%04d.png"),
+        "-frames:v",
+        str(output_frames),
+        "-threads",
+        str(threads),
+        *output_arguments(filename, produce_dict),
+    ]
+
+
+def concat_command(list_file: Union[str, Path], filename: str) -> List[str]:
+    """Build the ffmpeg command that joins encoded segments without encoding them again.
+
+    Args:
+        list_file: Filepath of the concat list of the segments.
+        filename: Output movie filepath.
+
+    Returns:
+        The ffmpeg command line.
+    """
+    return [
+        "ffmpeg",
+        "-y",
+        "-v",
+        "warning",
+        "-f",
+        "concat",
+        "-safe",
+        "0",
+        "-i",
+        str(list_file),
+        "-c",
+        "copy",
+        *(["-movflags", "+faststart"] if filename.endswith(".mp4") else []),
+        filename,
+    ]
+
+
+def remux_command(
+    stream: Union[str, Path], filename: str, framerate: float
+) -> List[str]:
+    """Build the ffmpeg command that puts a raw mpeg1video stream in an mpg file.
+
+    Args:
+        stream: Filepath of the raw mpeg1video stream.
+        filename: Output movie filepath.
+        framerate: Frame rate of the stream. The raw stream has no timestamps, so every frame is
+            given the timestamp of its index.
+
+    Returns:
+        The ffmpeg command line.
+    """
+    return [
+        "ffmpeg",
+        "-y",
+        "-v",
+        "warning",
+        "-f",
+        "mpegvideo",
+        "-i",
+        str(stream),
+        "-c",
+        "copy",
+        "-bsf:v",
+        f"setts=ts=N:time_base={1 / fractions.Fraction(framerate)}",
+        filename,
+    ]
+
+
+def concat_list(segments: List[Path]) -> str:
+    """Write the concat list of segment files.
+
+    Args:
+        segments: Filepaths of the segments in order.
+
+    Returns:
+        The contents of the concat list.
+    """
+    lines = []
+    for segment in segments:
+        quoted = str(segment.resolve()).replace("'", "'\\''")
+        lines.append(f"file '{quoted}'\n")
+    return "".join(lines)
+
+
+def encode_segments(
+    directory: Union[str, Path],
+    filename: str,
+    produce_dict: Dict[str, Any],
+    encoders: Optional[int] = None,
+) -> int:
+    """Encode rendered frames in segments by parallel ffmpeg processes and join them.
+
+    Every segment is a whole number of groups of pictures and starts with a keyframe, so the
+    segments are joined by copying their streams. The timestamps of every mpg segment start at
+    0, so mpg segments are encoded as raw mpeg1video streams, appended to each other and put in
+    the mpg file at once.
+
+    Args:
+        directory: Directory containing rendered frames numbered from 1.
+        filename: Output movie filepath.
+        produce_dict: Nested dictionary containing produce movie information.
+        encoders: The number of ffmpeg processes. If None one per cpu.
+
+    Returns:
+        The number of segments encoded.
+    """
+    cpus = available_cpus()
+    segments = split_segments(
+        produce_dict["frames"], encoders or cpus, gop_size(produce_dict)
+    )
+    raw = _codec(filename) is _mpg_arguments
+    extension = ".m1v" if raw else os.path.splitext(filename)[1]
+    if len(segments) == 1:
+        subprocess.run(
+            segment_command(directory, filename, produce_dict, segments[0]), check=True
+        )
+        return 1
+
+    # Encoders share the cpus instead of each starting a thread per cpu
+    threads = max(1, cpus // len(segments))
+    with tempfile.TemporaryDirectory(dir=Path(filename).parent) as segment_dir:
+        paths = [
+            Path(segment_dir) / f"segment{index:04d}{extension}"
+            for index in range(len(segments))
+        ]
+        with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+            futures = [
+                executor.submit(
+                    subprocess.run,
+                    segment_command(
+                        directory, str(path), produce_dict, frames, threads
+                    ),
+                    check=True,
+                )
+                for path, frames in zip(paths, segments)
+            ]
+            for future in futures:
+                future.result()
+
+        if raw:
+            stream = Path(segment_dir) / "segments.m1v"
+            with open(stream, "wb") as stream_file:
+                for path in paths:
+                    with open(path, "rb") as segment_file:
+                        shutil.copyfileobj(segment_file, stream_file)
+            subprocess.run(
+                remux_command(
+                    stream, filename, output_framerate(filename, produce_dict)
+                ),
+                check=True,
+            )
+        else:
+            list_file = Path(segment_dir) / "segments.txt"
+            list_file.write_text(concat_list(paths), encoding="utf-8")
+            subprocess.run(concat_command(list_file, filename), check=True)
+
+    return len(segments)
@@ -0,0 +1,179 @@
+"""Functions for estimating the cost of rendering a movie from a few sample frames."""
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set
+
+from . import render
+from .encoding import CODECS
+from .lazy import cmd
+from .profiling import peak_rss_mb
+
+
+class RenderEstimate(NamedTuple):
+    """Projected cost of producing a movie.
+
+    Times are in seconds and sizes in MB. `output_mb` is None if the size of the movie can
+    not be projected because ffmpeg is not installed.
+    """
+
+    frames: int
+    sample_frames: List[int]
+    setup_s: float
+    frame_s: float
+    frame_mb: float
+    session_s: float
+    session_mb: float
+    serial_s: float
+    serial_peak_mb: float
+    workers: int
+    parallel_s: float
+    parallel_peak_mb: float
+    output_mb: Optional[float]
+
+    def format(self) -> str:
+        """Format the estimate as a readable report.
+
+        Returns:
+            The report.
+        """
+        output = "unknown" if self.output_mb is None else f"{self.output_mb:.1f} MB"
+        return "\n".join(
+            [
+                f"estimate from {len(self.sample_frames)} of {self.frames} frames: "
+                f"{self.frame_s:.3f} s and {self.frame_mb:.2f} MB per frame",
+                f"serial: {self.serial_s:.1f} s wall, {self.serial_peak_mb:.0f} MB peak rss",
+                f"{self.workers} workers: {self.parallel_s:.1f} s wall, "
+                f"{self.parallel_peak_mb:.0f} MB peak rss",
+                f"output: {output}, rendered frames on disk: "
+                f"{self.frame_mb * self.frames:.1f} MB",
+            ]
+        )
+
+
+def sample_frames(keyframes: Iterable[int], frames: int, samples: int) -> List[int]:
+    """Choose frames spread across the scenes of a movie.
+
+    The movie is split into spans between scene keyframes and every span gets a share of the
+    samples proportional to its length, at least one. Samples are centred in equal parts of
+    their span.
+
+    Args:
+        keyframes: The frames of the scenes.
+        frames: The number of frames of the movie.
+        samples: The number of frames to sample. More are chosen if there are more spans.
+
+    Returns:
+        The sorted sample frames.
+    """
+    bounds = sorted({1, frames + 1, *(key for key in keyframes if 1 < key <= frames)})
+    chosen: Set[int] = set()
+    for start, stop in zip(bounds, bounds[1:]):
+        span = stop - start
+        count = min(span, max(1, round(samples * span / frames)))
+        chosen.update(
+            start + math.floor((part + 0.5) * span / count) for part in range(count)
+        )
+
+    return sorted(chosen)
+
+
+def _encoded_mb(frames: List[bytes], produce_dict: Dict[str, Any]) -> Optional[float]:
+    """Encode frames with ffmpeg and measure the size of the movie.
+
+    Args:
+        frames: The contents of png files of the frames.
+        produce_dict: Nested dictionary containing produce movie information.
+
+    Returns:
+        The size of the movie in MB or None if ffmpeg is not installed.
+    """
+    if not shutil.which("ffmpeg"):
+        return None
+
+    with tempfile.TemporaryDirectory() as directory:
+        extension = (
+            produce if (produce := produce_dict.get("produce")) in CODECS else "mpg"
+        )
+        filename = f"{directory}/estimate.{extension}"
+        try:
+            with render.FrameEncoder(
+                render.pipe_command(filename, produce_dict)
+            ) as encoder:
+                for frame in frames:
+                    encoder.write(frame)
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        return os.path.getsize(filename) / 1e6
+
+
+def estimate_render(
+    produce_dict: Dict[str, Any],
+    samples: List[int],
+    workers: int,
+    setup_s: float = 0.0,
+    before_frame: Optional[Callable[[int], None]] = None,
+) -> RenderEstimate:
+    """Render sample frames of the movie and project the cost of producing all frames.
+
+    The sample frames are rendered at the requested size and mode. The serial projection
+    renders every frame in this process. The parallel projection saves the session, which
+    every worker loads, renders the frames in `workers` processes that each use about as much
+    memory as this process and encodes them. Sampled frames are encoded without the frames
+    between them, so the projected movie size is an upper bound.
+
+    Args:
+        produce_dict: Nested dictionary containing produce movie information.
+        samples: The frames to render.
+        workers: The number of render processes of the parallel projection.
+        setup_s: Time spent loading objects and setting up scenes.
+        before_frame: Function called with the frame number before each frame is rendered.
+
+    Returns:
+        The projected cost of producing the movie.
+    """
+    rendered = []
+    start = time.perf_counter()
+    for frame in samples:
+        render.show_frame(frame)
+        if before_frame:
+            before_frame(frame)
+        rendered.append(render.render_frame(produce_dict))
+    frame_s = (time.perf_counter() - start) / len(samples)
+    frame_mb = sum(map(len, rendered)) / len(rendered) / 1e6
+    peak_mb = peak_rss_mb()
+
+    with tempfile.TemporaryDirectory() as directory:
+        session = Path(directory) / "session.pse"
+        start = time.perf_counter()
+        cmd.save(str(session))
+        session_s = time.perf_counter() - start
+        session_mb = session.stat().st_size / 1e6
+
+    frames = produce_dict["frames"]
+    output_mb = None
+    if (sample_mb := _encoded_mb(rendered, produce_dict)) is not None:
+        output_mb = sample_mb * frames / len(samples)
+
+    render_s = frame_s * frames
+    # Workers load the session, which takes about as long as saving it
+    parallel_s = setup_s + 2 * session_s + render_s / workers
+    return RenderEstimate(
+        frames=frames,
+        sample_frames=samples,
+        setup_s=setup_s,
+        frame_s=frame_s,
+        frame_mb=frame_mb,
+        session_s=session_s,
+        session_mb=session_mb,
+        serial_s=setup_s + render_s,
+        serial_peak_mb=peak_mb,
+        workers=workers,
+        parallel_s=parallel_s,
+        parallel_peak_mb=peak_mb * (1 + workers),
+        output_mb=output_mb,
+    )
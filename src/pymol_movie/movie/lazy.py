@@ -0,0 +1,43 @@
+"""Lazy import of the pymol api.
+
+Importing pymol starts the pymol runtime, which is slow. Modules use `cmd` from this module so
+pymol is only imported the first time the api is used, and commands that only read the
+configuration never import it.
+"""
+import importlib
+from types import ModuleType
+from typing import Any, Optional
+
+
+class LazyModule:
+    """A module that is imported the first time one of its attributes is used.
+
+    Attributes:
+        _name: Full name of the module.
+        _module: The module once imported.
+    """
+
+    def __init__(self, name: str) -> None:
+        """Initialize the instance.
+
+        Args:
+            name: Full name of the module.
+        """
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def __getattr__(self, attribute: str) -> Any:
+        """Import the module if needed and get one of its attributes.
+
+        Args:
+            attribute: Name of the attribute.
+
+        Returns:
+            The attribute of the module.
+        """
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+
+cmd = LazyModule("pymol.cmd")
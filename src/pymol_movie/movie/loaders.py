@@ -1,23 +1,112 @@
 """PDB trajectory loader class/function."""
+import functools
 import os
+from concurrent.futures import Executor
 from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, cast
 
-from pymol import cmd
+import numpy as np
 
+from .archives import (
+    FRAMES_AHEAD,
+    ArchiveMember,
+    Frame,
+    is_archive,
+    is_compressed_archive,
+    iter_frame_bytes,
+    map_ahead,
+    read_frame,
+)
+from .cache import TrajectoryCache
+from .coordinates import (
+    iter_pdb_coordinates,
+    parse_pdb_coordinates,
+    parse_pdb_coordinates_bytes,
+)
+from .lazy import cmd
+from .manifest import (
+    FrameManifest,
+    check_duplicates,
+    load_archive_members,
+    missing_ranges,
+    number_frames,
+)
+from .readers import TrajectoryReader, iter_frames
+from .streaming import StateWindow
 
-def load_trajectory(directory: str, name: str) -> None:
+
+def index_frames(
+    directory: str, manifest_dir: Optional[str] = None, gaps: bool = True
+) -> Tuple[Sequence[Frame], List[str]]:
+    """Index the pdb trajectory files of a directory or tar archive by their frame number.
+
+    The frame number is the number at the end of the filename and files without one are
+    skipped. Directories are indexed with a persisted `FrameManifest` and the members of
+    archives are stored with `load_archive_members`, so they are only listed again when they
+    change.
+
+    Args:
+        directory: Filepath to directory or tar archive containing pdb trajectory files.
+        manifest_dir: Directory to store manifests in. If None `DEFAULT_MANIFEST_DIR`.
+        gaps: Whether to describe gaps in the frame numbers.
+
+    Returns:
+        The pdb files or archive members in frame order and a message describing each skipped
+        file or gap in the frame numbers.
+
+    Raises:
+        ValueError: If a frame number has more than one file.
+    """
+    if not is_archive(directory):
+        manifest = FrameManifest.load(directory, manifest_dir)
+        return manifest.files(), manifest.warnings(gaps)
+
+    members = {
+        member.name: member for member in load_archive_members(directory, manifest_dir)
+    }
+    numbered, unnumbered = number_frames(members)
+    check_duplicates(directory, numbered)
+    numbers = sorted(numbered)
+    warnings = [
+        f"{directory}: skipped {name} without a frame number" for name in unnumbered
+    ]
+    if gaps and (missing := missing_ranges(numbers)):
+        warnings.append(f"{directory}: {len(missing)} gaps in the frame numbers")
+    return [members[numbered[number][0]] for number in numbers], warnings
+
+
+def trajectory_files(directory: str) -> Sequence[Frame]:
+    """Get the pdb trajectory files of a directory sorted by their number.
+
+    Pdb files may be compressed with gzip, bzip2, xz or zstd. The directory may also be a tar
+    archive of pdb files, which may be compressed as a whole.
+
+    Args:
+        directory: Filepath to directory or tar archive containing pdb trajectory files.
+
+    Returns:
+        The pdb files or archive members sorted by the number at the end of their name.
+    """
+    return index_frames(directory)[0]
+
+
+def load_trajectory(
+    directory: str,
+    name: str,
+    workers: Optional[int] = None,
+    cache_dir: Optional[str] = None,
+) -> None:
     """Load all pdb files in specified directory.
 
     Args:
         directory: String with filepath to directory
         name: Name of loaded object.
+        workers: Number of processes used to parse coordinates. If None files are loaded
+            one at a time with the pymol api.
+        cache_dir: Directory to store the binary coordinate cache in. If None no cache is used.
     """
-    path = Path(directory)
-    files = sorted(
-        path.glob("*.pdb"), key=lambda x: int(os.path.splitext(x)[0].split("_")[-1])
-    )
-    for file in files:
-        cmd.load(file, name)
+    object_loader = ObjectLoader(directory, name, workers=workers, cache_dir=cache_dir)
+    object_loader.load_states(object_loader.total_states)
 
     print(f"loaded {cmd.count_states()} files")
 
@@ -25,25 +114,113 @@ def load_trajectory(directory: str, name: str) -> None:
 class ObjectLoader:
     """Load Object trajectory from pdb files.
 
+    States can be loaded in three ways. By default every pdb file is loaded with `cmd.load`. If
+    `workers` is set the topology is loaded from the first file only and the coordinates of the
+    remaining files are parsed in a process pool and added to the object with `cmd.load_coordset`.
+    If `cache_dir` is set the coordinates are read from a memory-mapped `TrajectoryCache` instead,
+    which is built on the first run and whenever the trajectory files change.
+
+    Instead of a directory of pdb files the states can be read from a multi-frame trajectory file
+    with a `TrajectoryReader`. The topology is loaded once and every frame is added with
+    `cmd.load_coordset`.
+
+    The pdb files may be compressed or packed in a tar archive. They are then decompressed in
+    memory, in a thread pool which keeps a bounded number of frames ready ahead of the states
+    being loaded, and always added with `cmd.load_coordset`. An archive is decompressed once per
+    load from start to end, so reading single states of a compressed archive decompresses the
+    archive up to every state and such objects are only streamed from a `cache_dir`.
+
+    If `atoms` is set only the atoms of the selection are kept when the topology is loaded and
+    only their coordinates are parsed and added to the object, so memory scales with the
+    selected atoms.
+
     Attributes:
-        _files: Sorted iterable of trajectory pdb files.
+        _files: Trajectory pdb files or archive members in frame order.
+        _frames: Indices of the selected files.
+        _atom_indices: Sorted file indices of the selected atoms, None if every atom is loaded.
+        _atom_order: Index in the selected coordinates of every atom in the pymol object.
+        _stream_coords: Memory-mapped cached coordinates of a streamed object.
+        atoms: Selection of the atoms to load.
         loaded_states: The previous loaded trajectory state.
+        cache_dir: Directory to store the binary coordinate cache in.
         name: Name of loaded object.
+        reader: Reader of a multi-frame trajectory file.
+        workers: Number of processes used to parse coordinates.
     """
 
-    def __init__(self, directory: str, name: str) -> None:
-        """Initialize the instance and globs pdb trajectory files from directory.
+    def __init__(
+        self,
+        directory: Optional[str],
+        name: str,
+        workers: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+        reader: Optional[TrajectoryReader] = None,
+        atoms: Optional[str] = None,
+        start: Optional[int] = None,
+        stop: Optional[int] = None,
+        stride: Optional[int] = None,
+    ) -> None:
+        """Initialize the instance and index the pdb trajectory files of the directory.
 
         Args:
             directory: Filepath to directory containing pdb trajectory files.
             name: Name of loaded object.
+            workers: Number of processes used to parse coordinates. If None files are loaded
+                one at a time with the pymol api.
+            cache_dir: Directory to store the binary coordinate cache in. If None no cache is
+                used.
+            reader: Reader of a multi-frame trajectory file. Must be given if directory is None.
+            atoms: Selection of the atoms to load, for example "polymer". If None every atom is
+                loaded.
+            start: First file of the directory to load. (0 indexed)
+            stop: File of the directory to stop loading at. (Exclusive)
+            stride: Load every nth file of the directory.
+
+        Raises:
+            ValueError: If neither or both of directory and reader are given.
         """
-        self._files = sorted(
-            Path(directory).glob("*.pdb"),
-            key=lambda x: int(os.path.splitext(x)[0].split("_")[-1]),
-        )
+        if (directory is None) == (reader is None):
+            raise ValueError("Either a directory or a trajectory reader is required.")
+
+        self._files: Sequence[Frame] = []
+        if directory is not None:
+            manifest_dir = os.path.join(cache_dir, "manifests") if cache_dir else None
+            # States follow the order of the files, gaps in the frame numbers are reported by
+            # the validate command instead
+            self._files, warnings = index_frames(directory, manifest_dir, gaps=False)
+            for warning in warnings:
+                print(f"{name}: {warning}")
+        self._frames = range(len(self._files))[start:stop:stride]
+        self._atom_indices: Optional[np.ndarray] = None
+        self._atom_order: Optional[np.ndarray] = None
+        self._stream_coords: Optional[np.ndarray] = None
+        self.atoms = atoms
+        self.cache_dir = cache_dir
         self.loaded_states = 0
         self.name = name
+        self.reader = reader
+        self.workers = workers
+
+    @property
+    def files(self) -> Sequence[Frame]:
+        """Selected trajectory pdb files or archive members in frame order."""
+        return [self._files[index] for index in self._frames]
+
+    @property
+    def total_states(self) -> int:
+        """Number of states in the trajectory."""
+        return len(self.reader) if self.reader is not None else len(self._frames)
+
+    @property
+    def seekable(self) -> bool:
+        """Whether single states are read without reading the trajectory up to them."""
+        return (
+            self.reader is not None
+            or self.cache_dir is not None
+            or not self._files
+            or not isinstance(self._files[0], ArchiveMember)
+            or not is_compressed_archive(self._files[0].archive)
+        )
 
     def load_states(self, states: int) -> None:
         """Load number of states specified.
@@ -51,9 +228,7 @@ class ObjectLoader:
         Args:
             states: The number of states to load.
         """
-        for _ in range(states):
-            self.loaded_states += 1
-            cmd.load(self._files[self.loaded_states], self.name)
+        self.load_up_to_state(self.loaded_states + states)
 
     def load_up_to_state(self, state: int) -> None:
         """Load up to the state specified.
@@ -64,7 +239,291 @@ class ObjectLoader:
         Args:
             state: The state to load to. (Inclusive)
         """
-        states_to_load = max(0, state - self.loaded_states)
-        for _ in range(states_to_load):
-            self.loaded_states += 1
-            cmd.load(self._files[self.loaded_states], self.name)
+        self._load(self.states_up_to(state))
+
+    def load_selected_states(self, states: Iterable[int]) -> None:
+        """Load only the states specified.
+
+        Every state is loaded at its own state index, so scenes can refer to trajectory states
+        and the states in between are left empty.
+
+        Args:
+            states: The states to load.
+        """
+        self._load(self.selected_states(states))
+
+    def states_up_to(self, state: int) -> List[int]:
+        """Get the states `load_up_to_state` loads.
+
+        Args:
+            state: The state to load to. (Inclusive)
+
+        Returns:
+            The sorted states after the loaded states up to the state.
+        """
+        return list(range(self.loaded_states + 1, min(state, self.total_states) + 1))
+
+    def selected_states(self, states: Iterable[int]) -> List[int]:
+        """Get the states `load_selected_states` loads.
+
+        Args:
+            states: The states to load.
+
+        Returns:
+            The sorted states.
+
+        Raises:
+            ValueError: If a state is not in the trajectory.
+        """
+        selected_states = sorted(set(states))
+        if selected_states and not (
+            1 <= selected_states[0] and selected_states[-1] <= self.total_states
+        ):
+            raise ValueError(
+                f"{self.name} has {self.total_states} states but states "
+                f"{selected_states[0]}-{selected_states[-1]} were requested."
+            )
+        return selected_states
+
+    def read_state(self, state: int) -> np.ndarray:
+        """Read the coordinates of a state without loading it.
+
+        Args:
+            state: The state to read.
+
+        Returns:
+            A float32 array of shape (atoms, 3) of the selected atoms in file atom order.
+        """
+        if self.reader is not None:
+            return self._select_atoms(self.reader.read(state - 1))
+        if self.cache_dir is not None:
+            cache_coords = (
+                self._stream_coords
+                if self._stream_coords is not None
+                else self._cache().coordinates()
+            )
+            return np.array(self._select_atoms(cache_coords[self._frames[state - 1]]))
+        return parse_pdb_coordinates(self._file(state), self._atom_indices)
+
+    def stream(
+        self,
+        states: Sequence[int],
+        max_states: Optional[int] = None,
+        max_mb: Optional[float] = None,
+    ) -> StateWindow:
+        """Create the object with a single state and stream states through a window.
+
+        Only the states in the window are kept in memory. Use `show_state` to set the single
+        state of the object to a state of the window. The coordinate cache is validated once
+        here and kept memory-mapped for every state read by the window.
+
+        Args:
+            states: The state shown at each frame.
+            max_states: Maximum number of states in the window.
+            max_mb: Maximum size of the states in the window in MB.
+
+        Returns:
+            A window prefetching the states in order.
+        """
+        self._load_topology(self.read_topology(), 1)
+        self.loaded_states = 1
+        if self.cache_dir is not None:
+            # `read_topology` validated the cache
+            self._stream_coords = TrajectoryCache(
+                self._files, self.cache_dir
+            ).coordinates()
+
+        return StateWindow(self.read_state, states, max_states, max_mb)
+
+    def show_state(self, window: StateWindow, state: int) -> None:
+        """Set the single state of a streamed object to a state of the window.
+
+        Args:
+            window: Window created by `stream`.
+            state: The state to show.
+        """
+        cmd.load_coordset(window.get(state)[self._atom_order], self.name, state=1)
+
+    def _file(self, state: int) -> Frame:
+        """Get the pdb file or archive member of a state.
+
+        Args:
+            state: The state.
+
+        Returns:
+            The file of the state.
+        """
+        return self._files[self._frames[state - 1]]
+
+    def _cache(self) -> TrajectoryCache:
+        """Get the coordinate cache, building it if it does not exist or is stale.
+
+        Returns:
+            A valid coordinate cache.
+        """
+        cache = TrajectoryCache(self._files, cast(str, self.cache_dir))
+        if not cache.is_valid():
+            print(f"building coordinate cache for {self.name} in {cache.path}")
+            cache.build(self.workers)
+        return cache
+
+    def read_topology(self, state: int = 1) -> bytes:
+        """Read the pdb contents the object is created from, building the cache if it is used.
+
+        Does not use the pymol api, so it can run in a thread while other objects are loaded.
+
+        Args:
+            state: The state of a directory of pdb files to read the topology from.
+
+        Returns:
+            Contents of the topology pdb file.
+        """
+        if self.reader is not None:
+            return self.reader.read_topology()
+        if self.cache_dir is not None:
+            return self._cache().topology.read_bytes()
+        return read_frame(self._file(state))
+
+    def load_topology(self, state: int, pdb: Optional[bytes] = None) -> None:
+        """Create the object in a state unless it was created already.
+
+        Args:
+            state: The state to create the object in.
+            pdb: Contents returned by `read_topology`. If None the topology is read.
+        """
+        if self._atom_order is None:
+            self._load_topology(
+                pdb if pdb is not None else self.read_topology(state), state
+            )
+
+    def iter_coordinates(
+        self, states: Sequence[int], executor: Optional[Executor] = None
+    ) -> Iterator[np.ndarray]:
+        """Read and parse the coordinates of states in the atom order of the object.
+
+        Does not use the pymol api, so it can run in a thread while other objects are loaded.
+        The object must be created with `load_topology` first.
+
+        Args:
+            states: Sorted states to read.
+            executor: Process pool to parse pdb files in. If None pdb files are parsed in a pool
+                of `workers` processes, or in this process if `workers` is None.
+
+        Yields:
+            A float32 array of shape (atoms, 3) of each state.
+        """
+        coordinates: Iterable[np.ndarray]
+        if self.reader is not None:
+            frames = iter_frames(
+                self.reader, [state - 1 for state in states], self.workers
+            )
+            coordinates = map(self._select_atoms, frames)
+        elif self.cache_dir is not None:
+            cache_coords = self._cache().coordinates()
+            coordinates = (
+                self._select_atoms(cache_coords[self._frames[state - 1]])
+                for state in states
+            )
+        else:
+            files = [self._file(state) for state in states]
+            if executor is None:
+                coordinates = iter_pdb_coordinates(
+                    files, self.workers, self._atom_indices
+                )
+            else:
+                parse = functools.partial(
+                    parse_pdb_coordinates_bytes, atoms=self._atom_indices
+                )
+                coordinates = map_ahead(
+                    executor, parse, iter_frame_bytes(files), FRAMES_AHEAD
+                )
+
+        for coords in coordinates:
+            yield coords[self._atom_order]
+
+    def insert_state(self, state: int, coords: np.ndarray) -> None:
+        """Set the coordinates of a state of the object.
+
+        Args:
+            state: The state to set.
+            coords: Coordinates returned by `iter_coordinates`.
+        """
+        cmd.load_coordset(coords, self.name, state=state)
+        self.loaded_states = max(self.loaded_states, state)
+
+    def _load(self, states: Sequence[int]) -> None:
+        """Load states of the object.
+
+        Args:
+            states: Sorted states to load.
+        """
+        if not states:
+            return
+
+        if (
+            self.reader is None
+            and self.cache_dir is None
+            and self.workers is None
+            and self.atoms is None
+            # Only uncompressed pdb files can be loaded with the pymol api
+            and all(
+                isinstance(file, Path) and file.name.endswith(".pdb")
+                for file in map(self._file, states)
+            )
+        ):
+            for state in states:
+                cmd.load(str(self._file(state)), self.name, state=state)
+        else:
+            self.load_topology(states[0])
+            for state, coords in zip(states, self.iter_coordinates(states)):
+                cmd.load_coordset(coords, self.name, state=state)
+
+        self.loaded_states = max(self.loaded_states, states[-1])
+
+    def _select_atoms(self, coords: np.ndarray) -> np.ndarray:
+        """Select the coordinates of the selected atoms.
+
+        Args:
+            coords: Coordinates of every atom in file atom order.
+
+        Returns:
+            Coordinates of the selected atoms in file atom order.
+        """
+        return coords if self._atom_indices is None else coords[self._atom_indices]
+
+    def _load_topology(self, pdb: bytes, state: int) -> None:
+        """Create the object from pdb contents and store the atom order.
+
+        Only the atoms of the `atoms` selection are added to the object.
+
+        Args:
+            pdb: Contents of pdb file.
+            state: State to load the pdb contents in.
+
+        Raises:
+            ValueError: If the `atoms` selection is empty.
+        """
+        if self.atoms is None:
+            cmd.read_pdbstr(pdb.decode(), self.name, state=state)
+        else:
+            # Removing atoms from an object keeps per state arrays sized for every atom, so
+            # the selected atoms are copied to a new object instead
+            topology = f"_{self.name}_topology"
+            cmd.read_pdbstr(pdb.decode(), topology)
+            selected = cmd.count_atoms(f"{topology} and ({self.atoms})")
+            if selected:
+                cmd.create(self.name, f"{topology} and ({self.atoms})", 1, state)
+            cmd.delete(topology)
+            if not selected:
+                raise ValueError(
+                    f'{self.name}: the atoms "{self.atoms}" are not found.'
+                )
+
+        ranks: List[int] = []
+        cmd.iterate(self.name, "ranks.append(rank)", space={"ranks": ranks})
+        if self.atoms is None:
+            self._atom_order = np.array(ranks, dtype=np.intp)
+        else:
+            # The rank is the file index of the atom, which is kept when atoms are copied
+            self._atom_indices = np.unique(np.array(ranks, dtype=np.intp))
+            self._atom_order = np.searchsorted(self._atom_indices, ranks)
@@ -0,0 +1,376 @@
+"""Persisted index of the numbered pdb files of trajectory directories."""
+import functools
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union, overload
+
+from .archives import ArchiveMember, archive_members, is_pdb_frame, strip_compression
+
+DEFAULT_MANIFEST_DIR = (
+    Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    / "pymol_movie"
+    / "manifests"
+)
+# A file added in the same mtime tick as the scan would not change the directory mtime, so
+# directories modified this close to their scan are scanned again
+MTIME_RESOLUTION_NS = 2_000_000_000
+FRAME_NUMBER = re.compile(r"(\d+)\.pdb$", re.IGNORECASE)
+
+
+def frame_number(name: str) -> Optional[int]:
+    """Get the frame number at the end of a pdb filename.
+
+    Args:
+        name: The filename e.g. "traj_12.pdb" or "frame0012.pdb.gz".
+
+    Returns:
+        The frame number or None if the name does not end with a number.
+    """
+    match = FRAME_NUMBER.search(strip_compression(os.path.basename(name)))
+    return int(match.group(1)) if match else None
+
+
+def number_frames(names: Iterable[str]) -> Tuple[Dict[int, List[str]], List[str]]:
+    """Group pdb filenames by their frame number.
+
+    Args:
+        names: The filenames.
+
+    Returns:
+        A dictionary of frame number to the sorted names with that number and the sorted names
+        without a number.
+    """
+    numbered: Dict[int, List[str]] = {}
+    unnumbered = []
+    for name in names:
+        if (number := frame_number(name)) is None:
+            unnumbered.append(name)
+        else:
+            numbered.setdefault(number, []).append(name)
+    for number_names in numbered.values():
+        number_names.sort()
+    return numbered, sorted(unnumbered)
+
+
+def check_duplicates(source: Union[str, Path], numbered: Dict[int, List[str]]) -> None:
+    """Check no two files have the same frame number.
+
+    Args:
+        source: Directory or archive of the files.
+        numbered: Dictionary returned by `number_frames`.
+
+    Raises:
+        ValueError: If a frame number has more than one file.
+    """
+    duplicates = [names for names in numbered.values() if len(names) > 1]
+    if duplicates:
+        raise ValueError(
+            f"{source}: {len(duplicates)} frame numbers have more than one file, e.g. "
+            f'{", ".join(duplicates[0])}.'
+        )
+
+
+def missing_ranges(numbers: Sequence[int]) -> List[Tuple[int, int]]:
+    """Find gaps in sorted frame numbers.
+
+    The frame numbers may have a step, for example when every 10th frame was written, so only
+    numbers missing between multiples of the step are gaps.
+
+    Args:
+        numbers: Sorted frame numbers.
+
+    Returns:
+        The first and last number of each gap.
+    """
+    steps = [second - first for first, second in zip(numbers, numbers[1:])]
+    if not steps:
+        return []
+    step = functools.reduce(math.gcd, steps)
+    return [
+        (first + step, second - step)
+        for first, second in zip(numbers, numbers[1:])
+        if second - first > step
+    ]
+
+
+def manifest_path(source: Union[str, Path], manifest_dir: Optional[str] = None) -> Path:
+    """Get the filepath of the stored manifest of a trajectory directory or archive.
+
+    Args:
+        source: The trajectory directory or archive.
+        manifest_dir: Directory to store manifests in. If None `DEFAULT_MANIFEST_DIR`.
+
+    Returns:
+        The filepath of the manifest.
+    """
+    key = hashlib.sha1(str(Path(source).resolve()).encode()).hexdigest()[:16]
+    return Path(manifest_dir or DEFAULT_MANIFEST_DIR) / f"{key}.json"
+
+
+def _write_manifest(path: Path, manifest: Dict[str, Any]) -> None:
+    """Store a manifest, skipped if the manifest directory can not be written.
+
+    Args:
+        path: Filepath of the manifest.
+        manifest: The json contents of the manifest.
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(partial, "w", encoding="utf-8") as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(partial, path)
+    except OSError:
+        pass
+
+
+def load_archive_members(
+    archive: Union[str, Path], manifest_dir: Optional[str] = None
+) -> List[ArchiveMember]:
+    """List the pdb frames of a tar archive, stored so an unchanged archive is not listed again.
+
+    A compressed archive has to be decompressed to be listed. The member names are stored in
+    `manifest_dir` with the size and mtime of the archive and the archive is only listed again
+    when either of them changed.
+
+    Args:
+        archive: Filepath to the tar archive.
+        manifest_dir: Directory to store manifests in. If None `DEFAULT_MANIFEST_DIR`.
+
+    Returns:
+        The pdb frames, in the order of the archive.
+    """
+    archive = Path(archive)
+    path = manifest_path(archive, manifest_dir)
+    stat = archive.stat()
+    key = [str(archive.resolve()), stat.st_size, stat.st_mtime_ns]
+    try:
+        with open(path, encoding="utf-8") as manifest_file:
+            stored = json.load(manifest_file)
+        if stored.get("key") == key:
+            return [ArchiveMember(archive, name) for name in stored["names"]]
+    except (OSError, ValueError):
+        pass
+
+    members = archive_members(archive)
+    _write_manifest(path, {"key": key, "names": [member.name for member in members]})
+    return members
+
+
+class FrameFiles(Sequence[Path]):
+    """Files of a trajectory directory in frame order, looked up by index.
+
+    Paths are created when they are looked up, so large directories do not hold a path object
+    for every file.
+
+    Attributes:
+        directory: The trajectory directory.
+        names: Filenames in frame order.
+    """
+
+    def __init__(self, directory: Path, names: Sequence[str]) -> None:
+        """Initialize the instance.
+
+        Args:
+            directory: The trajectory directory.
+            names: Filenames in frame order.
+        """
+        self.directory = directory
+        self.names = names
+
+    def __len__(self) -> int:
+        """Return number of files."""
+        return len(self.names)
+
+    @overload
+    def __getitem__(self, index: int) -> Path:  # noqa: D105
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "FrameFiles":  # noqa: D105
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Path, "FrameFiles"]:
+        """Return the file at an index or the files of a slice."""
+        if isinstance(index, slice):
+            return FrameFiles(self.directory, self.names[index])
+        return self.directory / self.names[index]
+
+
+class FrameManifest:
+    """Index of the numbered pdb files of a trajectory directory.
+
+    The manifest lists the pdb files of the directory and is stored as json in `manifest_dir`,
+    outside the trajectory directory so writing it does not change the directory. It is only
+    scanned again with `os.scandir` if the mtime of the directory changed, which happens when
+    files are added, removed or renamed. Files are not stat'ed, files rewritten in place are
+    detected by the `TrajectoryCache` of the directory.
+
+    Attributes:
+        _pdb_names: Filenames of the pdb files of the directory.
+        _mtime_ns: Mtime of the directory when it was scanned.
+        _scanned_ns: Time the directory was scanned.
+        directory: The trajectory directory.
+        duplicates: Dictionary of frame number to the filenames of numbers with many files.
+        names: Filenames of the frames sorted by number, the first name of duplicates.
+        numbers: Sorted frame numbers.
+        path: Filepath of the stored manifest.
+        unnumbered: Pdb filenames without a frame number, which are skipped.
+    """
+
+    def __init__(
+        self, directory: Union[str, Path], manifest_dir: Optional[str] = None
+    ) -> None:
+        """Initialize an empty instance.
+
+        Args:
+            directory: The trajectory directory.
+            manifest_dir: Directory to store manifests in. If None `DEFAULT_MANIFEST_DIR`.
+        """
+        self.directory = Path(directory)
+        self.path = manifest_path(self.directory, manifest_dir)
+        self._pdb_names: List[str] = []
+        self._mtime_ns: Optional[int] = None
+        self._scanned_ns = 0
+        self.duplicates: Dict[int, List[str]] = {}
+        self.names: List[str] = []
+        self.numbers: List[int] = []
+        self.unnumbered: List[str] = []
+
+    @classmethod
+    def load(
+        cls, directory: Union[str, Path], manifest_dir: Optional[str] = None
+    ) -> "FrameManifest":
+        """Read the stored manifest of a directory and refresh it if the directory changed.
+
+        Args:
+            directory: The trajectory directory.
+            manifest_dir: Directory to store manifests in. If None `DEFAULT_MANIFEST_DIR`.
+
+        Returns:
+            An up to date manifest.
+        """
+        manifest = cls(directory, manifest_dir)
+        manifest.read()
+        if manifest.refresh():
+            manifest.write()
+        return manifest
+
+    def __len__(self) -> int:
+        """Return number of frames."""
+        return len(self.names)
+
+    def files(self) -> FrameFiles:
+        """Get the files of the frames in frame order.
+
+        Returns:
+            The files.
+
+        Raises:
+            ValueError: If a frame number has more than one file.
+        """
+        check_duplicates(self.directory, self.duplicates)
+        return FrameFiles(self.directory, self.names)
+
+    def missing(self) -> List[Tuple[int, int]]:
+        """Find gaps in the frame numbers.
+
+        Returns:
+            The first and last number of each gap.
+        """
+        return missing_ranges(self.numbers)
+
+    def warnings(self, gaps: bool = True) -> List[str]:
+        """Describe skipped files and gaps in the frame numbers.
+
+        Args:
+            gaps: Whether to describe gaps in the frame numbers.
+
+        Returns:
+            A message for each problem.
+        """
+        messages = []
+        if self.unnumbered:
+            messages.append(
+                f"skipped {len(self.unnumbered)} pdb files without a frame number, e.g. "
+                f"{self.unnumbered[0]}"
+            )
+        if gaps and (missing := self.missing()):
+            ranges = ", ".join(
+                str(first) if first == last else f"{first}-{last}"
+                for first, last in missing[:5]
+            )
+            messages.append(
+                f"frames {ranges}{', ...' if len(missing) > 5 else ''} are missing, "
+                "states follow the frame order of the files"
+            )
+        return messages
+
+    def refresh(self) -> bool:
+        """Scan the directory again if it changed since it was scanned.
+
+        Returns:
+            True if the directory was scanned.
+        """
+        mtime_ns = os.stat(self.directory).st_mtime_ns
+        if (
+            mtime_ns == self._mtime_ns
+            and self._scanned_ns - mtime_ns > MTIME_RESOLUTION_NS
+        ):
+            return False
+
+        scanned_ns = time.time_ns()
+        with os.scandir(self.directory) as scan:
+            self._pdb_names = [
+                entry.name
+                for entry in scan
+                if is_pdb_frame(entry.name) and entry.is_file()
+            ]
+        self._mtime_ns = mtime_ns
+        self._scanned_ns = scanned_ns
+        self._index()
+        return True
+
+    def read(self) -> None:
+        """Read the stored manifest, if there is a valid one."""
+        try:
+            with open(self.path, encoding="utf-8") as manifest_file:
+                stored = json.load(manifest_file)
+        except (OSError, ValueError):
+            return
+        # Manifests of older versions have no "files"
+        if stored.get("directory") != str(self.directory.resolve()) or (
+            "files" not in stored
+        ):
+            return
+
+        self._pdb_names = stored["files"]
+        self._mtime_ns = stored["mtime_ns"]
+        self._scanned_ns = stored["scanned_ns"]
+        self._index()
+
+    def write(self) -> None:
+        """Store the manifest, skipped if the manifest directory can not be written."""
+        _write_manifest(
+            self.path,
+            {
+                "directory": str(self.directory.resolve()),
+                "mtime_ns": self._mtime_ns,
+                "scanned_ns": self._scanned_ns,
+                "files": self._pdb_names,
+            },
+        )
+
+    def _index(self) -> None:
+        """Order the frames by their number."""
+        numbered, self.unnumbered = number_frames(self._pdb_names)
+        self.numbers = sorted(numbered)
+        self.names = [numbered[number][0] for number in self.numbers]
+        self.duplicates = {
+            number: names for number, names in numbered.items() if len(names) > 1
+        }
@@ -1,7 +1,40 @@
 """Functions for movie setup and production."""
-from typing import Any, Dict, List, Tuple
-
-from pymol import cmd
+import copy
+import hashlib
+import json
+import math
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import (
+    actions,
+    camera,
+    encoding,
+    estimate,
+    planning,
+    preview,
+    readers,
+    render,
+    tiles,
+)
+from .cache import FrameCache
+from .checkpoint import RenderManifest
+from .lazy import cmd
+from .loaders import ObjectLoader
+from .pipeline import load_concurrently
+from .profiling import Profiler
+from .selections import SelectionCache, use_selection_cache
+from .streaming import StateWindow
+
+# Scene storing the objects as loaded, before any movie was set up
+BASELINE_SCENE = "_pymol_movie_baseline"
+# Frames rendered by a worker of a resumable render before they are recorded
+RESUME_PART_FRAMES = 16
 
 
 class MovieMaker:
@@ -10,12 +43,184 @@ class MovieMaker:
     Attributes:
         _loaded_scenes: Stores total number of loaded scenes.
         _loaded_frames: Stores total number of loaded frames.
+        _frame_states: Stores the planned state of objects at each frame.
+        _streams: Stores the loader and state window of streamed objects.
+        _scene_dicts: Stores the loaded scene dictionaries.
+        _state_hashes: Stores the hash of the coordinates of object states.
+        _profiler: Records the time of the movie phases and actions.
+        _selection_cache: Named selections of the selections used by actions.
+        _baseline_coords: Stores the coordinates of the first state of the loaded objects.
+        _scene_views: Stores the camera view of each scene.
+        _camera_cache_dir: Directory camera paths are cached in.
     """
 
-    def __init__(self) -> None:
-        """Initialize the instance."""
+    def __init__(
+        self,
+        profiler: Optional[Profiler] = None,
+        camera_cache_dir: Optional[str] = None,
+    ) -> None:
+        """Initialize the instance.
+
+        Args:
+            profiler: Records the time of the movie phases and actions. If None nothing is
+                recorded.
+            camera_cache_dir: Directory to cache camera paths in. If None camera paths are
+                not cached.
+        """
         self._loaded_scenes: List[Tuple[str, int, str, int]] = []
         self._loaded_frames = 0
+        self._frame_states: Dict[str, List[int]] = {}
+        self._streams: Dict[str, Tuple[ObjectLoader, StateWindow]] = {}
+        self._scene_dicts: List[Dict[str, Any]] = []
+        self._state_hashes: Dict[Tuple[str, int], str] = {}
+        self._profiler = profiler or Profiler(enabled=False)
+        self._selection_cache = SelectionCache()
+        self._baseline_coords: Dict[str, np.ndarray] = {}
+        self._scene_views: Dict[str, List[float]] = {}
+        self._camera_cache_dir = camera_cache_dir
+
+    def set_frame_states(self, frame_states: Dict[str, List[int]]) -> None:
+        """Set the state objects show at each frame.
+
+        Objects with planned states are given a state keyframe at every frame instead of
+        interpolating between scenes, so only the planned states have to be loaded.
+
+        Args:
+            frame_states: A dictionary of object name to the state at each frame starting at 1.
+        """
+        self._frame_states = frame_states
+
+    def stream_object(self, object_loader: ObjectLoader, window: StateWindow) -> None:
+        """Stream the states of an object while the movie is rendered.
+
+        The object has a single state which is set to the planned state of each frame from the
+        state window before the frame is rendered.
+
+        Args:
+            object_loader: Loader of the object created with `ObjectLoader.stream`.
+            window: State window returned by `ObjectLoader.stream`.
+        """
+        self._streams[object_loader.name] = (object_loader, window)
+
+    def load_objects(
+        self,
+        object_dicts: List[Dict[str, Any]],
+        frame_states: Optional[Dict[str, List[int]]] = None,
+        stream: bool = False,
+    ) -> None:
+        """Load the trajectories of objects.
+
+        Objects with planned states only load those states and objects with a state window
+        are streamed if `stream` is set. If more than one object is loaded the objects are
+        loaded concurrently and the load time of every object is printed.
+
+        Args:
+            object_dicts: List of dictionaries containing object information.
+            frame_states: A dictionary of object name to the state at each frame.
+            stream: Whether objects with a state window are streamed.
+        """
+        loads = []
+        for object_dict in object_dicts:
+            name = object_dict["name"]
+            reader = None
+            # The frames of a trajectory file are selected by its reader
+            frames = {key: object_dict.get(key) for key in ("start", "stop", "stride")}
+            if trajectory := object_dict.get("trajectory"):
+                reader = readers.open_trajectory(
+                    trajectory, object_dict.get("topology"), **frames
+                )
+                frames = {}
+
+            object_loader = ObjectLoader(
+                object_dict.get("directory"),
+                name,
+                workers=object_dict.get("workers"),
+                cache_dir=object_dict.get("cache_dir"),
+                reader=reader,
+                atoms=object_dict.get("atoms"),
+                **frames,
+            )
+            windowed = "window_states" in object_dict or "window_mb" in object_dict
+            if stream and windowed and not object_loader.seekable:
+                print(
+                    f"{name}: states of a compressed archive can only be streamed with a "
+                    "cache_dir. The planned states will be loaded instead."
+                )
+                windowed = False
+            if stream and windowed and frame_states and name in frame_states:
+                with self._profiler.phase(f"load {name}", "load"):
+                    window = object_loader.stream(
+                        frame_states[name],
+                        max_states=object_dict.get("window_states"),
+                        max_mb=object_dict.get("window_mb"),
+                    )
+                self.stream_object(object_loader, window)
+            elif frame_states and name in frame_states:
+                loads.append(
+                    (object_loader, object_loader.selected_states(frame_states[name]))
+                )
+            else:
+                loads.append(
+                    (object_loader, object_loader.states_up_to(object_dict["states"]))
+                )
+
+        if len(loads) == 1:
+            object_loader, states = loads[0]
+            with self._profiler.phase(f"load {object_loader.name}", "load"):
+                object_loader.load_selected_states(states)
+            return
+
+        start = time.perf_counter()
+        for object_load in load_concurrently(loads):
+            self._profiler.record(
+                f"load {object_load.name}",
+                "load",
+                start,
+                object_load.wall_s,
+                insert_s=object_load.insert_s,
+            )
+            print(
+                f"loaded {object_load.name}: {object_load.states} states in "
+                f"{object_load.wall_s:.1f} s, {object_load.insert_s:.1f} s inserting"
+            )
+
+    def store_baseline(self) -> None:
+        """Store the loaded objects as the baseline `reset` returns to.
+
+        The colors, representations and view are stored in a scene and the coordinates of the
+        first state, which object actions move, are copied.
+        """
+        cmd.scene(BASELINE_SCENE, "store")
+        self._baseline_coords = {}
+        for name in cmd.get_names("objects"):
+            if (coords := cmd.get_coordset(name, 1)) is not None:
+                self._baseline_coords[name] = coords
+
+    def reset(self) -> None:
+        """Remove the scenes and movie so another movie can be made from the loaded objects.
+
+        The objects are returned to the baseline stored with `store_baseline` and the
+        settings in `actions.ACTION_SETTINGS` are unset, so the trajectories do not have to be
+        loaded again.
+        """
+        for scene in {scene for scene, _, _, _ in self._loaded_scenes}:
+            cmd.scene(scene, "delete")
+        cmd.mset()
+        cmd.mview("clear")
+        cmd.set("state", 1)
+        cmd.unset_deep(" ".join(actions.ACTION_SETTINGS))
+        cmd.scene(BASELINE_SCENE, "recall", animate=0)
+        for name, coords in self._baseline_coords.items():
+            cmd.load_coordset(coords, name, state=1)
+
+        self._loaded_scenes = []
+        self._loaded_frames = 0
+        self._frame_states = {}
+        self._streams = {}
+        self._scene_dicts = []
+        self._scene_views = {}
+        self._state_hashes = {}
+        self._selection_cache.clear()
 
     @staticmethod
     def _clean_produce_dict(produce_dict: Dict[str, Any]) -> None:
@@ -39,10 +244,11 @@ class MovieMaker:
             "normal",
             "fast",
             "ray",
+            "tiled",
         ):
             print(
-                'setup: mode has either not been specified or is not one of 3 possible strings: \
-    ("normal", "fast", "ray"). The default mode "normal" will be used.'
+                'setup: mode has either not been specified or is not one of 4 possible strings: \
+    ("normal", "fast", "ray", "tiled"). The default mode "normal" will be used.'
             )
             produce_dict["mode"] = "normal"
 
@@ -80,32 +286,582 @@ class MovieMaker:
         if not produce_dict.get("produce"):
             produce_dict["produce"] = "pse"
 
+        if (camera_path := produce_dict.get("camera_path")) not in camera.CAMERA_PATHS:
+            if camera_path is not None:
+                print(
+                    f"setup: camera_path is not one of {len(camera.CAMERA_PATHS)} possible "
+                    f'strings: {camera.CAMERA_PATHS}. The default camera path "pymol" will be used.'
+                )
+            produce_dict["camera_path"] = "pymol"
+
+    def plan_selections(self, scene_dicts: List[Dict[str, Any]]) -> None:
+        """Plan the scenes that will be set up so selections are deleted after their last use.
+
+        Args:
+            scene_dicts: A list of dictionaries containing scene information.
+        """
+        self._selection_cache.plan(scene_dicts)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Get statistics of the movie setup.
+
+        Returns:
+            A dictionary with the hit rate of the selection cache.
+        """
+        return {"selection_cache": self._selection_cache.stats()}
+
     def produce_movie(self, produce_dict: Dict[str, Any]) -> None:
         """Save PyMol movie.
 
         Args:
             produce_dict: Nested dictionary containing produce movie information.
         """
-        cmd.mset(f'1x{produce_dict["frames"]}')
+        self._prepare_movie(produce_dict["frames"], produce_dict.get("camera_path"))
+
+        with self._profiler.phase("produce", produce=produce_dict.get("produce")):
+            self._produce(produce_dict)
+
+    def _prepare_movie(self, frames: int, camera_path: Optional[str] = None) -> None:
+        """Create the movie frames and store the views of the scenes.
+
+        Args:
+            frames: The number of frames of the movie.
+            camera_path: How the camera moves between scenes, one of `CAMERA_PATHS`. If None
+                or "pymol" pymol interpolates the camera.
+        """
+        # Named selections are only needed to set up scenes
+        self._selection_cache.clear()
+        cmd.mset(f"1x{frames}")
 
         cmd.set("movie_loop", 0)
 
+        with self._profiler.phase("mview store"):
+            self._store_views(frames)
+
+        if camera_path and camera_path != "pymol" and self._scene_views:
+            with self._profiler.phase("camera path", method=camera_path):
+                self._store_camera_path(frames, camera_path)
+
+    def produce_preview(
+        self,
+        produce_dict: Dict[str, Any],
+        stride: int = 4,
+        scale: float = 0.25,
+        refine: bool = False,
+    ) -> str:
+        """Render a quick low resolution preview movie.
+
+        Every nth frame is rendered at a fraction of the size with cheap representation
+        settings and without ray tracing. If `refine` is set the preview is then improved in
+        passes, first filling in the skipped frames and then doubling the resolution up to the
+        full size. Every pass replaces the preview movie, so it can be watched while it is
+        refined.
+
+        Args:
+            produce_dict: Nested dictionary containing produce movie information.
+            stride: Only every nth frame is rendered in the first pass.
+            scale: Fraction of the width and height of the first pass.
+            refine: Whether to keep refining the preview.
+
+        Returns:
+            Filepath of the preview movie.
+        """
+        self._clean_produce_dict(produce_dict)
+        self._prepare_movie(produce_dict["frames"], produce_dict.get("camera_path"))
+        filename = f'{produce_dict["filename"]}_preview.mpg'
+
+        if refine and self._streams:
+            print(
+                "produce: streamed objects can only be previewed once. The preview will not be "
+                "refined."
+            )
+            refine = False
+
+        # Frames rendered at the scale of the pass are reused
+        frames: Dict[int, bytes] = {}
+        rendered_scale = scale
+        try:
+            with preview.preview_settings():
+                for stride, scale in preview.refinement_passes(stride, scale, refine):
+                    preview_dict = preview.preview_produce_dict(
+                        produce_dict, stride, scale
+                    )
+                    if scale != rendered_scale:
+                        frames = {}
+                        rendered_scale = scale
+                    with self._profiler.phase("preview", stride=stride, scale=scale):
+                        for frame in range(1, produce_dict["frames"] + 1, stride):
+                            if frame in frames:
+                                continue
+                            render.show_frame(frame)
+                            if self._streams:
+                                self._show_streamed_states(frame)
+                            frames[frame] = render.render_frame(preview_dict)
+                        preview.encode_preview(filename, frames, preview_dict)
+                    print(f"preview: {len(frames)} frames at {scale:.0%} written")
+        finally:
+            for _, window in self._streams.values():
+                window.close()
+
+        return filename
+
+    def estimate_movie(
+        self,
+        produce_dict: Dict[str, Any],
+        samples: int,
+        workers: int,
+        setup_s: float = 0.0,
+    ) -> estimate.RenderEstimate:
+        """Render sample frames of the movie and project the cost of producing it.
+
+        Args:
+            produce_dict: Nested dictionary containing produce movie information.
+            samples: The number of frames to render, spread across the scenes.
+            workers: The number of render processes of the parallel projection.
+            setup_s: Time spent loading objects and setting up scenes.
+
+        Returns:
+            The projected cost of producing the movie.
+        """
+        self._clean_produce_dict(produce_dict)
+        self._prepare_movie(produce_dict["frames"], produce_dict.get("camera_path"))
+
+        try:
+            with self._profiler.phase("estimate"):
+                return estimate.estimate_render(
+                    produce_dict,
+                    estimate.sample_frames(
+                        (frame for _, frame, _, _ in self._loaded_scenes),
+                        produce_dict["frames"],
+                        samples,
+                    ),
+                    workers,
+                    setup_s,
+                    before_frame=self._show_streamed_states if self._streams else None,
+                )
+        finally:
+            for _, window in self._streams.values():
+                window.close()
+
+    def _store_views(self, frames: int) -> None:
+        """Store the scene and planned state keyframes of the movie.
+
+        Args:
+            frames: The number of frames of the movie.
+        """
+        # The last scene is stored again at the last frame, so every frame is interpolated
+        # and frames render the same whatever frame was shown before them
+        last_frame = max((frame for _, frame, _, _ in self._loaded_scenes), default=0)
         for scene, frame, name, state in self._loaded_scenes:
+            if name in self._streams:
+                state = 1
             cmd.mview("store", frame, scene=scene, object=name, state=state)
+            if frame == last_frame and last_frame < frames:
+                cmd.mview("store", frames, scene=scene, object=name, state=state)
+
+        for name, states in self._frame_states.items():
+            if name in self._streams:
+                continue
+            keyframes = {
+                frame
+                for _, frame, key_name, _ in self._loaded_scenes
+                if key_name == name
+            }
+            for frame, state in enumerate(states, start=1):
+                if frame not in keyframes:
+                    cmd.mview("store", frame, object=name, state=state)
+
+    def _store_camera_path(self, frames: int, method: str) -> None:
+        """Store the camera view of every frame, interpolated between the scene views.
+
+        Every frame becomes a camera keyframe, so showing a frame only looks up its view
+        instead of pymol interpolating it.
+
+        Args:
+            frames: The number of frames of the movie.
+            method: How the camera moves between scenes, one of `CAMERA_PATHS`.
+        """
+        scene_frames = {
+            frame: scene for scene, frame, name, _ in self._loaded_scenes if not name
+        }
+        keyframes = [
+            (frame, self._scene_views[scene]) for frame, scene in scene_frames.items()
+        ]
+        # Like the scene keyframes, the last view is kept up to the last frame
+        last_frame = max(scene_frames)
+        if last_frame < frames:
+            keyframes.append((frames, self._scene_views[scene_frames[last_frame]]))
+
+        cache_dir = self._camera_cache_dir and str(
+            Path(self._camera_cache_dir) / "camera"
+        )
+        views = camera.cached_camera_path(keyframes, frames, method, cache_dir)
+        camera.apply_camera_path(views, scene_frames)
+
+    def _produce(self, produce_dict: Dict[str, Any]) -> None:
+        """Save the movie as a session or render it.
 
-        if (produce := produce_dict.get("produce")) and produce == "mpg":
+        Args:
+            produce_dict: Nested dictionary containing produce movie information.
+        """
+        if (produce := produce_dict.get("produce")) and produce in encoding.CODECS:
             self._clean_produce_dict(produce_dict)
-            cmd.movie.produce(
-                f'{produce_dict["filename"]}.mpg',
-                preserve=0,
-                encoder="ffmpeg",
-                quality=produce_dict["quality"],
-                width=produce_dict["width"],
-                height=produce_dict["height"],
-            )
+            frame_cache = None
+            if cache_dir := produce_dict.get("cache_dir"):
+                frame_cache = FrameCache(cache_dir, produce_dict.get("cache_mb"))
+
+            workers = produce_dict.get("workers")
+            if produce_dict["mode"] == "tiled" and not (workers and workers > 1):
+                if not self._streams:
+                    self._produce_tiled_movie(produce_dict, frame_cache)
+                    return
+                print(
+                    "produce: streamed objects can not be rendered as tiles. The frames will be "
+                    "ray traced whole."
+                )
+            self._render_movie(produce_dict, frame_cache)
         else:
             cmd.save(f'{produce_dict["filename"]}.pse')
 
+    def _render_movie(
+        self, produce_dict: Dict[str, Any], frame_cache: Optional[FrameCache] = None
+    ) -> None:
+        """Render the movie frames and encode them.
+
+        Args:
+            produce_dict: Nested dictionary containing produce movie information.
+            frame_cache: Cache of rendered frames. Cached frames are not rendered again.
+        """
+        if produce_dict.get("resume"):
+            self._produce_resumable_movie(produce_dict, frame_cache)
+            return
+        if (workers := produce_dict.get("workers")) and workers > 1:
+            if not self._streams:
+                self._produce_parallel_movie(produce_dict, workers, frame_cache)
+                return
+            print(
+                "produce: workers can not be used with streamed objects. The movie will be "
+                "rendered in this process."
+            )
+        self._produce_piped_movie(produce_dict, frame_cache)
+
+    def _produce_tiled_movie(
+        self, produce_dict: Dict[str, Any], frame_cache: Optional[FrameCache] = None
+    ) -> None:
+        """Render the movie with every frame ray traced as tiles in parallel processes.
+
+        The current session is saved and loaded by each tile worker process.
+
+        Args:
+            produce_dict: Nested dictionary containing produce movie information.
+            frame_cache: Cache of rendered frames. Cached frames are not rendered again.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            session = f"{directory}/session.pse"
+            cmd.save(session)
+            with tiles.use_tile_renderer(
+                tiles.TileRenderer(session, produce_dict.get("tiles"))
+            ):
+                self._render_movie(produce_dict, frame_cache)
+
+    def _produce_piped_movie(
+        self, produce_dict: Dict[str, Any], frame_cache: Optional[FrameCache] = None
+    ) -> None:
+        """Render the movie frames and pipe them straight into the encoder.
+
+        Streamed objects are set to their planned state before each frame.
+
+        Args:
+            produce_dict: Nested dictionary containing produce movie information.
+            frame_cache: Cache of rendered frames. Cached frames are not rendered again.
+        """
+        try:
+            render.pipe_frames(
+                f'{produce_dict["filename"]}.{produce_dict["produce"]}',
+                range(1, produce_dict["frames"] + 1),
+                produce_dict,
+                before_frame=self._show_streamed_states if self._streams else None,
+                frame_cache=frame_cache,
+                fingerprint=lambda frame: self.frame_fingerprint(frame, produce_dict),
+            )
+        finally:
+            for _, window in self._streams.values():
+                window.close()
+            if frame_cache:
+                self._finish_frame_cache(frame_cache)
+
+    def _produce_parallel_movie(
+        self,
+        produce_dict: Dict[str, Any],
+        workers: int,
+        frame_cache: Optional[FrameCache] = None,
+    ) -> None:
+        """Render the movie frames in parallel processes and encode them.
+
+        The current session is saved and rendered by each worker process.
+
+        Args:
+            produce_dict: Nested dictionary containing produce movie information.
+            workers: The number of render processes.
+            frame_cache: Cache of rendered frames. Cached frames are not rendered again.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            # Frames found in the frame cache are copied instead of rendered
+            frames = []
+            fingerprints = {}
+            for frame in range(1, produce_dict["frames"] + 1):
+                if frame_cache:
+                    cmd.frame(frame)
+                    fingerprints[frame] = self.frame_fingerprint(frame, produce_dict)
+                    if (data := frame_cache.get(fingerprints[frame])) is not None:
+                        render.frame_path(directory, frame).write_bytes(data)
+                        continue
+                frames.append(frame)
+
+            session = f"{directory}/session.pse"
+            cmd.save(session)
+            render.render_session(session, directory, produce_dict, workers, frames)
+            if frame_cache:
+                for frame in frames:
+                    frame_cache.put(
+                        fingerprints[frame],
+                        render.frame_path(directory, frame).read_bytes(),
+                    )
+                self._finish_frame_cache(frame_cache)
+
+            render.encode_frames(
+                directory,
+                f'{produce_dict["filename"]}.{produce_dict["produce"]}',
+                produce_dict,
+            )
+
+    def _produce_resumable_movie(
+        self, produce_dict: Dict[str, Any], frame_cache: Optional[FrameCache] = None
+    ) -> None:
+        """Render the movie frames to a directory next to the movie and encode them.
+
+        Completed frames are recorded in a manifest in the directory. If the render is stopped,
+        producing the movie again validates the frames already rendered and only renders the
+        missing frames. The directory is deleted once the movie is encoded.
+
+        Args:
+            produce_dict: Nested dictionary containing produce movie information.
+            frame_cache: Cache of rendered frames. Cached frames are not rendered again.
+
+        Raises:
+            ValueError: If the frames were rendered with a different configuration.
+        """
+        directory = Path(f'{produce_dict["filename"]}_frames')
+        directory.mkdir(exist_ok=True)
+        manifest = RenderManifest(
+            directory / "manifest.jsonl", self.config_hash(produce_dict)
+        )
+        completed = manifest.completed(directory)
+        missing = [
+            frame
+            for frame in range(1, produce_dict["frames"] + 1)
+            if frame not in completed
+        ]
+        print(
+            f"resume: {len(completed)} frames already rendered, {len(missing)} frames to "
+            "render"
+        )
+
+        try:
+            workers = produce_dict.get("workers")
+            if workers and workers > 1 and not self._streams:
+                session = directory / "session.pse"
+                cmd.save(str(session))
+                # Frames are recorded as each range finishes, so a stopped render keeps them
+                for frames, paths in render.iter_render_session(
+                    session,
+                    directory,
+                    produce_dict,
+                    workers,
+                    missing,
+                    max(workers, math.ceil(len(missing) / RESUME_PART_FRAMES)),
+                ):
+                    for frame, path in zip(frames, paths):
+                        manifest.add(frame, path.read_bytes())
+            else:
+                for frame in range(1, produce_dict["frames"] + 1):
+                    render.show_frame(frame)
+                    if self._streams:
+                        self._show_streamed_states(frame)
+                    if frame in completed:
+                        continue
+                    data = render.render_cached_frame(
+                        frame,
+                        produce_dict,
+                        frame_cache,
+                        lambda frame: self.frame_fingerprint(frame, produce_dict),
+                    )
+                    render.frame_path(directory, frame).write_bytes(data)
+                    manifest.add(frame, data)
+        finally:
+            for _, window in self._streams.values():
+                window.close()
+            if frame_cache:
+                self._finish_frame_cache(frame_cache)
+
+        render.encode_frames(
+            directory,
+            f'{produce_dict["filename"]}.{produce_dict["produce"]}',
+            produce_dict,
+        )
+        shutil.rmtree(directory)
+
+    def config_hash(self, produce_dict: Dict[str, Any]) -> str:
+        """Hash the configuration of the movie.
+
+        The hash covers the produce settings that change the rendered frames, the scenes, the
+        planned object states and the coordinates of every loaded object state.
+
+        Args:
+            produce_dict: Nested dictionary containing produce movie information.
+
+        Returns:
+            A hex digest of the configuration.
+        """
+        config = {
+            "produce": {
+                key: value
+                for key, value in produce_dict.items()
+                if key
+                not in (
+                    "workers",
+                    "tiles",
+                    "encoders",
+                    "cache_dir",
+                    "cache_mb",
+                    "resume",
+                )
+            },
+            "scenes": self._scene_dicts,
+            "frame_states": self._frame_states,
+        }
+        digest = hashlib.sha1(json.dumps(config, sort_keys=True, default=str).encode())
+        for name in sorted(cmd.get_names("public_objects")):
+            digest.update(name.encode())
+            if name not in self._streams:
+                for state in range(1, cmd.count_states(name) + 1):
+                    digest.update(self._state_hash(name, state).encode())
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def _finish_frame_cache(frame_cache: FrameCache) -> None:
+        """Evict old frames from the frame cache and print its hit rate.
+
+        Args:
+            frame_cache: Cache of rendered frames.
+        """
+        frame_cache.evict()
+        print(
+            f"frame cache: {frame_cache.hits} frames reused, "
+            f"{frame_cache.misses} frames rendered"
+        )
+
+    def frame_fingerprint(self, frame: int, produce_dict: Dict[str, Any]) -> str:
+        """Fingerprint the inputs that affect how a frame is rendered.
+
+        The fingerprint covers the render settings, the camera view, the scenes up to the next
+        scene after the frame and the coordinates of the states every enabled object can show
+        at the frame. Must be called while the movie is at the frame.
+
+        Args:
+            frame: The current frame.
+            produce_dict: Nested dictionary containing produce movie information.
+
+        Returns:
+            A hex digest of the frame inputs.
+        """
+        next_scene = min(
+            (
+                scene_dict["frame"]
+                for scene_dict in self._scene_dicts
+                if scene_dict["frame"] > frame
+            ),
+            default=frame,
+        )
+        inputs = {
+            "render": [produce_dict[key] for key in ("width", "height", "mode")],
+            "view": [round(value, 4) + 0.0 for value in cmd.get_view()],
+            "scenes": [
+                scene_dict
+                for scene_dict in self._scene_dicts
+                if scene_dict["frame"] <= next_scene
+            ],
+            "objects": {
+                name: [
+                    self._state_hash(name, state)
+                    for state in self._frame_object_states(name, frame)
+                ]
+                for name in cmd.get_names("public_objects", enabled_only=1)
+            },
+        }
+
+        return hashlib.sha1(
+            json.dumps(inputs, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def _frame_object_states(self, name: str, frame: int) -> List[int]:
+        """Get the states an object can show at a frame.
+
+        Args:
+            name: Name of the object.
+            frame: The frame.
+
+        Returns:
+            The planned state, or the states around the state interpolated between scenes.
+        """
+        if name in self._streams:
+            return [1]
+        if name in self._frame_states:
+            return [self._frame_states[name][frame - 1]]
+
+        keyframes = sorted(
+            (key_frame, state)
+            for _, key_frame, key_name, state in self._loaded_scenes
+            if key_name == name
+        )
+        if not keyframes:
+            return [1]
+
+        state = planning.interpolate_state(keyframes, frame)
+        return list(range(math.floor(state), math.ceil(state) + 1))
+
+    def _state_hash(self, name: str, state: int) -> str:
+        """Hash the coordinates of an object state.
+
+        Hashes of streamed objects are not stored as their coordinates change every frame.
+
+        Args:
+            name: Name of the object.
+            state: The state.
+
+        Returns:
+            A hex digest of the coordinates.
+        """
+        if (name, state) in self._state_hashes:
+            return self._state_hashes[(name, state)]
+
+        coords = cmd.get_coordset(name, state)
+        digest = hashlib.sha1(b"" if coords is None else coords.tobytes()).hexdigest()
+        if name not in self._streams:
+            self._state_hashes[(name, state)] = digest
+
+        return digest
+
+    def _show_streamed_states(self, frame: int) -> None:
+        """Set streamed objects to their planned state at a frame.
+
+        Args:
+            frame: The frame about to be rendered.
+        """
+        for name, (object_loader, window) in self._streams.items():
+            object_loader.show_state(window, self._frame_states[name][frame - 1])
+
     def setup_scene(self, scene_dict: Dict[str, Any]) -> None:
         """Set PyMol movie scene.
 
@@ -114,86 +870,52 @@ class MovieMaker:
         Args:
             scene_dict: Nested dictionary containing scene information.
         """
-        cmd.scene(key=str(scene_dict["scene"]), action="store")
+        self.setup_scene_plan(actions.compile_scene(scene_dict))
 
-        # Setup objects
-        for object_dict in scene_dict["objects"]:
-            if actions := object_dict.get("actions"):
-                self._setup_model(object_dict["name"], actions)
+    def setup_scene_plan(self, scene_plan: actions.ScenePlan) -> None:
+        """Set PyMol movie scene from a scene with compiled actions.
+
+        Args:
+            scene_plan: The scene and its bound object and camera actions.
+        """
+        scene_dict = scene_plan.scene_dict
+        with self._profiler.phase("scene store", "scene"):
+            cmd.scene(key=str(scene_dict["scene"]), action="store")
+        self._scene_views[str(scene_dict["scene"])] = list(cmd.get_view())
+        self._scene_dicts.append(copy.deepcopy(scene_dict))
 
+        # Setup objects
+        for (name, action_calls), object_dict in zip(
+            scene_plan.objects, scene_dict["objects"]
+        ):
+            self._run_actions(action_calls, "action")
             self._loaded_scenes.append(
                 (
                     str(scene_dict["scene"]),
                     scene_dict["frame"],
-                    object_dict["name"],
+                    name,
                     object_dict["state"],
                 )
             )
 
         # Setup camera
-        if camera_dict := scene_dict.get("camera"):
-            self._setup_camera(camera_dict)
+        self._run_actions(scene_plan.camera, "camera")
 
         self._loaded_scenes.append(
             (str(scene_dict["scene"]), scene_dict["frame"], "", 0)
         )
+        self._selection_cache.release(len(self._scene_dicts) - 1)
 
-    def _setup_camera(self, camera_dicts: List[dict]) -> None:
-        """Set camera actions for movie scene.
+    def _run_actions(
+        self, action_calls: List[actions.ActionCall], category: str
+    ) -> None:
+        """Perform bound actions in order.
 
         Args:
-            camera_dicts: A list of dictionaries containing camera action information.
+            action_calls: The bound actions.
+            category: Category the actions are profiled under.
         """
-        for camera_action in camera_dicts:
-            choice = list(camera_action.keys())[0]
-            details = list(camera_action.values())[0]
-
-            # Camera actions
-            if choice == "turn":
-                cmd.turn(details["axis"], details["angle"])
-            elif choice == "move":
-                cmd.move(details["axis"], details["magnitude"])
-            elif choice == "zoom":
-                cmd.zoom(details["selection"], animate=-1)
-            elif choice == "orient":
-                cmd.orient(details["selection"])
-
-            else:
-                print(f'The choice "{choice}" is not recognized.')
-
-    def _setup_model(self, name: str, action_dicts: List[dict]) -> None:
-        """Set model actions for movie scene.
-
-        Args:
-            name: Name of the model to perform actions.
-            action_dicts: A list of dictionaries containing camera action information.
-        """
-        for action in action_dicts:
-            choice = list(action.keys())[0]
-            details = list(action.values())[0]
-
-            # Basic model actions
-            if choice == "color":
-                cmd.color(details["color"], f'{name} and {details["selection"]}')
-            elif choice == "representation":
-                cmd.show_as(
-                    details["representation"], f'{name} and {details["selection"]}'
-                )
-            elif choice == "rotate":
-                cmd.rotate(
-                    details["axis"],
-                    details["angle"],
-                    f'{name} and {details["selection"]}',
-                )
-            elif choice == "translate":
-                cmd.translate(details["vector"], f'{name} and {details["selection"]}')
-
-            # Presets
-            elif choice == "surface_sticks":
-                cmd.hide(selection=f"{name}")
-                cmd.show("surface", f'{name} and {details["selection"]}')
-                cmd.show("sticks", f'{name} and {details["selection"]}')
-                cmd.set("transparency", 0.5, f'{name} and {details["selection"]}')
-
-            else:
-                print(f'The choice "{choice}" is not recognized.')
+        with use_selection_cache(self._selection_cache):
+            for action_call in action_calls:
+                with self._profiler.phase(action_call.choice, category):
+                    action_call.call()
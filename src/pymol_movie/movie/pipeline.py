@@ -0,0 +1,114 @@
+"""Load the states of many objects concurrently."""
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+from .archives import FRAMES_AHEAD
+from .loaders import ObjectLoader
+
+
+class ObjectLoad(NamedTuple):
+    """Time spent loading an object concurrently with the other objects.
+
+    `wall_s` is the time from the start of loading until the last state of the object was
+    inserted and `insert_s` the part of it spent inserting states into the pymol session.
+    """
+
+    name: str
+    states: int
+    wall_s: float
+    insert_s: float
+
+
+def load_concurrently(
+    loads: Sequence[Tuple[ObjectLoader, Sequence[int]]],
+    workers: Optional[int] = None,
+) -> List[ObjectLoad]:
+    """Load states of many objects, overlapping reading, parsing and inserting.
+
+    The files of every object are read in a thread of their own and pdb files are parsed in a
+    shared process pool, while the parsed states of all objects are inserted into the pymol
+    session from this thread as they arrive. A bounded queue between the threads and the
+    session limits the parsed states held in memory.
+
+    Args:
+        loads: Loaders and the sorted states to load with each.
+        workers: Number of processes parsing pdb files. If None every object contributes its
+            `workers`, or one process.
+
+    Returns:
+        The time spent loading each object.
+    """
+    loads = [(loader, states) for loader, states in loads if states]
+    if not loads:
+        return []
+    if workers is None:
+        workers = sum(loader.workers or 1 for loader, _ in loads)
+
+    start = time.perf_counter()
+    wall_s = [0.0] * len(loads)
+    insert_s = [0.0] * len(loads)
+    inserts: "queue.Queue[Any]" = queue.Queue(maxsize=FRAMES_AHEAD * len(loads))
+    stop = threading.Event()
+
+    def put(item: Any) -> None:
+        while not stop.is_set():
+            try:
+                inserts.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    # Spawned workers do not inherit the locks held by the reading threads
+    context = multiprocessing.get_context("spawn")
+    with ThreadPoolExecutor(max_workers=len(loads)) as threads, ProcessPoolExecutor(
+        max_workers=workers, mp_context=context
+    ) as executor:
+
+        def produce(index: int) -> None:
+            loader, states = loads[index]
+            try:
+                for state, coords in zip(
+                    states, loader.iter_coordinates(states, executor)
+                ):
+                    if stop.is_set():
+                        return
+                    put((index, state, coords))
+                put((index, None, None))
+            except Exception as error:  # pylint: disable=broad-except
+                put(error)
+
+        # Topologies are read concurrently but the objects are created one at a time
+        topologies = [
+            threads.submit(loader.read_topology, states[0]) for loader, states in loads
+        ]
+        for (loader, states), topology in zip(loads, topologies):
+            loader.load_topology(states[0], topology.result())
+
+        for index in range(len(loads)):
+            threads.submit(produce, index)
+
+        remaining = len(loads)
+        try:
+            while remaining:
+                item = inserts.get()
+                if isinstance(item, Exception):
+                    raise item
+                index, state, coords = item
+                if state is None:
+                    remaining -= 1
+                    wall_s[index] = time.perf_counter() - start
+                    continue
+                insert_start = time.perf_counter()
+                loads[index][0].insert_state(state, coords)
+                insert_s[index] += time.perf_counter() - insert_start
+        finally:
+            stop.set()
+
+    return [
+        ObjectLoad(loader.name, len(states), wall_s[index], insert_s[index])
+        for index, (loader, states) in enumerate(loads)
+    ]
@@ -0,0 +1,159 @@
+"""Functions for planning which object states a movie shows.
+
+These functions do not use the pymol api.
+"""
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from .encoding import CODECS
+
+
+def scene_keyframes(
+    scene_dicts: List[Dict[str, Any]]
+) -> Dict[str, List[Tuple[int, int]]]:
+    """Collect the (frame, state) keyframes of every object from the scenes.
+
+    Args:
+        scene_dicts: A list of dictionaries containing scene information.
+
+    Returns:
+        A dictionary of object name to keyframes sorted by frame.
+    """
+    keyframes: Dict[str, List[Tuple[int, int]]] = {}
+    for scene_dict in scene_dicts:
+        for object_dict in scene_dict["objects"]:
+            keyframes.setdefault(object_dict["name"], []).append(
+                (scene_dict["frame"], object_dict["state"])
+            )
+
+    return {name: sorted(keys) for name, keys in keyframes.items()}
+
+
+def interpolate_state(keyframes: List[Tuple[int, int]], frame: float) -> float:
+    """Linearly interpolate the state of an object between keyframes.
+
+    Before the first and after the last keyframe the state is held.
+
+    Args:
+        keyframes: (frame, state) keyframes sorted by frame.
+        frame: Frame to interpolate the state at.
+
+    Returns:
+        The interpolated state.
+    """
+    if frame <= keyframes[0][0]:
+        return keyframes[0][1]
+
+    for (start_frame, start_state), (end_frame, end_state) in zip(
+        keyframes, keyframes[1:]
+    ):
+        if frame <= end_frame:
+            progress = (frame - start_frame) / (end_frame - start_frame)
+            return start_state + (end_state - start_state) * progress
+
+    return keyframes[-1][1]
+
+
+def plan_frame_states(
+    scene_dicts: List[Dict[str, Any]],
+    frames: int,
+    stride: int = 1,
+    states_per_frame: Optional[float] = None,
+) -> Dict[str, List[int]]:
+    """Plan the state every object shows at each frame of the movie.
+
+    States are interpolated between the scene keyframes the same way the movie interpolates
+    them. Keyframe states are always shown at their keyframe.
+
+    Args:
+        scene_dicts: A list of dictionaries containing scene information.
+        frames: The number of frames of the movie.
+        stride: Only show every nth state of the trajectory.
+        states_per_frame: The maximum number of new states per frame. For example 0.5 holds
+            each state for two frames. If None a new state can be shown every frame.
+
+    Returns:
+        A dictionary of object name to the state at frames 1 to `frames`.
+    """
+    hold = max(1, math.ceil(1 / states_per_frame)) if states_per_frame else 1
+    frame_states = {}
+    for name, keyframes in scene_keyframes(scene_dicts).items():
+        key_states = dict(keyframes)
+        min_state, max_state = min(key_states.values()), max(key_states.values())
+        states = []
+        for frame in range(1, frames + 1):
+            if frame in key_states:
+                states.append(key_states[frame])
+                continue
+
+            state = interpolate_state(keyframes, 1 + (frame - 1) // hold * hold)
+            state = 1 + round((state - 1) / stride) * stride
+            states.append(min(max(state, min_state), max_state))
+        frame_states[name] = states
+
+    return frame_states
+
+
+def plan_states(
+    scene_dicts: List[Dict[str, Any]],
+    frames: int,
+    stride: int = 1,
+    states_per_frame: Optional[float] = None,
+) -> Dict[str, List[int]]:
+    """Plan which states of every object the movie shows.
+
+    Args:
+        scene_dicts: A list of dictionaries containing scene information.
+        frames: The number of frames of the movie.
+        stride: Only show every nth state of the trajectory.
+        states_per_frame: The maximum number of new states per frame.
+
+    Returns:
+        A dictionary of object name to the sorted states to load.
+    """
+    return {
+        name: sorted(set(states))
+        for name, states in plan_frame_states(
+            scene_dicts, frames, stride, states_per_frame
+        ).items()
+    }
+
+
+def is_streamed(config: Dict[str, Any]) -> bool:
+    """Check whether any object of a configuration streams its states.
+
+    Args:
+        config: Nested dictionary of the .yaml configuration.
+
+    Returns:
+        True if a movie is rendered and an object has a state window.
+    """
+    return config["produce"].get("produce") in CODECS and any(
+        "window_states" in object_dict or "window_mb" in object_dict
+        for object_dict in config["setup"]["objects"]
+    )
+
+
+def plan_config_frame_states(config: Dict[str, Any]) -> Optional[Dict[str, List[int]]]:
+    """Plan the state every object shows at each frame if the configuration needs a plan.
+
+    States are planned if the setup has a `state_plan` or objects are streamed.
+
+    Args:
+        config: Nested dictionary of the .yaml configuration.
+
+    Returns:
+        A dictionary of object name to the state at each frame or None if states are not
+        planned.
+    """
+    state_plan = config["setup"].get("state_plan")
+    if state_plan is None and not is_streamed(config):
+        return None
+
+    state_plan = state_plan or {}
+    return plan_frame_states(
+        config["scenes"],
+        config["produce"]["frames"],
+        stride=state_plan.get("stride", 1),
+        states_per_frame=state_plan.get("states_per_frame"),
+    )
@@ -0,0 +1,107 @@
+"""Functions for rendering quick low resolution previews of a movie."""
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+from . import render
+from .lazy import cmd
+
+# Settings that make rendering cheaper at the cost of quality
+PREVIEW_SETTINGS = {
+    "surface_quality": -1,
+    "cartoon_sampling": 2,
+    "sphere_quality": 0,
+    "stick_quality": 4,
+    "antialias": 0,
+}
+
+
+@contextmanager
+def preview_settings() -> Iterator[None]:
+    """Use cheap representation settings, restoring the previous settings on exit."""
+    previous = {name: cmd.get(name) for name in PREVIEW_SETTINGS}
+    for name, value in PREVIEW_SETTINGS.items():
+        cmd.set(name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            cmd.set(name, value)
+
+
+def preview_produce_dict(
+    produce_dict: Dict[str, Any], stride: int, scale: float
+) -> Dict[str, Any]:
+    """Scale down a produce dictionary for a preview.
+
+    Args:
+        produce_dict: Nested dictionary containing produce movie information.
+        stride: Only every nth frame is rendered. The frame rate is divided by the stride so
+            the preview plays as long as the movie.
+        scale: Fraction of the width and height to render at.
+
+    Returns:
+        The produce dictionary of the preview, never ray traced.
+    """
+    return {
+        **produce_dict,
+        # Sizes are kept even for the encoder
+        "width": max(16, round(produce_dict["width"] * scale / 2) * 2),
+        "height": max(16, round(produce_dict["height"] * scale / 2) * 2),
+        "framerate": max(1, round(produce_dict["framerate"] / stride)),
+        "mode": "fast",
+    }
+
+
+def refinement_passes(
+    stride: int, scale: float, refine: bool
+) -> List[Tuple[int, float]]:
+    """Plan the (stride, scale) of every preview pass.
+
+    The first pass renders every nth frame at the preview scale. Refining fills in the skipped
+    frames and then doubles the resolution each pass up to the full size.
+
+    Args:
+        stride: Only every nth frame is rendered in the first pass.
+        scale: Fraction of the width and height of the first pass.
+        refine: Whether to plan refinement passes.
+
+    Returns:
+        The stride and scale of every pass.
+    """
+    passes = [(stride, scale)]
+    if not refine:
+        return passes
+
+    if stride > 1:
+        passes.append((1, scale))
+    while scale < 1:
+        scale = min(1.0, scale * 2)
+        passes.append((1, scale))
+    return passes
+
+
+def encode_preview(
+    filename: str, frames: Dict[int, bytes], produce_dict: Dict[str, Any]
+) -> None:
+    """Encode rendered frames in order and replace the preview movie.
+
+    The movie is encoded to a temporary file first, so a player never reads a partly written
+    preview. The temporary file is removed if encoding fails.
+
+    Args:
+        filename: Filepath of the preview movie.
+        frames: The contents of a png file of every rendered frame.
+        produce_dict: Nested dictionary containing produce preview information.
+    """
+    root, extension = os.path.splitext(filename)
+    partial = f"{root}.part{extension}"
+    try:
+        with render.FrameEncoder(render.pipe_command(partial, produce_dict)) as encoder:
+            for frame in sorted(frames):
+                encoder.write(frames[frame])
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    os.replace(partial, filename)
@@ -0,0 +1,180 @@
+"""Profiler recording the time and memory of movie phases as a chrome trace.
+
+The profiler does not use the pymol api.
+"""
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+
+def peak_rss_mb() -> float:
+    """Get the peak resident set size of this process since it started.
+
+    Returns:
+        The peak resident set size in MB.
+    """
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 2**20 if sys.platform == "darwin" else maxrss / 1024
+
+
+def _children_cpu() -> float:
+    """Get the cpu time of finished child processes.
+
+    Returns:
+        The user and system time of child processes in seconds.
+    """
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+class Profiler:
+    """Record the wall time, cpu time and peak memory of nested phases.
+
+    Phases are recorded as complete events of the chrome trace event format, which can be
+    opened in chrome://tracing or https://ui.perfetto.dev. A disabled profiler records nothing.
+    The peak memory of the process can only grow, so a phase records how much it raised the
+    peak and the trace records the peak of the whole process.
+
+    Attributes:
+        _origin: Time the profiler was created.
+        enabled: Whether phases are recorded.
+        events: Recorded chrome trace events.
+        stats: Additional statistics written with the trace.
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        """Initialize the instance.
+
+        Args:
+            enabled: Whether phases are recorded.
+        """
+        self._origin = time.perf_counter()
+        self.enabled = enabled
+        self.events: List[Dict[str, Any]] = []
+        self.stats: Dict[str, Any] = {}
+
+    @contextmanager
+    def phase(self, name: str, category: str = "phase", **args: Any) -> Iterator[None]:
+        """Record a phase.
+
+        Args:
+            name: Name of the phase.
+            category: Category of the phase, for example "phase" or "action".
+            args: Additional information stored with the phase.
+
+        Yields:
+            None while the phase runs.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        children_cpu_start = _children_cpu()
+        peak_start = peak_rss_mb()
+        try:
+            yield
+        finally:
+            self.record(
+                name,
+                category,
+                start,
+                time.perf_counter() - start,
+                cpu_s=time.process_time() - cpu_start,
+                children_cpu_s=_children_cpu() - children_cpu_start,
+                peak_growth_mb=peak_rss_mb() - peak_start,
+                **args,
+            )
+
+    def record(
+        self,
+        name: str,
+        category: str,
+        start: float,
+        wall: float,
+        cpu_s: float = 0.0,
+        children_cpu_s: float = 0.0,
+        peak_growth_mb: Optional[float] = None,
+        **args: Any,
+    ) -> None:
+        """Record a phase that has been timed already, such as a phase run concurrently.
+
+        Args:
+            name: Name of the phase.
+            category: Category of the phase.
+            start: `time.perf_counter` time the phase started.
+            wall: Wall time of the phase in seconds.
+            cpu_s: Cpu time of this process spent in the phase.
+            children_cpu_s: Cpu time of child processes spent in the phase.
+            peak_growth_mb: How much the phase raised the peak memory of the process in MB. If
+                None it is not recorded, as for phases run concurrently.
+            args: Additional information stored with the phase.
+        """
+        if not self.enabled:
+            return
+        if peak_growth_mb is not None:
+            args["peak_rss_growth_mb"] = peak_growth_mb
+
+        self.events.append(
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (start - self._origin) * 1e6,
+                "dur": wall * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": {
+                    "wall_s": wall,
+                    "cpu_s": cpu_s,
+                    "children_cpu_s": children_cpu_s,
+                    **args,
+                },
+            }
+        )
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Total the recorded phases by category and name.
+
+        Returns:
+            A dictionary of "category:name" to the count, wall time and cpu time of the phases.
+        """
+        summary: Dict[str, Dict[str, float]] = {}
+        for event in self.events:
+            totals = summary.setdefault(
+                f'{event["cat"]}:{event["name"]}',
+                {"count": 0, "wall_s": 0.0, "cpu_s": 0.0},
+            )
+            totals["count"] += 1
+            totals["wall_s"] += event["args"]["wall_s"]
+            totals["cpu_s"] += event["args"]["cpu_s"] + event["args"]["children_cpu_s"]
+
+        return summary
+
+    def write(self, filepath: Union[str, os.PathLike]) -> None:
+        """Write the recorded phases as a chrome trace json file.
+
+        Args:
+            filepath: Filepath of the trace.
+        """
+        with open(filepath, "w", encoding="utf-8") as trace_file:
+            json.dump(
+                {
+                    "traceEvents": self.events,
+                    "displayTimeUnit": "ms",
+                    "otherData": {
+                        "summary": self.summary(),
+                        "process_peak_rss_mb": peak_rss_mb(),
+                        **self.stats,
+                    },
+                },
+                trace_file,
+                indent=1,
+            )
@@ -0,0 +1,566 @@
+"""Trajectory readers for multi-frame trajectory files.
+
+Readers do not use the pymol api. They memory-map the trajectory file, index the frames and
+only parse a frame when it is read.
+"""
+import mmap
+import re
+import struct
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+import numpy as np
+
+from .coordinates import parse_pdb_coordinates_bytes
+
+READERS: Dict[str, Type["TrajectoryReader"]] = {}
+
+
+def register_reader(
+    suffix: str,
+) -> Callable[[Type["TrajectoryReader"]], Type["TrajectoryReader"]]:
+    """Register a trajectory reader class for a file suffix.
+
+    Args:
+        suffix: File suffix handled by the reader e.g. ".dcd".
+
+    Returns:
+        A class decorator.
+    """
+
+    def decorator(reader: Type["TrajectoryReader"]) -> Type["TrajectoryReader"]:
+        READERS[suffix] = reader
+        return reader
+
+    return decorator
+
+
+def open_trajectory(
+    trajectory: str,
+    topology: Optional[str] = None,
+    start: Optional[int] = None,
+    stop: Optional[int] = None,
+    stride: Optional[int] = None,
+) -> "TrajectoryReader":
+    """Create a reader for a trajectory file based on its suffix.
+
+    Args:
+        trajectory: Filepath to trajectory file.
+        topology: Filepath to pdb file with the topology of the trajectory.
+        start: First frame to read. (0 indexed)
+        stop: Frame to stop reading at. (Exclusive)
+        stride: Read every nth frame.
+
+    Returns:
+        A trajectory reader.
+
+    Raises:
+        ValueError: If there is no reader for the trajectory file suffix.
+    """
+    suffix = Path(trajectory).suffix.lower()
+    if suffix not in READERS:
+        raise ValueError(
+            f'No trajectory reader for "{suffix}" files. Options: {", ".join(READERS)}.'
+        )
+
+    return READERS[suffix](trajectory, topology, start, stop, stride)
+
+
+def iter_frames(
+    reader: "TrajectoryReader", indices: Iterable[int], workers: Optional[int] = None
+) -> Iterator[np.ndarray]:
+    """Read the coordinates of selected frames in order.
+
+    Args:
+        reader: Trajectory reader.
+        indices: Indices of the frames in the selected frames.
+        workers: Number of processes used to read frames. If None frames are read in this
+            process.
+
+    Yields:
+        Coordinates of each frame.
+    """
+    if workers is None:
+        yield from map(reader.read, indices)
+        return
+
+    indices = list(indices)
+    chunksize = max(1, len(indices) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(reader.read, indices, chunksize=chunksize)
+
+
+class TrajectoryReader(ABC):
+    """Read frames of a trajectory on demand.
+
+    Frames are selected with `start`, `stop` and `stride` which work the same as a python slice.
+    The file is memory-mapped when it is first read and the map is not pickled, so a reader can
+    be sent to worker processes.
+
+    Attributes:
+        _map: Memory map of the trajectory file.
+        frames: Indices of the selected frames in the trajectory file.
+        topology: Filepath to pdb file with the topology of the trajectory.
+        trajectory: Filepath to trajectory file.
+    """
+
+    def __init__(
+        self,
+        trajectory: str,
+        topology: Optional[str] = None,
+        start: Optional[int] = None,
+        stop: Optional[int] = None,
+        stride: Optional[int] = None,
+    ) -> None:
+        """Initialize the instance and index the trajectory frames.
+
+        Args:
+            trajectory: Filepath to trajectory file.
+            topology: Filepath to pdb file with the topology of the trajectory.
+            start: First frame to read. (0 indexed)
+            stop: Frame to stop reading at. (Exclusive)
+            stride: Read every nth frame.
+
+        Raises:
+            ValueError: If the topology and trajectory do not have the same number of atoms.
+        """
+        self.trajectory = Path(trajectory)
+        self.topology = Path(topology) if topology else None
+        self._map: Optional[mmap.mmap] = None
+        self.frames = range(self._index())[start:stop:stride]
+
+        if self.topology and (atoms := self.atoms()) != (
+            topology_atoms := len(parse_pdb_coordinates_bytes(self.read_topology()))
+        ):
+            raise ValueError(
+                f"{self.trajectory} has {atoms} atoms but {self.topology} has "
+                f"{topology_atoms} atoms."
+            )
+
+    def __len__(self) -> int:
+        """Return number of selected frames."""
+        return len(self.frames)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Return state to pickle without the memory map."""
+        return {**self.__dict__, "_map": None}
+
+    @property
+    def map(self) -> mmap.mmap:
+        """Read only memory map of the trajectory file."""
+        if self._map is None:
+            with open(self.trajectory, "rb") as trajectory_file:
+                self._map = mmap.mmap(
+                    trajectory_file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+        return self._map
+
+    def read(self, index: int) -> np.ndarray:
+        """Read coordinates of a selected frame.
+
+        Args:
+            index: Index of the frame in the selected frames.
+
+        Returns:
+            A float32 array of shape (atoms, 3) in angstrom and topology file order.
+        """
+        return self._read_frame(self.frames[index])
+
+    def read_topology(self) -> bytes:
+        """Read pdb contents of the topology.
+
+        Returns:
+            Contents of the topology pdb file.
+
+        Raises:
+            ValueError: If the reader has no topology.
+        """
+        if self.topology is None:
+            raise ValueError(
+                f"A topology pdb file is required to read {self.trajectory}."
+            )
+        with open(self.topology, "rb") as topology_file:
+            return topology_file.read()
+
+    @abstractmethod
+    def atoms(self) -> int:
+        """Return number of atoms in each frame."""
+
+    @abstractmethod
+    def _index(self) -> int:
+        """Index the frames of the trajectory file.
+
+        Returns:
+            Total number of frames in the trajectory file.
+        """
+
+    @abstractmethod
+    def _read_frame(self, frame: int) -> np.ndarray:
+        """Read coordinates of a frame of the trajectory file.
+
+        Args:
+            frame: Index of the frame in the trajectory file.
+
+        Returns:
+            A float32 array of shape (atoms, 3) in angstrom.
+        """
+
+
+@register_reader(".pdb")
+class MultiModelPDBReader(TrajectoryReader):
+    """Read frames from the MODEL records of a single pdb file.
+
+    If no topology is given the first model is used as topology.
+
+    Attributes:
+        _offsets: Byte offsets of each model and the end of the last model.
+    """
+
+    _offsets: List[int]
+
+    def atoms(self) -> int:
+        """Return number of atoms in each frame."""
+        return len(self._read_frame(0))
+
+    def read_topology(self) -> bytes:
+        """Read pdb contents of the topology.
+
+        Returns:
+            Contents of the topology pdb file, or the header and first model of the trajectory.
+        """
+        if self.topology:
+            return super().read_topology()
+        return self.map[: self._offsets[1]]
+
+    def _index(self) -> int:
+        self._offsets = [
+            match.start() for match in re.finditer(rb"^MODEL ", self.map, re.M)
+        ]
+        if not self._offsets:
+            self._offsets = [0]
+        self._offsets.append(len(self.map))
+        return len(self._offsets) - 1
+
+    def _read_frame(self, frame: int) -> np.ndarray:
+        start, end = self._offsets[frame], self._offsets[frame + 1]
+        return parse_pdb_coordinates_bytes(self.map[start:end])
+
+
+@register_reader(".dcd")
+class DCDReader(TrajectoryReader):
+    """Read frames from a CHARMM/NAMD dcd file.
+
+    Every frame of a dcd file has the same size, so the frames are a strided float32 view of the
+    memory map.
+
+    Attributes:
+        _frames: Float32 view of the frame block with one row per frame.
+        _xyz_columns: Row indices of the x, y and z coordinates in a frame.
+        _atoms: Number of atoms in each frame.
+    """
+
+    _frames: np.ndarray
+    _xyz_columns: np.ndarray
+    _atoms: int
+
+    def atoms(self) -> int:
+        """Return number of atoms in each frame."""
+        return self._atoms
+
+    def _index(self) -> int:
+        endian = "<" if struct.unpack("<i", self.map[:4])[0] == 84 else ">"
+        if (
+            struct.unpack(f"{endian}i", self.map[:4])[0] != 84
+            or self.map[4:8] != b"CORD"
+        ):
+            raise ValueError(f"{self.trajectory} is not a dcd file.")
+
+        control = struct.unpack(f"{endian}20i", self.map[8:88])
+        if control[8]:
+            raise ValueError(
+                f"{self.trajectory} has fixed atoms which are not supported."
+            )
+        charmm = control[19] != 0
+        unit_cell = charmm and control[10] != 0
+        four_dims = charmm and control[11] != 0
+
+        title_size = struct.unpack(f"{endian}i", self.map[92:96])[0]
+        offset = 96 + title_size + 4
+        self._atoms = struct.unpack_from(f"{endian}i", self.map, offset + 4)[0]
+        offset += 12
+
+        # A record is a 4 byte size marker, the data and a 4 byte size marker
+        cell_size = 14 if unit_cell else 0
+        axis_size = self._atoms + 2
+        frame_size = cell_size + axis_size * (4 if four_dims else 3)
+        self._xyz_columns = (
+            cell_size
+            + 1
+            + axis_size * np.arange(3)[:, np.newaxis]
+            + np.arange(self._atoms)
+        )
+        frames = (len(self.map) - offset) // (frame_size * 4)
+        self._frames = np.ndarray(
+            (frames, frame_size), dtype=f"{endian}f4", buffer=self.map, offset=offset
+        )
+        return frames
+
+    def _read_frame(self, frame: int) -> np.ndarray:
+        xyz = self._frames[frame][self._xyz_columns]
+        return np.ascontiguousarray(xyz.T, dtype=np.float32)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Return state to pickle without the memory map."""
+        return {**super().__getstate__(), "_frames": None}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        """Restore pickled state and index the memory map again."""
+        self.__dict__.update(state)
+        self._index()
+
+
+@register_reader(".xtc")
+class XTCReader(TrajectoryReader):
+    """Read frames from a GROMACS xtc file.
+
+    The frame headers are indexed when the reader is created and a frame is only decompressed
+    when it is read.
+
+    Attributes:
+        _offsets: Byte offset of each frame.
+        _atoms: Number of atoms in each frame.
+    """
+
+    _offsets: List[int]
+    _atoms: int
+
+    def atoms(self) -> int:
+        """Return number of atoms in each frame."""
+        return self._atoms
+
+    def _index(self) -> int:
+        self._offsets = []
+        self._atoms = 0
+        offset = 0
+        while offset + 56 <= len(self.map):
+            magic, atoms = struct.unpack_from(">2i", self.map, offset)
+            if magic != 1995:
+                raise ValueError(
+                    f"{self.trajectory} has a corrupt frame at byte {offset}."
+                )
+            self._offsets.append(offset)
+            self._atoms = atoms
+            if atoms <= 9:
+                offset += 56 + atoms * 12
+            else:
+                byte_count = struct.unpack_from(">i", self.map, offset + 88)[0]
+                offset += 92 + (byte_count + 3) // 4 * 4
+        return len(self._offsets)
+
+    def _read_frame(self, frame: int) -> np.ndarray:
+        offset = self._offsets[frame]
+        if self._atoms <= 9:
+            coords = np.frombuffer(
+                self.map, dtype=">f4", count=self._atoms * 3, offset=offset + 56
+            )
+            return (coords.reshape(-1, 3) * 10).astype(np.float32)
+
+        precision = struct.unpack_from(">f", self.map, offset + 56)[0]
+        minint = struct.unpack_from(">3i", self.map, offset + 60)
+        maxint = struct.unpack_from(">3i", self.map, offset + 72)
+        small_index, byte_count = struct.unpack_from(">2i", self.map, offset + 84)
+        start = offset + 92
+        end = start + byte_count
+        coords = _decompress_xtc_coordinates(
+            self.map[start:end],
+            self._atoms,
+            minint,
+            maxint,
+            small_index,
+        )
+        return (coords * np.float32(10 / precision)).astype(np.float32)
+
+
+# Lookup table of the xtc compression algorithm
+_MAGIC_INTS = (
+    [0] * 9
+    + [
+        8,
+        10,
+        12,
+        16,
+        20,
+        25,
+        32,
+        40,
+        50,
+        64,
+        80,
+        101,
+        128,
+        161,
+        203,
+        256,
+        322,
+        406,
+        512,
+    ]
+    + [
+        645,
+        812,
+        1024,
+        1290,
+        1625,
+        2048,
+        2580,
+        3250,
+        4096,
+        5060,
+        6501,
+        8192,
+        10321,
+        13003,
+    ]
+    + [16384, 20642, 26007, 32768, 41285, 52015, 65536, 82570, 104031, 131072, 165140]
+    + [
+        208063,
+        262144,
+        330280,
+        416127,
+        524287,
+        660561,
+        832255,
+        1048576,
+        1321122,
+        1664510,
+    ]
+    + [
+        2097152,
+        2642245,
+        3329021,
+        4194304,
+        5284491,
+        6658042,
+        8388607,
+        10568983,
+        13316085,
+    ]
+    + [16777216]
+)
+_FIRST_INDEX = 9
+
+
+class _BitReader:
+    """Read big-endian bit fields from xtc compressed data."""
+
+    def __init__(self, data: bytes) -> None:
+        self._data = data
+        self._position = 0
+
+    def read(self, bits: int) -> int:
+        start = self._position >> 3
+        end = (self._position + bits + 7) >> 3
+        shift = (end - start) * 8 - (self._position & 7) - bits
+        self._position += bits
+        return (int.from_bytes(self._data[start:end], "big") >> shift) & (
+            (1 << bits) - 1
+        )
+
+    def read_ints(self, bits: int, sizes: Tuple[int, int, int]) -> List[int]:
+        value = 0
+        shift = 0
+        while bits > 8:
+            value |= self.read(8) << shift
+            shift += 8
+            bits -= 8
+        if bits > 0:
+            value |= self.read(bits) << shift
+
+        value, third = divmod(value, sizes[2])
+        first, second = divmod(value, sizes[1])
+        return [first, second, third]
+
+
+def _decompress_xtc_coordinates(
+    data: bytes,
+    atoms: int,
+    minint: Tuple[int, int, int],
+    maxint: Tuple[int, int, int],
+    small_index: int,
+) -> np.ndarray:
+    """Decompress xtc integer coordinates.
+
+    Args:
+        data: Compressed coordinate bytes.
+        atoms: Number of atoms.
+        minint: Minimum integer coordinate of each axis.
+        maxint: Maximum integer coordinate of each axis.
+        small_index: Initial index into the magic int table for small differences.
+
+    Returns:
+        A float32 array of shape (atoms, 3) of integer coordinates.
+    """
+    bit_reader = _BitReader(data)
+    sizes = (
+        maxint[0] - minint[0] + 1,
+        maxint[1] - minint[1] + 1,
+        maxint[2] - minint[2] + 1,
+    )
+    large = max(sizes) > 0xFFFFFF
+    bits = int(np.prod(sizes, dtype=object)).bit_length()
+
+    smaller = _MAGIC_INTS[max(_FIRST_INDEX, small_index - 1)] // 2
+    small_num = _MAGIC_INTS[small_index] // 2
+    small_size = _MAGIC_INTS[small_index]
+
+    coords = np.empty((atoms, 3), dtype=np.float32)
+    atom = 0
+    run = 0
+    while atom < atoms:
+        if large:
+            this = [bit_reader.read(size.bit_length()) for size in sizes]
+        else:
+            this = bit_reader.read_ints(bits, sizes)
+        this = [this[axis] + minint[axis] for axis in range(3)]
+        previous = this
+
+        is_smaller = 0
+        if bit_reader.read(1):
+            run = bit_reader.read(5)
+            is_smaller = run % 3
+            run -= is_smaller
+            is_smaller -= 1
+
+        if run > 0:
+            for count in range(0, run, 3):
+                small = bit_reader.read_ints(
+                    small_index, (small_size, small_size, small_size)
+                )
+                this = [small[axis] + previous[axis] - small_num for axis in range(3)]
+                if count == 0:
+                    # The first two atoms of a run are swapped to compress water better
+                    this, previous = previous, this
+                    coords[atom] = previous
+                    atom += 1
+                else:
+                    previous = this
+                coords[atom] = this
+                atom += 1
+        else:
+            coords[atom] = this
+            atom += 1
+
+        small_index += is_smaller
+        if is_smaller < 0:
+            small_num = smaller
+            smaller = (
+                _MAGIC_INTS[small_index - 1] // 2 if small_index > _FIRST_INDEX else 0
+            )
+        elif is_smaller > 0:
+            smaller = small_num
+            small_num = _MAGIC_INTS[small_index] // 2
+        small_size = _MAGIC_INTS[small_index]
+
+    return coords
@@ -0,0 +1,437 @@
+"""Functions for rendering movie frames and encoding them."""
+import multiprocessing
+import queue
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    cast,
+)
+
+from . import encoding, tiles
+from .cache import FrameCache
+from .lazy import cmd
+
+
+def frame_path(directory: Union[str, Path], frame: int) -> Path:
+    """Get the filepath of a rendered frame.
+
+    Args:
+        directory: Directory containing rendered frames.
+        frame: The frame number.
+
+    Returns:
+        Filepath to the png file of the frame.
+    """
+    return Path(directory) / f"frame{frame:04d}.png"
+
+
+def show_frame(frame: int) -> None:
+    """Show a movie frame before rendering it.
+
+    PyMol sets the object states of a frame the next time the scene is drawn, so the first
+    image rendered after changing frames would show the states of the previous frame. A one
+    pixel image is ray traced to set them, so a frame renders the same whatever frame was shown
+    before it.
+
+    Args:
+        frame: The frame number.
+    """
+    cmd.frame(frame)
+    cmd.ray(1, 1, quiet=1)
+
+
+def render_frames(
+    directory: Union[str, Path],
+    frames: Iterable[int],
+    produce_dict: Dict[str, Any],
+    before_frame: Optional[Callable[[int], None]] = None,
+) -> List[Path]:
+    """Render movie frames to numbered png files.
+
+    Args:
+        directory: Directory to write the png files to.
+        frames: The frames to render.
+        produce_dict: Nested dictionary containing produce movie information.
+        before_frame: Function called with the frame number before each frame is rendered.
+
+    Returns:
+        Filepaths to the rendered frames.
+    """
+    paths = []
+    for frame in frames:
+        show_frame(frame)
+        if before_frame:
+            before_frame(frame)
+        path = frame_path(directory, frame)
+        path.write_bytes(render_frame(produce_dict))
+        paths.append(path)
+
+    return paths
+
+
+def render_cached_frame(
+    frame: int,
+    produce_dict: Dict[str, Any],
+    frame_cache: Optional[FrameCache] = None,
+    fingerprint: Optional[Callable[[int], str]] = None,
+) -> bytes:
+    """Read the current frame from the frame cache or render it and add it to the cache.
+
+    Args:
+        frame: The current frame.
+        produce_dict: Nested dictionary containing produce movie information.
+        frame_cache: Cache of rendered frames. If None the frame is always rendered.
+        fingerprint: Function returning the fingerprint of a frame.
+
+    Returns:
+        The contents of a png file of the frame.
+    """
+    if frame_cache is None or fingerprint is None:
+        return render_frame(produce_dict)
+
+    key = fingerprint(frame)
+    if (data := frame_cache.get(key)) is None:
+        data = render_frame(produce_dict)
+        frame_cache.put(key, data)
+
+    return data
+
+
+def render_frame(produce_dict: Dict[str, Any]) -> bytes:
+    """Render the current frame in memory.
+
+    In "tiled" mode the frame is ray traced as tiles by the tile renderer in use, or ray
+    traced whole if there is none.
+
+    Args:
+        produce_dict: Nested dictionary containing produce movie information.
+
+    Returns:
+        The contents of a png file of the frame.
+    """
+    if produce_dict["mode"] == "tiled" and (renderer := tiles.active_renderer()):
+        return renderer.render(produce_dict)
+    return cmd.png(
+        None,
+        width=produce_dict["width"],
+        height=produce_dict["height"],
+        ray=int(produce_dict["mode"] in ("ray", "tiled")),
+        quiet=1,
+    )
+
+
+def split_frames(frames: Sequence[int], workers: int) -> List[Sequence[int]]:
+    """Split frames into contiguous parts of near equal length.
+
+    Args:
+        frames: The frames to split.
+        workers: The number of parts to split the frames into.
+
+    Returns:
+        Non-empty parts of the frames in order.
+    """
+    size, remainder = divmod(len(frames), workers)
+    parts = []
+    start = 0
+    for worker in range(min(workers, len(frames))):
+        stop = start + size + (worker < remainder)
+        parts.append(frames[start:stop])
+        start = stop
+
+    return parts
+
+
+def _load_session(session: str) -> None:
+    """Load the session to render in a render worker process.
+
+    Args:
+        session: Filepath to the .pse session.
+    """
+    cmd.load(session)
+
+
+def _render_session_frames(
+    directory: str,
+    frames: Sequence[int],
+    produce_dict: Dict[str, Any],
+) -> List[Path]:
+    """Render a range of frames of the session loaded by the worker.
+
+    Runs in a render worker process.
+
+    Args:
+        directory: Directory to write the png files to.
+        frames: The frames to render.
+        produce_dict: Nested dictionary containing produce movie information.
+
+    Returns:
+        Filepaths to the rendered frames.
+    """
+    return render_frames(directory, frames, produce_dict)
+
+
+def iter_render_session(
+    session: Union[str, Path],
+    directory: Union[str, Path],
+    produce_dict: Dict[str, Any],
+    workers: int,
+    frames: Sequence[int],
+    parts: Optional[int] = None,
+) -> Iterator[Tuple[Sequence[int], List[Path]]]:
+    """Render frames of a session in parallel, yielding each range of frames once rendered.
+
+    The frames are split into contiguous ranges. Each worker process loads the session once in
+    a new PyMol instance and renders ranges until none are left, so the frames are the same as
+    rendering them one at a time in this process.
+
+    Args:
+        session: Filepath to the .pse session to render.
+        directory: Directory to write the png files to.
+        produce_dict: Nested dictionary containing produce movie information.
+        workers: The number of render processes.
+        frames: The frames to render.
+        parts: The number of ranges to split the frames into. If None one per worker.
+
+    Yields:
+        The frames of a range and the filepaths they were rendered to, in the order the ranges
+        finish.
+    """
+    # Spawned workers start from a clean PyMol instead of a copy of this session
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_load_session,
+        initargs=(str(session),),
+    ) as executor:
+        futures = {
+            executor.submit(
+                _render_session_frames, str(directory), part, produce_dict
+            ): part
+            for part in split_frames(frames, parts or workers)
+        }
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def render_session(
+    session: Union[str, Path],
+    directory: Union[str, Path],
+    produce_dict: Dict[str, Any],
+    workers: int,
+    frames: Optional[Sequence[int]] = None,
+) -> List[Path]:
+    """Render the frames of a session in parallel.
+
+    The frames are split into contiguous ranges, one per worker. Each worker process loads
+    the session in a new PyMol instance and renders its range, so the frames are the same as
+    rendering them one at a time in this process.
+
+    Args:
+        session: Filepath to the .pse session to render.
+        directory: Directory to write the png files to.
+        produce_dict: Nested dictionary containing produce movie information.
+        workers: The number of render processes.
+        frames: The frames to render. If None all frames of the movie are rendered.
+
+    Returns:
+        Filepaths to the rendered frames in order.
+    """
+    if frames is None:
+        frames = range(1, produce_dict["frames"] + 1)
+
+    rendered = {
+        part[0]: paths
+        for part, paths in iter_render_session(
+            session, directory, produce_dict, workers, frames
+        )
+    }
+    return [
+        path for part in split_frames(frames, workers) for path in rendered[part[0]]
+    ]
+
+
+def encode_frames(
+    directory: Union[str, Path], filename: str, produce_dict: Dict[str, Any]
+) -> None:
+    """Encode rendered frames to a movie file with ffmpeg.
+
+    The frames are encoded in segments by `encoders` parallel ffmpeg processes, one per cpu
+    by default, and the segments joined.
+
+    Args:
+        directory: Directory containing rendered frames.
+        filename: Output movie filepath.
+        produce_dict: Nested dictionary containing produce movie information.
+    """
+    encoding.encode_segments(
+        directory, filename, produce_dict, produce_dict.get("encoders")
+    )
+
+
+def pipe_command(filename: str, produce_dict: Dict[str, Any]) -> List[str]:
+    """Build the ffmpeg command that encodes png frames read from stdin.
+
+    Args:
+        filename: Output movie filepath.
+        produce_dict: Nested dictionary containing produce movie information.
+
+    Returns:
+        The ffmpeg command line.
+    """
+    return [
+        "ffmpeg",
+        "-y",
+        "-v",
+        "warning",
+        "-f",
+        "image2pipe",
+        "-c:v",
+        "png",
+        "-framerate",
+        str(produce_dict["framerate"]),
+        "-i",
+        "-",
+        *encoding.output_arguments(filename, produce_dict),
+    ]
+
+
+class FrameEncoder:
+    """Write frames to the stdin of an encoder process.
+
+    Frames are added to a bounded queue and written by a background thread, so encoding overlaps
+    with rendering. Adding a frame blocks while the queue is full, so rendering never gets more
+    than `max_frames` frames ahead of the encoder.
+
+    Attributes:
+        _process: The encoder process.
+        _queue: Queue of frames waiting to be written.
+        _error: Error raised while writing frames.
+        _thread: Thread writing frames to the encoder.
+        command: The encoder command line.
+    """
+
+    def __init__(self, command: List[str], max_frames: int = 8) -> None:
+        """Initialize the instance and start the encoder process.
+
+        Args:
+            command: The encoder command line. Frames are written to its stdin.
+            max_frames: Maximum number of frames waiting to be written.
+        """
+        self.command = command
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=max_frames)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._write, daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "FrameEncoder":
+        """Enter the context.
+
+        Returns:
+            The instance.
+        """
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Finish encoding, or stop the encoder if the context raised.
+
+        Args:
+            exc_info: Exception information of the context.
+        """
+        if exc_info[0] is None:
+            self.close()
+        else:
+            self._process.kill()
+            self._queue.put(None)
+            self._thread.join()
+            self._process.wait()
+
+    def write(self, frame: bytes) -> None:
+        """Add a frame to the queue, blocking while the queue is full.
+
+        Args:
+            frame: Encoded frame to write.
+
+        Raises:
+            BrokenPipeError: If the encoder stopped reading frames.
+        """
+        if self._error:
+            raise self._error
+        self._queue.put(frame)
+
+    def close(self) -> None:
+        """Write the remaining frames and wait for the encoder to finish.
+
+        Raises:
+            CalledProcessError: If the encoder fails.
+        """
+        self._queue.put(None)
+        self._thread.join()
+        if (returncode := self._process.wait()) != 0:
+            raise subprocess.CalledProcessError(returncode, self.command)
+        if self._error:
+            raise self._error
+
+    def _write(self) -> None:
+        """Write queued frames to the encoder until the queue is closed."""
+        stdin = cast(IO[bytes], self._process.stdin)
+        while (frame := self._queue.get()) is not None:
+            if self._error:
+                continue
+            try:
+                stdin.write(frame)
+            except OSError as error:
+                self._error = error
+        try:
+            stdin.close()
+        except OSError:
+            pass
+
+
+def pipe_frames(
+    filename: str,
+    frames: Iterable[int],
+    produce_dict: Dict[str, Any],
+    before_frame: Optional[Callable[[int], None]] = None,
+    max_frames: int = 8,
+    frame_cache: Optional[FrameCache] = None,
+    fingerprint: Optional[Callable[[int], str]] = None,
+) -> None:
+    """Render movie frames and pipe them into ffmpeg without writing images to disk.
+
+    Args:
+        filename: Output movie filepath.
+        frames: The frames to render.
+        produce_dict: Nested dictionary containing produce movie information.
+        before_frame: Function called with the frame number before each frame is rendered.
+        max_frames: Maximum number of rendered frames waiting to be encoded.
+        frame_cache: Cache of rendered frames. Frames found in the cache are not rendered.
+        fingerprint: Function returning the fingerprint of a frame. It is called after
+            `before_frame`.
+    """
+    with FrameEncoder(pipe_command(filename, produce_dict), max_frames) as encoder:
+        for frame in frames:
+            show_frame(frame)
+            if before_frame:
+                before_frame(frame)
+            encoder.write(
+                render_cached_frame(frame, produce_dict, frame_cache, fingerprint)
+            )
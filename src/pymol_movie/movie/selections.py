@@ -0,0 +1,173 @@
+"""Cache of named pymol selections for the selections used by actions."""
+import re
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .lazy import cmd
+
+# Selections with these keywords depend on coordinates, representations or colors which actions
+# change, so they are evaluated every time they are used
+DYNAMIC_KEYWORDS = frozenset(
+    (
+        "within",
+        "w.",
+        "around",
+        "a.",
+        "expand",
+        "x.",
+        "gap",
+        "near_to",
+        "nto.",
+        "beyond",
+        "be.",
+        "rep",
+        "color",
+        "visible",
+        "v.",
+        "enabled",
+    )
+)
+
+
+class SelectionCache:
+    """Intern each distinct (object, selection) pair as a named pymol selection.
+
+    The named selection is created the first time the pair is used and reused afterwards, so
+    the selection is only parsed and evaluated once. If the scenes are planned with `plan`, the
+    named selection is deleted after the last scene that uses it.
+
+    Attributes:
+        _names: Dictionary of (object, selection) to the named selection.
+        _last_use: Dictionary of (object, selection) to the index of the last scene using it.
+        hits: Number of times a named selection was reused.
+        misses: Number of times a selection was evaluated.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the instance."""
+        self._names: Dict[Tuple[str, str], str] = {}
+        self._last_use: Dict[Tuple[str, str], int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def is_dynamic(selection: str) -> bool:
+        """Check whether a selection can match different atoms after actions.
+
+        Args:
+            selection: Pymol selection expression.
+
+        Returns:
+            True if the selection must be evaluated every time.
+        """
+        return any(
+            token in DYNAMIC_KEYWORDS
+            for token in re.split(r"[\s()]+", selection.lower())
+        )
+
+    def get(self, name: str, selection: str) -> str:
+        """Get a selection of an object, creating a named selection on first use.
+
+        Args:
+            name: Name of the object.
+            selection: Pymol selection expression within the object.
+
+        Returns:
+            Pymol selection expression of the selected atoms of the object.
+        """
+        if self.is_dynamic(selection):
+            self.misses += 1
+            return f"{name} and {selection}"
+
+        key = (name, selection)
+        if key in self._names:
+            self.hits += 1
+            return self._names[key]
+
+        self.misses += 1
+        selection_name = f"_pymol_movie_sel{self.misses}"
+        cmd.select(selection_name, f"{name} and {selection}", enable=0)
+        self._names[key] = selection_name
+        return selection_name
+
+    def plan(self, scene_dicts: List[Dict[str, Any]]) -> None:
+        """Record the last scene that uses each selection.
+
+        Args:
+            scene_dicts: A list of dictionaries containing scene information.
+        """
+        for index, scene_dict in enumerate(scene_dicts):
+            for object_dict in scene_dict["objects"]:
+                for action in object_dict.get("actions") or []:
+                    details = next(iter(action.values()))
+                    if isinstance(details, dict) and "selection" in details:
+                        key = (object_dict["name"], details["selection"])
+                        self._last_use[key] = index
+
+    def release(self, scene_index: int) -> None:
+        """Delete the named selections no scene after `scene_index` uses.
+
+        Args:
+            scene_index: Index of the last scene set up.
+        """
+        for key, last_use in list(self._last_use.items()):
+            if last_use <= scene_index:
+                del self._last_use[key]
+                if key in self._names:
+                    cmd.delete(self._names.pop(key))
+
+    def clear(self) -> None:
+        """Delete all named selections."""
+        for selection_name in self._names.values():
+            cmd.delete(selection_name)
+        self._names.clear()
+        self._last_use.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Get the hit rate of the cache.
+
+        Returns:
+            A dictionary with the hits, misses and hit rate.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+_active_cache: Optional[SelectionCache] = None
+
+
+@contextmanager
+def use_selection_cache(selection_cache: SelectionCache) -> Iterator[None]:
+    """Make `select` use a selection cache.
+
+    Args:
+        selection_cache: The selection cache to use.
+
+    Yields:
+        None while the cache is used.
+    """
+    global _active_cache  # pylint: disable=global-statement
+    previous, _active_cache = _active_cache, selection_cache
+    try:
+        yield
+    finally:
+        _active_cache = previous
+
+
+def select(name: str, selection: str) -> str:
+    """Get a pymol selection of an object, reusing a named selection if a cache is used.
+
+    Args:
+        name: Name of the object.
+        selection: Pymol selection expression within the object.
+
+    Returns:
+        Pymol selection expression of the selected atoms of the object.
+    """
+    if _active_cache is None:
+        return f"{name} and {selection}"
+    return _active_cache.get(name, selection)
@@ -0,0 +1,144 @@
+"""Bounded window of object states for streaming large trajectories.
+
+The window does not use the pymol api so states can be read in a background thread.
+"""
+import itertools
+import threading
+from collections import deque
+from typing import Callable, Deque, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+class StateWindow:
+    """Prefetch the coordinates of upcoming states and drop states already passed.
+
+    States are read in the order they are shown by a background thread, which waits while the
+    window is full. Requesting a state drops every state before it, so only the current state and
+    the prefetched states are kept in memory.
+
+    Attributes:
+        _read_state: Function that reads the coordinates of a state.
+        _sequence: States in the order they are shown, without consecutive repeats.
+        _window: Queue of (state, coordinates) with the current state first.
+        _condition: Condition guarding the window.
+        _error: Error raised while reading states.
+        _closed: Whether the window has been closed.
+        _prefetched: Whether every state has been read.
+        max_states: Maximum number of states in the window.
+        max_bytes: Maximum size of the coordinates in the window.
+        resident_bytes: Current size of the coordinates in the window.
+        peak_bytes: Peak size of the coordinates in the window.
+    """
+
+    def __init__(
+        self,
+        read_state: Callable[[int], np.ndarray],
+        states: Iterable[int],
+        max_states: Optional[int] = None,
+        max_mb: Optional[float] = None,
+    ) -> None:
+        """Initialize the instance and start prefetching states.
+
+        Args:
+            read_state: Function that reads the coordinates of a state.
+            states: The state shown at each frame.
+            max_states: Maximum number of states in the window. Defaults to 2 if max_mb is not
+                set.
+            max_mb: Maximum size of the coordinates in the window in MB.
+        """
+        self._read_state = read_state
+        self._sequence = [state for state, _ in itertools.groupby(states)]
+        self._window: Deque[Tuple[int, np.ndarray]] = deque()
+        self._condition = threading.Condition()
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._prefetched = False
+        self.max_states = max_states if max_states or max_mb else 2
+        self.max_bytes = int(max_mb * 1e6) if max_mb else None
+        self.resident_bytes = 0
+        self.peak_bytes = 0
+
+        self._thread = threading.Thread(target=self._prefetch, daemon=True)
+        self._thread.start()
+
+    def get(self, state: int) -> np.ndarray:
+        """Get the coordinates of a state, dropping all states before it.
+
+        States must be requested in the order they were given.
+
+        Args:
+            state: The state to get.
+
+        Returns:
+            Coordinates of the state.
+
+        Raises:
+            KeyError: If the state is not upcoming in the window.
+        """
+        with self._condition:
+            while True:
+                if self._error:
+                    raise self._error
+                if self._window and self._window[0][0] == state:
+                    return self._window[0][1]
+                if self._window:
+                    self.resident_bytes -= self._window.popleft()[1].nbytes
+                    self._condition.notify_all()
+                elif self._prefetched:
+                    raise KeyError(f"State {state} is not upcoming in the window.")
+                else:
+                    self._condition.wait()
+
+    def close(self) -> None:
+        """Stop prefetching and drop all states."""
+        with self._condition:
+            self._closed = True
+            self._window.clear()
+            self.resident_bytes = 0
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _has_room(self, nbytes: int) -> bool:
+        """Check whether a state fits in the window.
+
+        Args:
+            nbytes: Expected size of the state.
+
+        Returns:
+            True if the state can be added to the window.
+        """
+        if not self._window:
+            return True
+        if self.max_states and len(self._window) >= self.max_states:
+            return False
+        return not self.max_bytes or self.resident_bytes + nbytes <= self.max_bytes
+
+    def _prefetch(self) -> None:
+        """Read states in order while there is room in the window."""
+        nbytes = 0
+        try:
+            for state in self._sequence:
+                with self._condition:
+                    while not self._closed and not self._has_room(nbytes):
+                        self._condition.wait()
+                    if self._closed:
+                        return
+
+                coords = self._read_state(state)
+                nbytes = coords.nbytes
+
+                with self._condition:
+                    if self._closed:
+                        return
+                    self._window.append((state, coords))
+                    self.resident_bytes += nbytes
+                    self.peak_bytes = max(self.peak_bytes, self.resident_bytes)
+                    self._condition.notify_all()
+        except Exception as error:  # pylint: disable=broad-except
+            with self._condition:
+                self._error = error
+        finally:
+            with self._condition:
+                self._prefetched = True
+                self._condition.notify_all()
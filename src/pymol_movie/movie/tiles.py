@@ -0,0 +1,369 @@
+"""Ray trace single frames as tiles in parallel processes."""
+import contextlib
+import math
+import multiprocessing
+import os
+import re
+import struct
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+
+from .cpus import available_cpus
+from .lazy import cmd
+
+# Tiles are rendered this many pixels larger on every side, so the antialiasing filter sees
+# the same neighbouring pixels as in the whole frame
+TILE_MARGIN = 4
+PPM_HEADER = re.compile(rb"P6\s+(\d+)\s+(\d+)\s+(\d+)\s")
+
+_active_renderer: Optional["TileRenderer"] = None
+
+
+class Tile(NamedTuple):
+    """Rectangle of the pixels of a frame, from the top left corner of the frame."""
+
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+def split_tiles(width: int, height: int, tiles: int) -> List[Tile]:
+    """Split a frame into a grid of near equal tiles.
+
+    Args:
+        width: Width of the frame in pixels.
+        height: Height of the frame in pixels.
+        tiles: The number of tiles to split the frame into.
+
+    Returns:
+        Non-empty tiles covering the frame, row by row.
+    """
+    rows = min(max(1, math.isqrt(tiles)), height)
+    columns = min(math.ceil(tiles / rows), width)
+
+    def split(length: int, parts: int) -> List[Tuple[int, int]]:
+        size, remainder = divmod(length, parts)
+        offsets = [part * size + min(part, remainder) for part in range(parts + 1)]
+        return [(start, stop - start) for start, stop in zip(offsets, offsets[1:])]
+
+    return [
+        Tile(x, y, tile_width, tile_height)
+        for y, tile_height in split(height, rows)
+        for x, tile_width in split(width, columns)
+    ]
+
+
+def is_orthoscopic(view: Sequence[float]) -> bool:
+    """Check whether a view has an orthoscopic projection.
+
+    The last element of a pymol view is the field of view, negative for a perspective
+    projection.
+
+    Args:
+        view: A pymol view.
+
+    Returns:
+        True if the view is orthoscopic.
+    """
+    return view[17] > 0
+
+
+def tile_view(
+    view: Sequence[float],
+    width: int,
+    height: int,
+    tile: Tile,
+    margin: int = TILE_MARGIN,
+) -> List[float]:
+    """Get the view of a tile of a frame, including a margin around the tile.
+
+    The camera is moved across to the center of the tile and the field of view narrowed to the
+    height of the tile, so the tile has the same pixels as the frame. This only holds for
+    orthoscopic views, as pymol has no off-center perspective projection.
+
+    Args:
+        view: The orthoscopic view of the frame.
+        width: Width of the frame in pixels.
+        height: Height of the frame in pixels.
+        tile: The tile.
+        margin: Pixels added on every side of the tile.
+
+    Returns:
+        The view of the tile.
+
+    Raises:
+        ValueError: If the view is not orthoscopic.
+    """
+    if not is_orthoscopic(view):
+        raise ValueError("Only orthoscopic views can be split into tiles.")
+
+    fov = math.radians(view[17])
+    pixel = 2 * abs(view[11]) * math.tan(fov / 2) / height
+    tile_height = tile.height + 2 * margin
+    center_x = tile.x + tile.width / 2 - width / 2
+    center_y = height / 2 - (tile.y + tile.height / 2)
+
+    tiled = list(view)
+    tiled[9] -= center_x * pixel
+    tiled[10] -= center_y * pixel
+    tiled[17] = math.degrees(2 * math.atan(math.tan(fov / 2) * tile_height / height))
+    return tiled
+
+
+def read_ppm(data: bytes) -> np.ndarray:
+    """Read the pixels of a binary ppm image.
+
+    Args:
+        data: The contents of a ppm file.
+
+    Returns:
+        An array of shape (height, width, 3).
+
+    Raises:
+        ValueError: If the data is not a binary 8 bit ppm image.
+    """
+    if not (header := PPM_HEADER.match(data)) or header.group(3) != b"255":
+        raise ValueError("Not a binary 8 bit ppm image.")
+    width, height = int(header.group(1)), int(header.group(2))
+    return np.frombuffer(data, np.uint8, width * height * 3, header.end()).reshape(
+        height, width, 3
+    )
+
+
+def encode_png(image: np.ndarray) -> bytes:
+    """Encode pixels as a png image.
+
+    Args:
+        image: A uint8 array of shape (height, width, 3) or (height, width, 4).
+
+    Returns:
+        The contents of a png file.
+    """
+    height, width, channels = image.shape
+    rows = np.zeros((height, width * channels + 1), np.uint8)
+    rows[:, 1:] = image.reshape(height, -1)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(data))
+            + kind
+            + data
+            + struct.pack(">I", zlib.crc32(kind + data))
+        )
+
+    color_type = {3: 2, 4: 6}[channels]
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows.tobytes()))
+        + chunk(b"IEND", b"")
+    )
+
+
+def render_tile(
+    view: Sequence[float],
+    width: int,
+    height: int,
+    tile: Tile,
+    margin: int = TILE_MARGIN,
+) -> np.ndarray:
+    """Ray trace a tile of the current frame.
+
+    Args:
+        view: The orthoscopic view of the frame.
+        width: Width of the frame in pixels.
+        height: Height of the frame in pixels.
+        tile: The tile.
+        margin: Pixels rendered on every side of the tile and cropped.
+
+    Returns:
+        An array of shape (tile.height, tile.width, 3) of the pixels of the tile.
+    """
+    cmd.set_view(tile_view(view, width, height, tile, margin))
+    # In memory images can only be png, which would have to be decoded
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tile.ppm")
+        cmd.png(
+            path,
+            width=tile.width + 2 * margin,
+            height=tile.height + 2 * margin,
+            ray=1,
+            quiet=1,
+            format=1,
+        )
+        pixels = read_ppm(Path(path).read_bytes())
+    return pixels[
+        slice(margin, margin + tile.height), slice(margin, margin + tile.width)
+    ]
+
+
+def _load_session(session: str) -> None:
+    """Load the session to render tiles of in a tile worker process.
+
+    Args:
+        session: Filepath to the .pse session.
+    """
+    cmd.load(session)
+
+
+def _render_session_tile(
+    frame: int, view: Sequence[float], width: int, height: int, tile: Tile
+) -> np.ndarray:
+    """Ray trace a tile of a frame of the session loaded by the worker.
+
+    Runs in a tile worker process.
+
+    Args:
+        frame: The frame.
+        view: The orthoscopic view of the frame.
+        width: Width of the frame in pixels.
+        height: Height of the frame in pixels.
+        tile: The tile.
+
+    Returns:
+        An array of shape (tile.height, tile.width, 3) of the pixels of the tile.
+    """
+    # Like render.show_frame, the object states of the frame are set before the tile is rendered
+    cmd.frame(frame)
+    cmd.ray(1, 1, quiet=1)
+    return render_tile(view, width, height, tile)
+
+
+class TileRenderer:
+    """Ray trace frames of a session as tiles in parallel processes.
+
+    Every worker process loads the session once. A frame is split into tiles, which are ray
+    traced by the workers and stitched back together. Tiled frames have no alpha channel.
+    Perspective views can not be split into tiles and are ray traced whole in this process.
+
+    Attributes:
+        _executor: Pool of the worker processes.
+        _warned: Whether a perspective frame was ray traced whole.
+        tiles: The number of tiles of a frame.
+    """
+
+    def __init__(
+        self,
+        session: Union[str, Path],
+        tiles: Optional[int] = None,
+        workers: Optional[int] = None,
+    ) -> None:
+        """Initialize the instance and start the worker processes.
+
+        Args:
+            session: Filepath to the .pse session to render.
+            tiles: The number of tiles of a frame. If None one per cpu.
+            workers: The number of worker processes. If None one per tile, up to the number of
+                cpus.
+        """
+        cpus = available_cpus()
+        self.tiles = tiles or cpus
+        self._warned = False
+        # Spawned workers start from a clean PyMol instead of a copy of this session
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers or min(self.tiles, cpus),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load_session,
+            initargs=(str(session),),
+        )
+
+    def __enter__(self) -> "TileRenderer":
+        """Enter the context.
+
+        Returns:
+            The instance.
+        """
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Stop the worker processes.
+
+        Args:
+            exc_info: Exception information of the context.
+        """
+        self.close()
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        self._executor.shutdown()
+
+    def render(self, produce_dict: Dict[str, Any]) -> bytes:
+        """Ray trace the current frame as tiles.
+
+        Args:
+            produce_dict: Nested dictionary containing produce movie information.
+
+        Returns:
+            The contents of a png file of the frame.
+        """
+        width, height = produce_dict["width"], produce_dict["height"]
+        view = cmd.get_view()
+        if not is_orthoscopic(view):
+            if not self._warned:
+                print(
+                    "produce: perspective frames can not be split into tiles and are ray "
+                    "traced whole. Set orthoscopic to render them as tiles."
+                )
+                self._warned = True
+            return cmd.png(None, width=width, height=height, ray=1, quiet=1)
+
+        frame = cmd.get_frame()
+        image = np.empty((height, width, 3), np.uint8)
+        tiles = split_tiles(width, height, self.tiles)
+        futures = [
+            self._executor.submit(
+                _render_session_tile, frame, view, width, height, tile
+            )
+            for tile in tiles
+        ]
+        for tile, future in zip(tiles, futures):
+            image[
+                slice(tile.y, tile.y + tile.height), slice(tile.x, tile.x + tile.width)
+            ] = future.result()
+        return encode_png(image)
+
+
+@contextlib.contextmanager
+def use_tile_renderer(renderer: TileRenderer) -> Iterator[TileRenderer]:
+    """Make frames rendered in "tiled" mode use a tile renderer.
+
+    The renderer is closed when the context exits.
+
+    Args:
+        renderer: The tile renderer to use.
+
+    Yields:
+        The tile renderer.
+    """
+    global _active_renderer  # pylint: disable=global-statement
+    previous, _active_renderer = _active_renderer, renderer
+    try:
+        with renderer:
+            yield renderer
+    finally:
+        _active_renderer = previous
+
+
+def active_renderer() -> Optional[TileRenderer]:
+    """Get the tile renderer in use.
+
+    Returns:
+        The tile renderer or None if frames are not rendered as tiles.
+    """
+    return _active_renderer
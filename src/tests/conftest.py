@@ -0,0 +1,36 @@
+"""Shared test configuration."""
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from pymol_movie.movie import manifest
+from pymol_movie.movie.lazy import cmd
+
+_manifest_dir = tempfile.TemporaryDirectory()
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    # Trajectories are also loaded while test modules are collected and by subprocesses, so the
+    # manifests are redirected before any test runs instead of by a fixture
+    os.environ["XDG_CACHE_HOME"] = _manifest_dir.name
+    manifest.DEFAULT_MANIFEST_DIR = (
+        Path(_manifest_dir.name) / "pymol_movie" / "manifests"
+    )
+
+
+def pytest_unconfigure(config: pytest.Config) -> None:
+    _manifest_dir.cleanup()
+
+
+@pytest.fixture
+def empty_session() -> Iterator[None]:
+    """Run a test without the objects loaded by other tests, restoring them afterwards."""
+    session = cmd.get_session()
+    cmd.delete("all")
+    try:
+        yield
+    finally:
+        cmd.set_session(session)
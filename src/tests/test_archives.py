@@ -0,0 +1,204 @@
+"""Test Archives."""
+import bz2
+import gzip
+import io
+import lzma
+import tarfile
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+import pytest
+from pymol import cmd
+
+from pymol_movie.movie import archives
+from pymol_movie.movie.archives import (
+    ArchiveMember,
+    archive_members,
+    is_archive,
+    iter_frame_bytes,
+    read_frame,
+)
+from pymol_movie.movie.coordinates import iter_pdb_coordinates, parse_pdb_coordinates
+from pymol_movie.movie.loaders import ObjectLoader, trajectory_files
+from pymol_movie.movie.movie import MovieMaker
+
+SAMPLE_DIRECTORY = Path("./tests/samples/object_trajs/example_object_2")
+
+COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {
+    ".gz": gzip.compress,
+    ".bz2": bz2.compress,
+    ".xz": lzma.compress,
+}
+
+
+def write_compressed(directory: Path, suffix: str, states: int) -> List[Path]:
+    directory.mkdir()
+    files = []
+    for state in range(1, states + 1):
+        data = (SAMPLE_DIRECTORY / f"traj_{state}.pdb").read_bytes()
+        file = directory / f"traj_{state}.pdb{suffix}"
+        file.write_bytes(COMPRESSORS[suffix](data))
+        files.append(file)
+    return files
+
+
+def write_archive(archive: Path, order: List[int], mode: str = "w:xz") -> None:
+    with tarfile.open(archive, mode) as tar:
+        for state in order:
+            tar.add(SAMPLE_DIRECTORY / f"traj_{state}.pdb", f"frames/traj_{state}.pdb")
+
+
+@pytest.mark.parametrize("suffix", list(COMPRESSORS))
+def test_read_frame_compressed(tmp_path: Path, suffix: str) -> None:
+    files = write_compressed(tmp_path / "traj", suffix, 3)
+
+    assert list(trajectory_files(str(tmp_path / "traj"))) == files
+    assert read_frame(files[1]) == (SAMPLE_DIRECTORY / "traj_2.pdb").read_bytes()
+    np.testing.assert_array_equal(
+        parse_pdb_coordinates(files[2]),
+        parse_pdb_coordinates(SAMPLE_DIRECTORY / "traj_3.pdb"),
+    )
+
+
+def test_archive_members(tmp_path: Path) -> None:
+    archive = tmp_path / "traj.tar.xz"
+    write_archive(archive, [3, 1, 2, 10])
+
+    assert is_archive(archive)
+    assert not is_archive(SAMPLE_DIRECTORY)
+    assert [member.name for member in archive_members(archive)] == [
+        "frames/traj_3.pdb",
+        "frames/traj_1.pdb",
+        "frames/traj_2.pdb",
+        "frames/traj_10.pdb",
+    ]
+    assert [member.name for member in trajectory_files(str(archive))] == [
+        "frames/traj_1.pdb",
+        "frames/traj_2.pdb",
+        "frames/traj_3.pdb",
+        "frames/traj_10.pdb",
+    ]
+    assert (
+        read_frame(ArchiveMember(archive, "frames/traj_2.pdb"))
+        == (SAMPLE_DIRECTORY / "traj_2.pdb").read_bytes()
+    )
+
+
+def test_iter_frame_bytes_archive_order(tmp_path: Path) -> None:
+    archive = tmp_path / "traj.tar"
+    write_archive(archive, [4, 2, 3, 1], mode="w")
+    members = [
+        ArchiveMember(archive, f"frames/traj_{state}.pdb") for state in (1, 3, 4)
+    ]
+
+    assert list(iter_frame_bytes(members, ahead=1)) == [
+        (SAMPLE_DIRECTORY / f"traj_{state}.pdb").read_bytes() for state in (1, 3, 4)
+    ]
+    with pytest.raises(ValueError):
+        list(iter_frame_bytes([ArchiveMember(archive, "frames/traj_9.pdb")]))
+
+
+def test_iter_frame_bytes_ahead(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    files = write_compressed(tmp_path / "traj", ".gz", 12)
+    submitted: List[Path] = []
+
+    def read(file: Path) -> bytes:
+        submitted.append(file)
+        return read_frame(file)
+
+    monkeypatch.setattr(archives, "read_frame", read)
+    frames = iter_frame_bytes(files, threads=2, ahead=3)
+    assert next(frames) == (SAMPLE_DIRECTORY / "traj_1.pdb").read_bytes()
+    # Only the frames in the bounded queue are read ahead of the consumed frame
+    assert len(submitted) <= 4
+    assert len(list(frames)) == 11
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_iter_pdb_coordinates_archive(tmp_path: Path, workers: int) -> None:
+    archive = tmp_path / "traj.tar.gz"
+    write_archive(archive, [1, 2, 3, 4, 5], mode="w:gz")
+    members = trajectory_files(str(archive))
+
+    for state, coords in enumerate(iter_pdb_coordinates(members, workers), 1):
+        np.testing.assert_array_equal(
+            coords, parse_pdb_coordinates(SAMPLE_DIRECTORY / f"traj_{state}.pdb")
+        )
+
+
+def test_object_loader_compressed(tmp_path: Path) -> None:
+    write_compressed(tmp_path / "traj", ".bz2", 6)
+    archive = tmp_path / "traj.tar.xz"
+    write_archive(archive, [1, 2, 3, 4, 5, 6])
+    serial_loader = ObjectLoader(str(SAMPLE_DIRECTORY), "test_compressed_serial")
+    serial_loader.load_up_to_state(6)
+
+    for name, directory, workers in (
+        ("test_compressed_files", tmp_path / "traj", None),
+        ("test_compressed_archive", archive, None),
+        ("test_compressed_archive_workers", archive, 2),
+    ):
+        object_loader = ObjectLoader(str(directory), name, workers=workers)
+        object_loader.load_up_to_state(2)
+        object_loader.load_up_to_state(6)
+        assert cmd.count_states(name) == 6
+        for state in range(1, 7):
+            np.testing.assert_array_equal(
+                cmd.get_coordset(name, state),
+                cmd.get_coordset("test_compressed_serial", state),
+            )
+
+
+def test_stream_compressed_archive(
+    tmp_path: Path, capsys: pytest.CaptureFixture
+) -> None:
+    archive = tmp_path / "traj.tar.xz"
+    write_archive(archive, [1, 2, 3, 4])
+    assert not ObjectLoader(str(archive), "test_stream_archive").seekable
+    assert ObjectLoader(str(SAMPLE_DIRECTORY), "test_stream_archive").seekable
+
+    object_dict = {"name": "test_stream_archive", "directory": str(archive)}
+    movie_maker = MovieMaker()
+    movie_maker.load_objects(
+        [{**object_dict, "window_states": 2}],
+        {"test_stream_archive": [1, 3, 4]},
+        stream=True,
+    )
+    assert (
+        "test_stream_archive: states of a compressed archive can only be streamed with a "
+        "cache_dir. The planned states will be loaded instead.\n"
+    ) in capsys.readouterr().out
+    assert cmd.count_states("test_stream_archive") == 4
+    cmd.delete("test_stream_archive")
+
+    # States are read from the coordinate cache instead
+    movie_maker.load_objects(
+        [{**object_dict, "window_states": 2, "cache_dir": str(tmp_path / "cache")}],
+        {"test_stream_archive": [1, 3, 4]},
+        stream=True,
+    )
+    assert "can only be streamed" not in capsys.readouterr().out
+    assert cmd.count_states("test_stream_archive") == 1
+    for _, window in movie_maker._streams.values():
+        window.close()
+    cmd.delete("test_stream_archive")
+
+
+def test_read_frame_zstd(tmp_path: Path) -> None:
+    zstandard = pytest.importorskip("zstandard")
+    data = (SAMPLE_DIRECTORY / "traj_1.pdb").read_bytes()
+    file = tmp_path / "traj_1.pdb.zst"
+    file.write_bytes(zstandard.ZstdCompressor().compress(data))
+
+    assert read_frame(file) == data
+
+    archive = tmp_path / "traj.tar.zst"
+    tar_data = io.BytesIO()
+    with tarfile.open(fileobj=tar_data, mode="w") as tar:
+        tar.add(SAMPLE_DIRECTORY / "traj_1.pdb", "traj_1.pdb")
+    archive.write_bytes(zstandard.ZstdCompressor().compress(tar_data.getvalue()))
+
+    assert list(iter_frame_bytes(trajectory_files(str(archive)))) == [data]
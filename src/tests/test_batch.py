@@ -0,0 +1,76 @@
+"""Test batch."""
+from pathlib import Path
+from typing import Any, Dict
+
+import yaml
+
+from pymol_movie.cli.batch import group_jobs, load_key, render_batch
+from pymol_movie.cli.compiler import compile_yaml
+from pymol_movie.cli.parsers import parse_args
+
+
+def write_config(
+    path: Path,
+    states: int,
+    color: str,
+    directory: str = "./tests/samples/object_trajs/example_object_1",
+) -> str:
+    config: Dict[str, Any] = {
+        "setup": {
+            "objects": [
+                {
+                    "name": "luke",
+                    "directory": directory,
+                    "states": states,
+                }
+            ]
+        },
+        "produce": {"filename": str(path.with_suffix("")), "frames": 10},
+        "scenes": [
+            {
+                "scene": 1,
+                "frame": 1,
+                "objects": [
+                    {
+                        "name": "luke",
+                        "state": 1,
+                        "actions": [{"color": {"selection": "all", "color": color}}],
+                    }
+                ],
+            },
+            {"scene": 2, "frame": 10, "objects": [{"name": "luke", "state": states}]},
+        ],
+    }
+    path.write_text(yaml.dump(config), encoding="utf-8")
+    return str(path)
+
+
+def test_parse_args_batch() -> None:
+    args = parse_args(["batch", "a.yaml", "b.yaml", "--workers", "2"])
+    assert (args.command, args.yaml_filepaths, args.workers) == (
+        "batch",
+        ["a.yaml", "b.yaml"],
+        2,
+    )
+
+
+def test_group_jobs(tmp_path: Path) -> None:
+    red = write_config(tmp_path / "red.yaml", 5, "red")
+    blue = write_config(tmp_path / "blue.yaml", 5, "blue")
+    more = write_config(tmp_path / "more.yaml", 6, "red")
+    assert load_key(compile_yaml(red).config) == load_key(compile_yaml(blue).config)
+    assert group_jobs([red, more, blue, "missing.yaml"]) == [
+        [red, blue],
+        [more],
+        ["missing.yaml"],
+    ]
+
+
+def test_render_batch(tmp_path: Path) -> None:
+    red = write_config(tmp_path / "red.yaml", 5, "red")
+    blue = write_config(tmp_path / "blue.yaml", 5, "blue")
+    results = render_batch([red, blue, str(tmp_path / "missing.yaml")], workers=1)
+    assert [result.yaml_filepath for result in results][:2] == [red, blue]
+    assert [result.error is None for result in results] == [True, True, False]
+    assert results[0].load_s == results[1].load_s
+    assert (tmp_path / "red.pse").exists() and (tmp_path / "blue.pse").exists()
@@ -0,0 +1,27 @@
+"""Test synthetic benchmark inputs."""
+from pathlib import Path
+
+from pymol import cmd
+
+from benchmarks.synthetic import movie_config, write_trajectory
+from pymol_movie.movie.coordinates import parse_pdb_coordinates
+from pymol_movie.movie.loaders import ObjectLoader
+
+
+def test_write_trajectory(tmp_path: Path) -> None:
+    files = write_trajectory(tmp_path, 1200, 3)
+    assert [file.name for file in files] == ["traj_1.pdb", "traj_2.pdb", "traj_3.pdb"]
+    assert parse_pdb_coordinates(files[0]).shape == (1200, 3)
+
+    object_loader = ObjectLoader(str(tmp_path), "test_write_trajectory")
+    object_loader.load_up_to_state(3)
+    assert cmd.count_states("test_write_trajectory") == 3
+    assert cmd.count_atoms("test_write_trajectory and chain B") == 200
+    cmd.delete("test_write_trajectory")
+
+
+def test_movie_config(tmp_path: Path) -> None:
+    config = movie_config(tmp_path, 10)
+    assert [scene["frame"] for scene in config["scenes"]] == [1, 4, 7, 10]
+    assert config["setup"]["objects"][0]["states"] == 10
+    assert config["produce"]["frames"] == 10
@@ -0,0 +1,24 @@
+"""Test frame cache."""
+import os
+from pathlib import Path
+
+from pymol_movie.movie.cache import FrameCache
+
+
+def test_frame_cache(tmp_path: Path) -> None:
+    frame_cache = FrameCache(str(tmp_path))
+    assert frame_cache.get("a") is None
+    frame_cache.put("a", b"frame a")
+    assert frame_cache.get("a") == b"frame a"
+    assert (frame_cache.hits, frame_cache.misses) == (1, 1)
+
+
+def test_frame_cache_evict(tmp_path: Path) -> None:
+    frame_cache = FrameCache(str(tmp_path), max_mb=0.0025)
+    for age, fingerprint in enumerate("abc"):
+        frame_cache.put(fingerprint, bytes(1000))
+        os.utime(frame_cache.path / f"{fingerprint}.png", ns=(age, age))
+    frame_cache.get("a")
+
+    frame_cache.evict()
+    assert sorted(path.stem for path in frame_cache.path.iterdir()) == ["a", "c"]
@@ -0,0 +1,136 @@
+"""Test camera."""
+from pathlib import Path
+
+import numpy as np
+import pytest
+from pymol import cmd
+
+from pymol_movie.movie import camera
+from pymol_movie.movie.movie import MovieMaker
+
+
+def rotation(axis: int, degrees: float) -> np.ndarray:
+    matrix = np.eye(3)
+    first, second = [index for index in range(3) if index != axis]
+    cos, sin = np.cos(np.radians(degrees)), np.sin(np.radians(degrees))
+    matrix[[first, first, second, second], [first, second, first, second]] = [
+        cos,
+        -sin,
+        sin,
+        cos,
+    ]
+    return matrix
+
+
+def view(matrix: np.ndarray, position: float) -> list:
+    return [*matrix.flatten(), 0, 0, position, 1, 2, 3, 40, 80, 0]
+
+
+def test_quaternion_round_trip() -> None:
+    rotations = np.stack(
+        [rotation(0, 30), rotation(1, 170) @ rotation(2, -45), np.eye(3)]
+    )
+    quaternions = camera.rotations_to_quaternions(rotations)
+    np.testing.assert_allclose(np.linalg.norm(quaternions, axis=1), 1)
+    np.testing.assert_allclose(
+        camera.quaternions_to_rotations(quaternions), rotations, atol=1e-12
+    )
+
+
+def test_slerp() -> None:
+    start, end = camera.rotations_to_quaternions(np.stack([np.eye(3), rotation(1, 90)]))
+    t = np.array([0, 0.5, 1])
+    rotations = camera.quaternions_to_rotations(
+        camera.slerp(np.tile(start, (3, 1)), np.tile(end, (3, 1)), t)
+    )
+    np.testing.assert_allclose(
+        rotations, np.stack([np.eye(3), rotation(1, 45), rotation(1, 90)]), atol=1e-12
+    )
+
+
+@pytest.mark.parametrize("method", ["linear", "ease", "spline"])
+def test_camera_path(method: str) -> None:
+    keyframes = [
+        (1, view(np.eye(3), -50)),
+        (11, view(rotation(1, 90), -30)),
+        (31, view(rotation(1, 180), -60)),
+    ]
+    views = camera.camera_path(keyframes, 40, method)
+
+    assert views.shape == (40, 18)
+    for frame, key_view in keyframes:
+        np.testing.assert_allclose(views[frame - 1], key_view, atol=1e-12)
+    np.testing.assert_allclose(views[35], keyframes[-1][1], atol=1e-12)
+    # The camera turns one way between keyframes
+    angles = np.arctan2(views[:31, 2], views[:31, 0])
+    assert np.all(np.diff(np.unwrap(angles)) <= 1e-12)
+
+
+def test_camera_path_ease() -> None:
+    keyframes = [(1, view(np.eye(3), -50)), (11, view(np.eye(3), -30))]
+    linear = camera.camera_path(keyframes, 11, "linear")[:, 11]
+    ease = camera.camera_path(keyframes, 11, "ease")[:, 11]
+
+    np.testing.assert_allclose(np.diff(linear), 2)
+    assert np.diff(ease)[0] < 2 < np.diff(ease)[4]
+    np.testing.assert_allclose(ease[5], linear[5])
+
+
+def test_camera_path_invalid() -> None:
+    with pytest.raises(ValueError):
+        camera.camera_path([(1, view(np.eye(3), -50))], 10, "pymol")
+    with pytest.raises(ValueError):
+        camera.camera_path([], 10, "spline")
+
+
+def test_cached_camera_path(tmp_path: Path) -> None:
+    keyframes = [(1, view(np.eye(3), -50)), (11, view(rotation(0, 60), -30))]
+    views = camera.cached_camera_path(keyframes, 20, "spline", str(tmp_path))
+    assert len(list(tmp_path.glob("*.npy"))) == 1
+
+    np.testing.assert_array_equal(
+        camera.cached_camera_path(keyframes, 20, "spline", str(tmp_path)), views
+    )
+    camera.cached_camera_path(keyframes, 20, "ease", str(tmp_path))
+    assert len(list(tmp_path.glob("*.npy"))) == 2
+
+
+def test_store_camera_path(tmp_path: Path) -> None:
+    movie_maker = MovieMaker(camera_cache_dir=str(tmp_path))
+    cmd.fragment("ala", "test_store_camera_path")
+    movie_maker.store_baseline()
+    scene_dict = {
+        "scene": "test_store_camera_path",
+        "frame": 1,
+        "objects": [{"name": "test_store_camera_path", "state": 1}],
+    }
+    movie_maker.setup_scene(scene_dict)
+    cmd.turn("y", 120)
+    cmd.move("z", -10)
+    movie_maker.setup_scene({**scene_dict, "scene": "turned", "frame": 10})
+    movie_maker.produce_movie(
+        {
+            "filename": str(tmp_path / "test"),
+            "frames": 20,
+            "produce": "",
+            "camera_path": "spline",
+        }
+    )
+    assert len(list((tmp_path / "camera").glob("*.npy"))) == 1
+
+    views = camera.cached_camera_path(
+        [
+            (1, movie_maker._scene_views["test_store_camera_path"]),
+            (10, movie_maker._scene_views["turned"]),
+            (20, movie_maker._scene_views["turned"]),
+        ],
+        20,
+        "spline",
+    )
+    # Frames are shown in any order
+    for frame in (15, 4, 20, 1, 7):
+        cmd.frame(frame)
+        np.testing.assert_allclose(cmd.get_view(), views[frame - 1], atol=1e-3)
+
+    movie_maker.reset()
+    cmd.delete("test_store_camera_path")
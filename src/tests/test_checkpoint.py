@@ -0,0 +1,32 @@
+"""Test render manifest."""
+from pathlib import Path
+
+import pytest
+
+from pymol_movie.movie.checkpoint import RenderManifest
+from pymol_movie.movie.render import frame_path
+
+
+def test_render_manifest(tmp_path: Path) -> None:
+    manifest = RenderManifest(tmp_path / "manifest.jsonl", "config")
+    assert not manifest.completed(tmp_path)
+
+    for frame in range(1, 5):
+        frame_path(tmp_path, frame).write_bytes(bytes([frame]))
+        manifest.add(frame, bytes([frame]))
+    frame_path(tmp_path, 2).write_bytes(b"corrupt")
+    frame_path(tmp_path, 3).unlink()
+    with open(manifest.path, "a", encoding="utf-8") as manifest_file:
+        manifest_file.write('{"frame": 5, "sh')
+
+    assert manifest.completed(tmp_path) == {
+        1: frame_path(tmp_path, 1),
+        4: frame_path(tmp_path, 4),
+    }
+    assert len(manifest.path.read_text().splitlines()) == 3
+
+
+def test_render_manifest_config_changed(tmp_path: Path) -> None:
+    RenderManifest(tmp_path / "manifest.jsonl", "config").completed(tmp_path)
+    with pytest.raises(ValueError):
+        RenderManifest(tmp_path / "manifest.jsonl", "changed").completed(tmp_path)
@@ -0,0 +1,58 @@
+"""Test commands."""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from pymol_movie.cli.commands import resolve_objects, run
+from pymol_movie.cli.compiler import compile_yaml
+from pymol_movie.cli.parsers import parse_args
+
+EXAMPLE = "./tests/samples/yamls/example.yaml"
+
+
+def test_parse_args_commands() -> None:
+    args = parse_args(["validate", EXAMPLE, EXAMPLE])
+    assert args.command == "validate"
+    assert args.yaml_filepaths == [EXAMPLE, EXAMPLE]
+    assert parse_args([EXAMPLE]).command == "render"
+
+
+def test_validate_does_not_import_pymol() -> None:
+    code = (
+        "import sys\n"
+        "from pymol_movie.__main__ import main\n"
+        f"sys.argv = ['pymol_movie', 'validate', '{EXAMPLE}']\n"
+        "try:\n"
+        "    main()\n"
+        "except SystemExit as exit:\n"
+        "    assert exit.code == 0, exit.code\n"
+        "assert 'pymol' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_plan(capsys: pytest.CaptureFixture) -> None:
+    assert run(parse_args(["plan", EXAMPLE])) == 0
+    plan = json.loads(capsys.readouterr().out)[EXAMPLE]
+    assert plan["frames"] == 300
+    luke = plan["objects"]["luke"]
+    assert luke["available_states"] == 245
+    assert luke["load_states"] == list(range(1, 201))
+    assert len(luke["frame_states"]) == 300
+    # States follow the order of the files, the gap is only reported
+    assert luke["warnings"] == [
+        "frames 242, 244 are missing, states follow the frame order of the files"
+    ]
+
+
+def test_resolve_objects_errors(tmp_path: Path) -> None:
+    config = compile_yaml(EXAMPLE).config
+    config["setup"]["objects"][0]["states"] = 1000
+    config["setup"]["objects"][1]["directory"] = str(tmp_path)
+    objects, errors = resolve_objects(config)
+    assert list(objects) == ["luke", "isaac"]
+    assert "1000 states requested but only 245 available" in errors[0]
+    assert "no trajectory files found" in errors[1]
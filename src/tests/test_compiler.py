@@ -0,0 +1,86 @@
+"""Test configuration compiler."""
+import copy
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+
+from pymol_movie.cli.compiler import compile_config, compile_yaml, validate_config
+from pymol_movie.cli.parsers import parse_yaml
+from pymol_movie.movie import actions
+
+EXAMPLE_YAML = "./tests/samples/yamls/example.yaml"
+
+
+def test_validate_config() -> None:
+    assert validate_config(parse_yaml(EXAMPLE_YAML)) == []
+
+
+@pytest.mark.parametrize(
+    ("path", "value", "error"),
+    [
+        (("produce", "frames"), "many", "produce.frames: invalid value 'many'"),
+        (("setup", "objects", 0, "directoy"), "./luke", 'unknown key "directoy"'),
+        (
+            ("scenes", 1, "camera", 0),
+            {"orient": {}},
+            'scenes[1].camera[0].orient: missing required key "selection"',
+        ),
+        (
+            ("scenes", 2, "objects", 0, "actions", 0),
+            {"colour": {"color": "red", "selection": "all"}},
+            'the choice "colour" is not recognized',
+        ),
+        (
+            ("scenes", 0, "objects", 0, "name"),
+            "leia",
+            'object "leia" is not in setup',
+        ),
+    ],
+)
+def test_validate_config_errors(path: tuple, value: Any, error: str) -> None:
+    config = copy.deepcopy(parse_yaml(EXAMPLE_YAML))
+    parent = config
+    for key in path[:-1]:
+        parent = parent[key]
+    parent[path[-1]] = value
+
+    errors = validate_config(config)
+    assert len(errors) == 1
+    assert error in errors[0]
+    with pytest.raises(ValueError, match="Invalid configuration"):
+        compile_config(config)
+
+
+def test_compile_yaml_cache(tmp_path: Path) -> None:
+    plan = compile_yaml(EXAMPLE_YAML, str(tmp_path))
+    assert [scene_plan.scene_dict["scene"] for scene_plan in plan.scenes] == list(
+        range(1, 8)
+    )
+    assert len(list((tmp_path / "plans").iterdir())) == 1
+
+    cached_plan = compile_yaml(EXAMPLE_YAML, str(tmp_path))
+    assert cached_plan.config == plan.config
+    assert [action_call.choice for action_call in cached_plan.scenes[0].camera] == [
+        "turn"
+    ]
+
+
+def test_register_model_action() -> None:
+    calls = []
+
+    @actions.register_model_action("test_action", ("selection",))
+    def test_action(name: str, details: Dict[str, Any]) -> None:
+        calls.append((name, details["selection"]))
+
+    try:
+        config = copy.deepcopy(parse_yaml(EXAMPLE_YAML))
+        config["scenes"][0]["objects"][0]["actions"] = [
+            {"test_action": {"selection": "all"}}
+        ]
+        plan = compile_config(config)
+        for action_call in plan.scenes[0].objects[0][1]:
+            action_call.call()
+        assert calls == [("luke", "all")]
+    finally:
+        del actions.MODEL_ACTIONS["test_action"]
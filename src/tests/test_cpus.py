@@ -0,0 +1,15 @@
+"""Test cpus."""
+import pytest
+
+from pymol_movie.movie import cpus
+
+
+def test_available_cpus(monkeypatch: pytest.MonkeyPatch) -> None:
+    assert cpus.available_cpus() >= 1
+
+    # Platforms without cpu affinity
+    monkeypatch.delattr(cpus.os, "sched_getaffinity", raising=False)
+    monkeypatch.setattr(cpus.os, "cpu_count", lambda: None)
+    assert cpus.available_cpus() == 1
+    monkeypatch.setattr(cpus.os, "cpu_count", lambda: 6)
+    assert cpus.available_cpus() == 6
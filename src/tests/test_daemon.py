@@ -0,0 +1,101 @@
+"""Test daemon."""
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from pymol_movie.cli.daemon import RenderDaemon, send_job, source_key, submit_yaml
+from pymol_movie.cli.parsers import parse_args
+from tests.test_batch import write_config
+from tests.test_manifest import age
+
+
+def test_parse_args_daemon() -> None:
+    assert parse_args(["serve"]).socket is None
+    args = parse_args(["submit", "a.yaml", "--socket", "daemon.sock"])
+    assert (args.command, args.yaml_filepaths, args.socket) == (
+        "submit",
+        ["a.yaml"],
+        "daemon.sock",
+    )
+
+
+def test_source_key(tmp_path: Path) -> None:
+    directory = tmp_path / "trajectory"
+    directory.mkdir()
+    (directory / "traj_1.pdb").write_text("END\n", encoding="utf-8")
+    config = {"setup": {"objects": [{"name": "test", "directory": str(directory)}]}}
+    # Directories modified just before they are keyed never match
+    assert source_key(config) != source_key(config)
+    age(directory)
+    key = source_key(config)
+    assert source_key(config) == key
+    (directory / "traj_2.pdb").write_text("END\n", encoding="utf-8")
+    assert source_key(config) != key
+
+
+def test_daemon(tmp_path: Path) -> None:
+    directory = tmp_path / "trajectory"
+    shutil.copytree("./tests/samples/object_trajs/example_object_1", directory)
+    red = write_config(tmp_path / "red.yaml", 5, "red", str(directory))
+    blue = write_config(tmp_path / "blue.yaml", 5, "blue", str(directory))
+    socket_path = str(tmp_path / "daemon.sock")
+
+    daemon = subprocess.Popen(
+        [sys.executable, "-m", "pymol_movie", "serve", "--socket", socket_path]
+    )
+    try:
+        for _ in range(100):
+            if Path(socket_path).exists():
+                break
+            time.sleep(0.1)
+
+        results = [submit_yaml(path, socket_path) for path in (red, blue)]
+        assert [result["output"] for result in results] == [
+            str(tmp_path / "red.pse"),
+            str(tmp_path / "blue.pse"),
+        ]
+        assert [result["reloaded"] for result in results] == [True, False]
+        assert (tmp_path / "blue.pse").exists()
+
+        # A file added to the directory changes its mtime
+        (directory / "notes.txt").write_text("", encoding="utf-8")
+        assert submit_yaml(red, socket_path)["reloaded"]
+        assert "error" in send_job({"config": "setup: {}"}, socket_path)
+
+        assert send_job({"stop": True}, socket_path) == {"stopped": True, "jobs": 4}
+        assert daemon.wait(timeout=10) == 0
+    finally:
+        daemon.kill()
+
+
+def test_daemon_invalid_job(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    socket_path = str(tmp_path / "daemon.sock")
+    daemon = RenderDaemon(socket_path)
+
+    def run_job(job: dict) -> dict:
+        raise KeyError("config")
+
+    monkeypatch.setattr(daemon, "run_job", run_job)
+    thread = threading.Thread(target=daemon.serve, daemon=True)
+    thread.start()
+    try:
+        for _ in range(100):
+            if Path(socket_path).exists():
+                break
+            time.sleep(0.1)
+
+        # Valid json that is not a job object is refused like invalid json
+        assert send_job([1, 2], socket_path) == {  # type: ignore[arg-type]
+            "error": "Invalid job: a job must be a JSON object"
+        }
+        # A job that fails outside of running it still gets a result
+        assert send_job({"config": {}}, socket_path) == {"error": "'config'"}
+        assert send_job({"stop": True}, socket_path) == {"stopped": True, "jobs": 0}
+    finally:
+        thread.join(timeout=10)
+    assert not thread.is_alive()
@@ -0,0 +1,180 @@
+"""Test encoding."""
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Any, List
+
+import pytest
+from pymol import cmd
+
+from pymol_movie.movie import encoding
+from pymol_movie.movie.encoding import (
+    concat_command,
+    concat_list,
+    output_arguments,
+    segment_command,
+    split_segments,
+)
+from pymol_movie.movie.render import frame_path
+
+PRODUCE_DICT = {
+    "filename": "test",
+    "mode": "normal",
+    "width": 32,
+    "height": 24,
+    "framerate": 5,
+    "quality": 100,
+    "frames": 23,
+}
+
+
+def test_output_arguments() -> None:
+    mpg = output_arguments("test.mpg", {**PRODUCE_DICT, "framerate": 25})
+    assert mpg[mpg.index("-c:v") + 1] == "mpeg1video"
+    assert mpg[mpg.index("-q:v") + 1] == "1"
+    assert mpg[mpg.index("-g") + 1] == "50"
+    assert "-r" not in mpg
+    assert mpg[-1] == "test.mpg"
+
+    # mpeg1video only supports a few frame rates, so frames are repeated
+    mpg = output_arguments("test.mpg", PRODUCE_DICT)
+    assert mpg[mpg.index("-r") + 1] == "24"
+    assert mpg[mpg.index("-g") + 1] == "48"
+    mpg = output_arguments("test.mpg", {**PRODUCE_DICT, "framerate": 120})
+    assert mpg[mpg.index("-r") + 1] == "60"
+
+    mp4 = output_arguments("test.mp4", {**PRODUCE_DICT, "quality": 0})
+    assert mp4[mp4.index("-c:v") + 1] == "libx264"
+    assert mp4[mp4.index("-crf") + 1] == "40"
+    assert mp4[mp4.index("-g") + 1] == "10"
+    assert "-r" not in mp4
+    webm = output_arguments("test.webm", PRODUCE_DICT)
+    assert webm[webm.index("-c:v") + 1] == "libvpx-vp9"
+    assert output_arguments("test.avi", PRODUCE_DICT)[:2] == ["-c:v", "mpeg1video"]
+
+
+def test_split_segments() -> None:
+    assert split_segments(23, 4, 5) == [range(1, 11), range(11, 21), range(21, 24)]
+    assert split_segments(23, 1, 5) == [range(1, 24)]
+    assert split_segments(3, 4, 5) == [range(1, 4)]
+    for segment in split_segments(1000, 7, 48)[:-1]:
+        assert len(segment) % 48 == 0
+
+
+def test_segment_command(tmp_path: Path) -> None:
+    command = segment_command(
+        tmp_path, "segment.mp4", PRODUCE_DICT, range(11, 21), threads=2
+    )
+    assert command[command.index("-start_number") + 1] == "11"
+    assert command[command.index("-frames:v") + 1] == "10"
+    assert command[command.index("-threads") + 1] == "2"
+    assert str(tmp_path / "frame%04d.png") in command
+    assert command[-1] == "segment.mp4"
+
+    # Repeated frames of mpg segments are counted
+    command = segment_command(tmp_path, "segment.mpg", PRODUCE_DICT, range(11, 21))
+    assert command[command.index("-frames:v") + 1] == "48"
+
+
+def test_concat(tmp_path: Path) -> None:
+    command = concat_command(tmp_path / "segments.txt", "test.mp4")
+    assert command[command.index("-f") + 1] == "concat"
+    assert command[command.index("-c") + 1] == "copy"
+    assert "+faststart" in command
+    assert "+faststart" not in concat_command(tmp_path / "segments.txt", "test.mpg")
+
+    segments = [tmp_path / "segment0000.mpg", tmp_path / "it's.mpg"]
+    assert concat_list(segments) == (
+        f"file '{tmp_path}/segment0000.mpg'\nfile '{tmp_path}/it'\\''s.mpg'\n"
+    )
+
+
+def test_encode_segments(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    commands: List[List[str]] = []
+
+    def run(command: List[str], **kwargs: Any) -> None:
+        commands.append(command)
+        if command[command.index("-f") + 1] == "concat":
+            list_file = Path(command[command.index("-i") + 1])
+            commands.append(list_file.read_text(encoding="utf-8").splitlines())
+
+    monkeypatch.setattr(encoding.subprocess, "run", run)
+    filename = str(tmp_path / "test.webm")
+    assert encoding.encode_segments(tmp_path, filename, PRODUCE_DICT, 4) == 3
+
+    starts = sorted(
+        int(command[command.index("-start_number") + 1]) for command in commands[:3]
+    )
+    assert starts == [1, 11, 21]
+    assert commands[3][-1] == filename
+    assert [line.rsplit("/", 1)[1] for line in commands[4]] == [
+        "segment0000.webm'",
+        "segment0001.webm'",
+        "segment0002.webm'",
+    ]
+
+    commands.clear()
+    assert encoding.encode_segments(tmp_path, filename, PRODUCE_DICT, 1) == 1
+    assert len(commands) == 1
+    assert commands[0][-1] == filename
+
+
+def test_encode_segments_mpg(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    commands: List[List[str]] = []
+    streams: List[bytes] = []
+
+    def run(command: List[str], **kwargs: Any) -> None:
+        commands.append(command)
+        if "-start_number" in command:
+            Path(command[-1]).write_text(command[command.index("-start_number") + 1])
+        else:
+            streams.append(Path(command[command.index("-i") + 1]).read_bytes())
+
+    monkeypatch.setattr(encoding.subprocess, "run", run)
+    filename = str(tmp_path / "test.mpg")
+    assert encoding.encode_segments(tmp_path, filename, PRODUCE_DICT, 4) == 3
+
+    # Raw segments are appended in order and put in the mpg file with new timestamps
+    assert all(command[-1].endswith(".m1v") for command in commands[:3])
+    assert streams == [b"11121"]
+    remux = commands[3]
+    assert remux[remux.index("-f") + 1] == "mpegvideo"
+    assert remux[remux.index("-bsf:v") + 1] == "setts=ts=N:time_base=1/24"
+    assert remux[-1] == filename
+
+
+@pytest.mark.skipif(
+    not (shutil.which("ffmpeg") and shutil.which("ffprobe")),
+    reason="ffmpeg is not installed",
+)
+@pytest.mark.parametrize("extension", ["mpg", "mp4"])
+def test_encode_segments_ffmpeg(tmp_path: Path, extension: str) -> None:
+    # Three segments of whole groups of pictures at a frame rate every codec supports
+    produce_dict = {**PRODUCE_DICT, "framerate": 25, "frames": 120}
+    cmd.fragment("ala", "test_encode_segments")
+    for frame in range(1, produce_dict["frames"] + 1):
+        cmd.turn("y", 3)
+        frame_path(tmp_path, frame).write_bytes(
+            cmd.png(None, width=32, height=24, quiet=1)
+        )
+    filename = str(tmp_path / f"test.{extension}")
+    assert encoding.encode_segments(tmp_path, filename, produce_dict, 3) == 3
+
+    frames = subprocess.run(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-count_frames",
+            "-show_entries",
+            "stream=nb_read_frames",
+            "-of",
+            "csv=p=0",
+            filename,
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    assert int(frames) == produce_dict["frames"]
+    cmd.delete("test_encode_segments")
@@ -0,0 +1,48 @@
+"""Test estimate."""
+import pytest
+from pymol import cmd
+
+from pymol_movie.cli.parsers import parse_args
+from pymol_movie.movie.estimate import estimate_render, sample_frames
+
+PRODUCE_DICT = {
+    "filename": "test",
+    "mode": "normal",
+    "width": 32,
+    "height": 24,
+    "framerate": 30,
+    "quality": 100,
+    "frames": 100,
+}
+
+
+def test_parse_args_estimate() -> None:
+    assert parse_args(["movie.yaml"]).estimate is None
+    args = parse_args(["movie.yaml", "--estimate", "--max-hours", "2"])
+    assert (args.estimate, args.max_hours) == (8, 2)
+    assert parse_args(["movie.yaml", "--estimate", "3"]).estimate == 3
+
+
+def test_sample_frames() -> None:
+    assert sample_frames([1], 100, 4) == [13, 38, 63, 88]
+    # Every scene gets a sample even if it is short
+    assert sample_frames([1, 91, 100], 100, 2) == [23, 68, 95, 100]
+    assert sample_frames([1], 3, 10) == [1, 2, 3]
+
+
+def test_estimate_render() -> None:
+    cmd.fragment("ala", "test_estimate_render")
+    cmd.mset("1x100")
+    shown = []
+    estimate = estimate_render(PRODUCE_DICT, [1, 50], 4, 1.0, shown.append)
+    assert shown == [1, 50]
+    assert estimate.frames == 100
+    assert estimate.frame_mb > 0
+    assert estimate.serial_s == 1.0 + estimate.frame_s * 100
+    assert estimate.parallel_s == pytest.approx(
+        1.0 + 2 * estimate.session_s + estimate.frame_s * 100 / 4
+    )
+    assert estimate.parallel_peak_mb == 5 * estimate.serial_peak_mb
+    assert "4 workers" in estimate.format()
+    cmd.delete("test_estimate_render")
+    cmd.mset()
@@ -1,7 +1,20 @@
 """Test Loaders."""
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
 import pytest
+from pymol import cmd
 
+from benchmarks.synthetic import write_trajectory
+from pymol_movie.movie.cache import TrajectoryCache
+from pymol_movie.movie.coordinates import parse_pdb_coordinates
 from pymol_movie.movie.loaders import ObjectLoader, load_trajectory
+from pymol_movie.movie.readers import open_trajectory
 
 
 def test_load_trajectory(capsys: pytest.CaptureFixture) -> None:
@@ -29,3 +42,259 @@ def test_object_loader_load_up_to_state() -> None:
     object_loader.load_up_to_state(10)
     object_loader.load_up_to_state(50)
     assert object_loader.loaded_states == 50
+
+
+def test_object_loader_workers_matches_serial() -> None:
+    serial_loader = ObjectLoader(
+        "./tests/samples/object_trajs/example_object_2", "test_serial_loader"
+    )
+    serial_loader.load_up_to_state(10)
+    serial_loader.load_up_to_state(20)
+    parallel_loader = ObjectLoader(
+        "./tests/samples/object_trajs/example_object_2",
+        "test_parallel_loader",
+        workers=2,
+    )
+    parallel_loader.load_up_to_state(10)
+    parallel_loader.load_up_to_state(20)
+
+    assert parallel_loader.loaded_states == serial_loader.loaded_states == 20
+    assert cmd.count_states("test_parallel_loader") == 20
+    assert cmd.count_atoms("test_parallel_loader") == cmd.count_atoms(
+        "test_serial_loader"
+    )
+    for state in range(1, 21):
+        np.testing.assert_array_equal(
+            cmd.get_coordset("test_parallel_loader", state),
+            cmd.get_coordset("test_serial_loader", state),
+        )
+
+
+def test_parse_pdb_coordinates() -> None:
+    coords = parse_pdb_coordinates(
+        "./tests/samples/object_trajs/example_object_1/traj_1.pdb"
+    )
+    assert coords.shape == (4525, 3)
+    np.testing.assert_allclose(coords[0], [-33.815, 6.727, -16.363], rtol=1e-6)
+
+
+def test_object_loader_cache(tmp_path: Path) -> None:
+    serial_loader = ObjectLoader(
+        "./tests/samples/object_trajs/example_object_2", "test_cache_serial"
+    )
+    serial_loader.load_up_to_state(15)
+    cache_dir = str(tmp_path / "cache")
+    for name in ("test_cache_build", "test_cache_load"):
+        object_loader = ObjectLoader(
+            "./tests/samples/object_trajs/example_object_2", name, cache_dir=cache_dir
+        )
+        object_loader.load_up_to_state(5)
+        object_loader.load_up_to_state(15)
+        assert object_loader.loaded_states == 15
+        assert cmd.count_states(name) == 15
+        for state in range(1, 16):
+            np.testing.assert_array_equal(
+                cmd.get_coordset(name, state),
+                cmd.get_coordset("test_cache_serial", state),
+            )
+
+
+def test_trajectory_cache_stale(tmp_path: Path) -> None:
+    directory = tmp_path / "traj"
+    directory.mkdir()
+    for state in range(1, 4):
+        shutil.copyfile(
+            f"./tests/samples/object_trajs/example_object_1/traj_{state}.pdb",
+            directory / f"traj_{state}.pdb",
+        )
+    files = sorted(directory.glob("*.pdb"))
+    cache = TrajectoryCache(files, str(tmp_path / "cache"))
+    assert not cache.is_valid()
+    cache.build()
+    assert cache.is_valid()
+    assert cache.coordinates().shape == (3, 4525, 3)
+
+    shutil.copyfile(
+        "./tests/samples/object_trajs/example_object_1/traj_100.pdb", files[1]
+    )
+    assert not cache.is_valid()
+    cache.build(workers=2)
+    assert cache.is_valid()
+    np.testing.assert_array_equal(
+        cache.coordinates()[1], parse_pdb_coordinates(files[1])
+    )
+
+
+def test_object_loader_reader() -> None:
+    object_loader = ObjectLoader(
+        None,
+        "test_object_loader_reader",
+        reader=open_trajectory(
+            "./tests/samples/trajectories/traj.dcd",
+            "./tests/samples/trajectories/topology.pdb",
+        ),
+    )
+    object_loader.load_up_to_state(2)
+    object_loader.load_up_to_state(10)
+    assert object_loader.loaded_states == 6
+    assert cmd.count_states("test_object_loader_reader") == 6
+    assert cmd.count_atoms("test_object_loader_reader") == 300
+    np.testing.assert_allclose(
+        cmd.get_coordset("test_object_loader_reader", 4),
+        object_loader.reader.read(3),
+    )
+
+
+@pytest.mark.parametrize(
+    ("workers", "cache", "trajectory"),
+    [(None, False, False), (2, False, False), (None, True, False), (None, False, True)],
+)
+def test_object_loader_load_selected_states(
+    workers: Optional[int], cache: bool, trajectory: bool, tmp_path: Path
+) -> None:
+    name = f"test_selected_{workers}_{cache}_{trajectory}"
+    if trajectory:
+        object_loader = ObjectLoader(
+            None,
+            name,
+            reader=open_trajectory("./tests/samples/trajectories/multi_model.pdb"),
+        )
+    else:
+        object_loader = ObjectLoader(
+            "./tests/samples/object_trajs/example_object_1",
+            name,
+            workers=workers,
+            cache_dir=str(tmp_path) if cache else None,
+        )
+    object_loader.load_selected_states([3, 2, 3])
+    assert object_loader.loaded_states == 3
+    assert cmd.count_states(name) == 3
+    assert cmd.get_coordset(name, 1) is None
+    expected_coords = parse_pdb_coordinates(
+        "./tests/samples/object_trajs/example_object_1/traj_3.pdb"
+    )
+    np.testing.assert_allclose(
+        cmd.get_coordset(name, 3), expected_coords[: cmd.count_atoms(name)]
+    )
+
+    with pytest.raises(ValueError, match="states"):
+        object_loader.load_selected_states([object_loader.total_states + 1])
+
+
+def test_object_loader_stream() -> None:
+    object_loader = ObjectLoader(
+        "./tests/samples/object_trajs/example_object_1", "test_object_loader_stream"
+    )
+    window = object_loader.stream([5, 5, 6, 7], max_states=2)
+    for state in [5, 5, 6, 7]:
+        object_loader.show_state(window, state)
+        assert cmd.count_states("test_object_loader_stream") == 1
+        np.testing.assert_allclose(
+            cmd.get_coordset("test_object_loader_stream", 1),
+            parse_pdb_coordinates(
+                f"./tests/samples/object_trajs/example_object_1/traj_{state}.pdb"
+            ),
+        )
+    window.close()
+    assert window.peak_bytes <= 2 * 4525 * 3 * 4
+
+
+def test_object_loader_stream_cache(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    object_loader = ObjectLoader(
+        "./tests/samples/object_trajs/example_object_1",
+        "test_object_loader_stream_cache",
+        cache_dir=str(tmp_path / "cache"),
+    )
+    window = object_loader.stream([3, 4, 5], max_states=2)
+    keys = []
+    key = TrajectoryCache.key
+    monkeypatch.setattr(
+        TrajectoryCache, "key", lambda cache: keys.append(1) or key(cache)
+    )
+    for state in [3, 4, 5]:
+        object_loader.show_state(window, state)
+        np.testing.assert_allclose(
+            cmd.get_coordset("test_object_loader_stream_cache", 1),
+            parse_pdb_coordinates(
+                f"./tests/samples/object_trajs/example_object_1/traj_{state}.pdb"
+            ),
+        )
+    window.close()
+    # The trajectory files are not stat'ed again for every streamed state
+    assert not keys
+    cmd.delete("test_object_loader_stream_cache")
+
+
+def test_parse_pdb_coordinates_atoms() -> None:
+    filepath = "./tests/samples/object_trajs/example_object_1/traj_1.pdb"
+    atoms = np.array([0, 5, 4524])
+    np.testing.assert_array_equal(
+        parse_pdb_coordinates(filepath, atoms), parse_pdb_coordinates(filepath)[atoms]
+    )
+
+
+@pytest.mark.parametrize(
+    ("workers", "cache"), [(None, False), (2, False), (None, True)]
+)
+def test_object_loader_atoms(
+    workers: Optional[int], cache: bool, tmp_path: Path
+) -> None:
+    directory = "./tests/samples/object_trajs/example_object_1"
+    ObjectLoader(directory, "test_atoms_full").load_up_to_state(5)
+    name = "test_atoms_subset"
+    object_loader = ObjectLoader(
+        directory,
+        name,
+        workers=workers,
+        cache_dir=str(tmp_path) if cache else None,
+        atoms="chain A and not hydro",
+    )
+    object_loader.load_up_to_state(5)
+    assert cmd.count_atoms(name) == cmd.count_atoms(
+        "test_atoms_full and chain A and not hydro"
+    )
+    for state in range(1, 6):
+        np.testing.assert_array_equal(
+            cmd.get_coords(name, state),
+            cmd.get_coords("test_atoms_full and chain A and not hydro", state),
+        )
+    cmd.delete("test_atoms_*")
+
+    with pytest.raises(ValueError):
+        ObjectLoader(directory, name, atoms="chain Z").load_up_to_state(1)
+
+
+@pytest.mark.skipif(
+    not os.path.exists("/proc/self/statm"),
+    reason="reads the resident memory from /proc",
+)
+def test_object_loader_atoms_memory(tmp_path: Path) -> None:
+    write_trajectory(tmp_path, atoms=10000, frames=40)
+    # Growth of the resident memory from loading states 11 to 40 in a new process
+    code = (
+        "import sys\n"
+        "from pymol_movie.movie.loaders import ObjectLoader\n"
+        "def rss():\n"
+        "    with open('/proc/self/statm') as statm:\n"
+        "        return int(statm.read().split()[1])\n"
+        "object_loader = ObjectLoader(sys.argv[1], 'test', atoms=sys.argv[2] or None)\n"
+        "object_loader.load_up_to_state(10)\n"
+        "start = rss()\n"
+        "object_loader.load_up_to_state(40)\n"
+        "print(rss() - start)\n"
+    )
+    full, subset = (
+        int(
+            subprocess.run(
+                [sys.executable, "-c", code, str(tmp_path), atoms],
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout
+        )
+        for atoms in ("", "chain A")
+    )
+    # Chain A is a tenth of the atoms
+    assert subset < full / 3
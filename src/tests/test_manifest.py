@@ -0,0 +1,136 @@
+"""Test Manifest."""
+import os
+import shutil
+import tarfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+from pymol import cmd
+
+from pymol_movie.movie import manifest as manifest_module
+from pymol_movie.movie.coordinates import parse_pdb_coordinates
+from pymol_movie.movie.loaders import ObjectLoader
+from pymol_movie.movie.manifest import (
+    FrameManifest,
+    frame_number,
+    load_archive_members,
+    missing_ranges,
+)
+
+SAMPLE_DIRECTORY = Path("./tests/samples/object_trajs/example_object_2")
+
+
+def write_directory(directory: Path, numbers: list) -> None:
+    directory.mkdir()
+    for number in numbers:
+        shutil.copyfile(
+            SAMPLE_DIRECTORY / "traj_1.pdb", directory / f"traj_{number}.pdb"
+        )
+    age(directory)
+
+
+def age(directory: Path) -> None:
+    # Directories modified just before they are scanned are scanned again next time
+    old = time.time() - 60
+    os.utime(directory, (old, old))
+
+
+def test_frame_number() -> None:
+    assert frame_number("traj_12.pdb") == 12
+    assert frame_number("frame0012.pdb.gz") == 12
+    assert frame_number("dir/traj_3.PDB") == 3
+    assert frame_number("topology.pdb") is None
+
+
+def test_missing_ranges() -> None:
+    assert missing_ranges([1, 2, 4, 7]) == [(3, 3), (5, 6)]
+    assert missing_ranges([0, 10, 20, 50]) == [(30, 40)]
+    assert missing_ranges([5]) == []
+
+
+def test_frame_manifest(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    directory = tmp_path / "traj"
+    write_directory(directory, [10, 2, 1, 3])
+    (directory / "topology.pdb").write_text("")
+    (directory / "notes.txt").write_text("")
+    age(directory)
+    manifest_dir = str(tmp_path / "manifests")
+
+    manifest = FrameManifest.load(directory, manifest_dir)
+    assert manifest.names == ["traj_1.pdb", "traj_2.pdb", "traj_3.pdb", "traj_10.pdb"]
+    assert manifest.files()[3] == directory / "traj_10.pdb"
+    assert manifest.unnumbered == ["topology.pdb"]
+    assert manifest.missing() == [(4, 9)]
+    assert len(manifest.warnings()) == 2
+    assert manifest.warnings(gaps=False) == [
+        "skipped 1 pdb files without a frame number, e.g. topology.pdb"
+    ]
+    assert manifest.path.exists()
+
+    # An unchanged directory is not listed again
+    def scandir(path: str) -> None:
+        raise AssertionError(f"{path} was listed")
+
+    monkeypatch.setattr(manifest_module.os, "scandir", scandir)
+    assert FrameManifest.load(directory, manifest_dir).names == manifest.names
+    monkeypatch.undo()
+
+    # A changed directory is listed again
+    shutil.copyfile(SAMPLE_DIRECTORY / "traj_1.pdb", directory / "traj_4.pdb")
+    (directory / "traj_1.pdb").unlink()
+    manifest = FrameManifest.load(directory, manifest_dir)
+    assert manifest.names == ["traj_2.pdb", "traj_3.pdb", "traj_4.pdb", "traj_10.pdb"]
+
+
+def test_load_archive_members(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    archive = tmp_path / "traj.tar.gz"
+    with tarfile.open(archive, "w:gz") as tar:
+        for state in (2, 1):
+            tar.add(SAMPLE_DIRECTORY / f"traj_{state}.pdb", f"traj_{state}.pdb")
+    manifest_dir = str(tmp_path / "manifests")
+    members = load_archive_members(archive, manifest_dir)
+    assert [member.name for member in members] == ["traj_2.pdb", "traj_1.pdb"]
+
+    # An unchanged archive is not decompressed to list it again
+    def archive_members(path: Path) -> None:
+        raise AssertionError(f"{path} was listed")
+
+    monkeypatch.setattr(manifest_module, "archive_members", archive_members)
+    assert load_archive_members(archive, manifest_dir) == members
+    monkeypatch.undo()
+
+    with tarfile.open(archive, "w:gz") as tar:
+        tar.add(SAMPLE_DIRECTORY / "traj_3.pdb", "traj_3.pdb")
+    assert [member.name for member in load_archive_members(archive, manifest_dir)] == [
+        "traj_3.pdb"
+    ]
+
+
+def test_frame_manifest_duplicates(tmp_path: Path) -> None:
+    directory = tmp_path / "traj"
+    write_directory(directory, [1, 2, "02"])
+
+    manifest = FrameManifest.load(directory, str(tmp_path / "manifests"))
+    assert manifest.duplicates == {2: ["traj_02.pdb", "traj_2.pdb"]}
+    with pytest.raises(ValueError):
+        manifest.files()
+    with pytest.raises(ValueError):
+        ObjectLoader(str(directory), "test_manifest_duplicates")
+
+
+def test_object_loader_offset() -> None:
+    object_loader = ObjectLoader(
+        str(SAMPLE_DIRECTORY), "test_object_loader_offset", start=100, stride=2
+    )
+    assert object_loader.total_states == 50
+    object_loader.load_up_to_state(3)
+
+    assert cmd.count_states("test_object_loader_offset") == 3
+    for state, number in enumerate((101, 103, 105), 1):
+        np.testing.assert_allclose(
+            cmd.get_coordset("test_object_loader_offset", state),
+            parse_pdb_coordinates(SAMPLE_DIRECTORY / f"traj_{number}.pdb"),
+            atol=1e-3,
+        )
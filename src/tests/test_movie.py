@@ -1,6 +1,13 @@
 """Test moviemaker."""
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
 import pytest
+from pymol import cmd
 
+from pymol_movie.movie import render
+from pymol_movie.movie.checkpoint import RenderManifest
 from pymol_movie.movie.loaders import ObjectLoader
 from pymol_movie.movie.movie import MovieMaker
 
@@ -142,3 +149,264 @@ class TestMovieMaker:
 
     # def test_produce_movie(self, produce_dict):
     #    TestMovieMaker.movie_maker.produce_scene(produce_dict)
+
+
+def test_frame_fingerprint(tmp_path: Path) -> None:
+    movie_maker = MovieMaker()
+    cmd.fragment("ala", "test_frame_fingerprint")
+    scene_dict = {
+        "scene": "test_frame_fingerprint",
+        "frame": 1,
+        "objects": [{"name": "test_frame_fingerprint", "state": 1}],
+    }
+    movie_maker.setup_scene(scene_dict)
+    cmd.turn("y", 90)
+    movie_maker.setup_scene({**scene_dict, "scene": "turned", "frame": 10})
+    produce_dict = {"filename": str(tmp_path / "test"), "frames": 20}
+    movie_maker.produce_movie(produce_dict)
+    produce_dict.update({"width": 32, "height": 24, "mode": "normal"})
+
+    cmd.frame(15)
+    fingerprint = movie_maker.frame_fingerprint(15, produce_dict)
+    cmd.frame(5)
+    assert movie_maker.frame_fingerprint(5, produce_dict) != fingerprint
+    cmd.frame(15)
+    assert movie_maker.frame_fingerprint(15, produce_dict) == fingerprint
+    assert movie_maker.frame_fingerprint(15, {**produce_dict, "width": 64}) != (
+        fingerprint
+    )
+    cmd.delete("test_frame_fingerprint")
+
+
+@pytest.mark.usefixtures("empty_session")
+def test_frame_cache_output(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    # Writes the frames piped to the encoder to the movie file instead of encoding them
+    def pipe_command(filename: str, produce_dict: Dict[str, Any]) -> List[str]:
+        code = "import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, open(sys.argv[1], 'wb'))"
+        return [sys.executable, "-c", code, filename]
+
+    monkeypatch.setattr(render, "pipe_command", pipe_command)
+    movie_maker = MovieMaker()
+    cmd.fragment("trp", "test_frame_cache_output")
+    for state in range(2, 4):
+        cmd.create("test_frame_cache_output", "test_frame_cache_output", 1, state)
+        cmd.translate(
+            [2 * state, 0, 0], "test_frame_cache_output", state=state, camera=0
+        )
+    scene_dict = {
+        "scene": "test_frame_cache_output",
+        "frame": 1,
+        "objects": [{"name": "test_frame_cache_output", "state": 1}],
+    }
+    movie_maker.setup_scene(scene_dict)
+    cmd.turn("y", 90)
+    cmd.show_as("spheres")
+    movie_maker.setup_scene(
+        {
+            **scene_dict,
+            "scene": "turned",
+            "frame": 6,
+            "objects": [{"name": "test_frame_cache_output", "state": 3}],
+        }
+    )
+    produce_dict = {
+        "frames": 10,
+        "produce": "mpg",
+        "mode": "normal",
+        "width": 32,
+        "height": 24,
+        "framerate": 30,
+        "quality": 50,
+    }
+
+    # Frames 6 to 10 show the same view and states, so they are rendered once when cached
+    movie_maker.produce_movie({**produce_dict, "filename": str(tmp_path / "uncached")})
+    movie_maker.produce_movie(
+        {
+            **produce_dict,
+            "filename": str(tmp_path / "cached"),
+            "cache_dir": str(tmp_path / "cache"),
+        }
+    )
+    assert "4 frames reused, 6 frames rendered" in capsys.readouterr().out
+    movie = (tmp_path / "cached.mpg").read_bytes()
+    assert movie.count(b"\x89PNG") == 10
+    assert movie == (tmp_path / "uncached.mpg").read_bytes()
+
+
+def test_clean_produce_dict_camera_path(capsys: pytest.CaptureFixture) -> None:
+    produce_dict = {"filename": "test", "camera_path": "bezier"}
+    MovieMaker._clean_produce_dict(produce_dict)
+    assert produce_dict["camera_path"] == "pymol"
+    assert (
+        "setup: camera_path is not one of 4 possible strings: "
+        "('pymol', 'linear', 'ease', 'spline'). "
+        'The default camera path "pymol" will be used.\n'
+    ) in capsys.readouterr().out
+
+
+def test_config_hash() -> None:
+    movie_maker = MovieMaker()
+    produce_dict = {"filename": "test", "frames": 20, "workers": 2}
+    config_hash = movie_maker.config_hash(produce_dict)
+    assert movie_maker.config_hash({**produce_dict, "workers": 4}) == config_hash
+    assert movie_maker.config_hash({**produce_dict, "frames": 30}) != config_hash
+
+
+def test_reset() -> None:
+    movie_maker = MovieMaker()
+    cmd.fragment("ala", "test_reset")
+    movie_maker.store_baseline()
+    coords = cmd.get_coords("test_reset")
+    view = cmd.get_view()
+    movie_maker.setup_scene(
+        {
+            "scene": "test_reset",
+            "frame": 1,
+            "objects": [
+                {
+                    "name": "test_reset",
+                    "state": 1,
+                    "actions": [
+                        {"color": {"selection": "all", "color": "red"}},
+                        {"translate": {"selection": "all", "vector": [0, 10, 0]}},
+                        {"surface_sticks": {"selection": "all"}},
+                    ],
+                }
+            ],
+            "camera": [{"turn": {"axis": "y", "angle": 90}}],
+        }
+    )
+    movie_maker.produce_movie({"filename": "test_reset", "frames": 5, "produce": ""})
+    Path("test_reset.pse").unlink()
+    assert cmd.get_coords("test_reset").tolist() != coords.tolist()
+
+    movie_maker.reset()
+    assert cmd.get_coords("test_reset").tolist() == coords.tolist()
+    assert cmd.get_view() == view
+    assert "test_reset" not in cmd.get_scene_list()
+    assert cmd.get("transparency", "test_reset") == "0.00000"
+    colors = set()
+    cmd.iterate("test_reset and elem C", "colors.add(color)", space={"colors": colors})
+    assert cmd.get_color_index("red") not in colors
+    cmd.delete("test_reset")
+
+
+def test_reset_frame_cache(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    movie_maker = MovieMaker()
+    cmd.fragment("ala", "test_reset_frame_cache")
+    movie_maker.store_baseline()
+    monkeypatch.setattr(render, "encode_frames", lambda *_: None)
+
+    # Both jobs have the same scenes, but their object is translated differently
+    for job, vector in enumerate(([0, 10, 0], [10, 0, 0])):
+        cmd.translate(vector, "test_reset_frame_cache")
+        scene_dict = {
+            "scene": "test_reset_frame_cache",
+            "frame": 1,
+            "objects": [{"name": "test_reset_frame_cache", "state": 1}],
+        }
+        movie_maker.setup_scene(scene_dict)
+        cmd.turn("y", 90)
+        movie_maker.setup_scene({**scene_dict, "scene": "turned", "frame": 5})
+        capsys.readouterr()
+        movie_maker.produce_movie(
+            {
+                "filename": str(tmp_path / f"job{job}"),
+                "frames": 5,
+                "produce": "mpg",
+                "mode": "normal",
+                "width": 32,
+                "height": 24,
+                "resume": True,
+                "cache_dir": str(tmp_path / "cache"),
+            }
+        )
+        assert "0 frames reused, 5 frames rendered" in capsys.readouterr().out
+        movie_maker.reset()
+    cmd.delete("test_reset_frame_cache")
+
+
+@pytest.mark.usefixtures("empty_session")
+def test_resume_stopped_render(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    movie_maker = MovieMaker()
+    cmd.fragment("ala", "test_resume_stopped_render")
+    scene_dict = {
+        "scene": "test_resume_stopped_render",
+        "frame": 1,
+        "objects": [{"name": "test_resume_stopped_render", "state": 1}],
+    }
+    movie_maker.setup_scene(scene_dict)
+    cmd.turn("y", 90)
+    movie_maker.setup_scene({**scene_dict, "scene": "turned", "frame": 40})
+    produce_dict = {
+        "filename": str(tmp_path / "test"),
+        "frames": 40,
+        "produce": "mpg",
+        "mode": "normal",
+        "width": 32,
+        "height": 24,
+        "framerate": 30,
+        "quality": 50,
+        "workers": 2,
+        "resume": True,
+    }
+    directory = tmp_path / "test_frames"
+    encoded: List[str] = []
+    recorded: List[int] = []
+    mtimes: List[dict] = []
+
+    def encode_frames(directory: Path, filename: str, _: Any) -> None:
+        encoded.append(filename)
+        mtimes.append(
+            {
+                frame: render.frame_path(directory, frame).stat().st_mtime_ns
+                for frame in recorded
+            }
+        )
+
+    monkeypatch.setattr(render, "encode_frames", encode_frames)
+
+    # The render is stopped after the first frames are recorded
+    add = RenderManifest.add
+
+    def stop(manifest: RenderManifest, frame: int, data: bytes) -> None:
+        if not recorded:
+            # Frames are recorded while the other frames are still rendering
+            assert len(list(directory.glob("frame*.png"))) < 40
+        if len(recorded) == 10:
+            raise RuntimeError("stopped")
+        recorded.append(frame)
+        add(manifest, frame, data)
+
+    monkeypatch.setattr(RenderManifest, "add", stop)
+    with pytest.raises(RuntimeError):
+        movie_maker.produce_movie(dict(produce_dict))
+    assert not encoded
+    rendered_mtimes = {
+        frame: render.frame_path(directory, frame).stat().st_mtime_ns
+        for frame in recorded
+    }
+
+    rendered: List[int] = []
+
+    def record(manifest: RenderManifest, frame: int, data: Any) -> None:
+        rendered.append(frame)
+        add(manifest, frame, data)
+
+    monkeypatch.setattr(RenderManifest, "add", record)
+    capsys.readouterr()
+    movie_maker.produce_movie(dict(produce_dict))
+    assert "10 frames already rendered, 30 frames to render" in capsys.readouterr().out
+    assert sorted(rendered) == sorted(set(range(1, 41)) - set(recorded))
+    # Frames recorded before the render stopped are not rendered again
+    assert mtimes == [rendered_mtimes]
+    assert encoded == [f"{tmp_path}/test.mpg"]
+    assert not directory.exists()
+    cmd.delete("test_resume_stopped_render")
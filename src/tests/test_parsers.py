@@ -9,6 +9,12 @@ from pymol_movie.cli.parsers import parse_args, parse_yaml
 )
 def test_parse_args(filepath: str) -> None:
     assert parse_args([filepath]).yaml_filepath == filepath
+    assert parse_args([filepath]).profile is None
+
+
+def test_parse_args_profile() -> None:
+    assert parse_args(["movie.yaml", "--profile"]).profile == "profile.json"
+    assert parse_args(["movie.yaml", "--profile", "trace.json"]).profile == "trace.json"
 
 
 @pytest.mark.parametrize(
@@ -0,0 +1,82 @@
+"""Test Pipeline."""
+from pathlib import Path
+
+import numpy as np
+import pytest
+from pymol import cmd
+
+from pymol_movie.movie.loaders import ObjectLoader
+from pymol_movie.movie.pipeline import load_concurrently
+from pymol_movie.movie.readers import open_trajectory
+
+OBJECT_1 = "./tests/samples/object_trajs/example_object_1"
+OBJECT_2 = "./tests/samples/object_trajs/example_object_2"
+
+
+def test_load_concurrently() -> None:
+    serial_loader = ObjectLoader(OBJECT_1, "test_pipeline_serial_1")
+    serial_loader.load_up_to_state(8)
+    serial_loader = ObjectLoader(OBJECT_2, "test_pipeline_serial_2")
+    serial_loader.load_selected_states([3, 5, 9])
+    serial_reader = ObjectLoader(
+        None,
+        "test_pipeline_serial_reader",
+        reader=open_trajectory("./tests/samples/trajectories/multi_model.pdb"),
+    )
+    serial_reader.load_up_to_state(3)
+
+    loaders = [
+        ObjectLoader(OBJECT_1, "test_pipeline_1"),
+        ObjectLoader(OBJECT_2, "test_pipeline_2", atoms="name CA"),
+        ObjectLoader(
+            None,
+            "test_pipeline_reader",
+            reader=open_trajectory("./tests/samples/trajectories/multi_model.pdb"),
+        ),
+    ]
+    loads = load_concurrently(
+        [
+            (loaders[0], loaders[0].states_up_to(8)),
+            (loaders[1], loaders[1].selected_states([9, 3, 5])),
+            (loaders[2], loaders[2].states_up_to(3)),
+        ],
+        workers=2,
+    )
+
+    assert [(load.name, load.states) for load in loads] == [
+        ("test_pipeline_1", 8),
+        ("test_pipeline_2", 3),
+        ("test_pipeline_reader", 3),
+    ]
+    assert all(load.wall_s >= load.insert_s > 0 for load in loads)
+    assert [loader.loaded_states for loader in loaders] == [8, 9, 3]
+    for state in range(1, 9):
+        np.testing.assert_array_equal(
+            cmd.get_coordset("test_pipeline_1", state),
+            cmd.get_coordset("test_pipeline_serial_1", state),
+        )
+    for state in (3, 5, 9):
+        np.testing.assert_array_equal(
+            cmd.get_coordset("test_pipeline_2", state),
+            cmd.get_coords("test_pipeline_serial_2 and name CA", state),
+        )
+    for state in range(1, 4):
+        np.testing.assert_array_equal(
+            cmd.get_coordset("test_pipeline_reader", state),
+            cmd.get_coordset("test_pipeline_serial_reader", state),
+        )
+
+
+def test_load_concurrently_error(tmp_path: Path) -> None:
+    directory = tmp_path / "traj"
+    directory.mkdir()
+    pdb = (Path(OBJECT_1) / "traj_1.pdb").read_bytes()
+    (directory / "traj_1.pdb").write_bytes(pdb)
+    (directory / "traj_2.pdb").write_bytes(pdb.replace(b"ATOM  ", b"ATOM  x", 1))
+
+    loaders = [
+        ObjectLoader(str(directory), "test_pipeline_error"),
+        ObjectLoader(OBJECT_2, "test_pipeline_error_2"),
+    ]
+    with pytest.raises(ValueError):
+        load_concurrently([(loader, [1, 2]) for loader in loaders])
@@ -0,0 +1,56 @@
+"""Test planning."""
+import pytest
+
+from pymol_movie.movie.planning import (
+    interpolate_state,
+    plan_frame_states,
+    plan_states,
+    scene_keyframes,
+)
+
+SCENES = [
+    {"scene": 1, "frame": 1, "objects": [{"name": "luke", "state": 1}]},
+    {
+        "scene": 2,
+        "frame": 11,
+        "objects": [{"name": "luke", "state": 31}, {"name": "isaac", "state": 5}],
+    },
+    {"scene": 3, "frame": 16, "objects": [{"name": "luke", "state": 31}]},
+]
+
+
+def test_scene_keyframes() -> None:
+    assert scene_keyframes(SCENES) == {
+        "luke": [(1, 1), (11, 31), (16, 31)],
+        "isaac": [(11, 5)],
+    }
+
+
+@pytest.mark.parametrize(
+    ("frame", "expected_state"), [(0, 1), (1, 1), (6, 16), (11, 31), (20, 31)]
+)
+def test_interpolate_state(frame: int, expected_state: float) -> None:
+    assert interpolate_state([(1, 1), (11, 31), (16, 31)], frame) == expected_state
+
+
+def test_plan_frame_states() -> None:
+    frame_states = plan_frame_states(SCENES, 20)
+    assert frame_states["luke"] == list(range(1, 32, 3)) + [31] * 9
+    assert frame_states["isaac"] == [5] * 20
+
+
+def test_plan_frame_states_stride() -> None:
+    frame_states = plan_frame_states(SCENES, 16, stride=10)
+    assert frame_states["luke"] == [1, 1, 11, 11, 11, 21, 21, 21, 21, 31] + [31] * 6
+
+
+def test_plan_frame_states_states_per_frame() -> None:
+    frame_states = plan_frame_states(SCENES, 11, states_per_frame=0.5)
+    assert frame_states["luke"] == [1, 1, 7, 7, 13, 13, 19, 19, 25, 25, 31]
+
+
+def test_plan_states() -> None:
+    assert plan_states(SCENES, 20, stride=10) == {
+        "luke": [1, 11, 21, 31],
+        "isaac": [5],
+    }
@@ -0,0 +1,110 @@
+"""Test preview."""
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+from pymol import cmd
+
+from pymol_movie.movie import render
+from pymol_movie.movie.movie import MovieMaker
+from pymol_movie.movie.preview import (
+    encode_preview,
+    preview_produce_dict,
+    preview_settings,
+    refinement_passes,
+)
+
+
+def test_refinement_passes() -> None:
+    assert refinement_passes(4, 0.25, False) == [(4, 0.25)]
+    assert refinement_passes(4, 0.25, True) == [
+        (4, 0.25),
+        (1, 0.25),
+        (1, 0.5),
+        (1, 1.0),
+    ]
+    assert refinement_passes(1, 0.4, True) == [(1, 0.4), (1, 0.8), (1, 1.0)]
+
+
+def test_preview_produce_dict() -> None:
+    produce_dict = {"width": 1920, "height": 1080, "framerate": 30, "mode": "ray"}
+    assert preview_produce_dict(produce_dict, 4, 0.25) == {
+        "width": 480,
+        "height": 270,
+        "framerate": 8,
+        "mode": "fast",
+    }
+    # mpeg1video can't encode 8 fps, so frames are repeated to the next supported rate
+    command = render.pipe_command(
+        "test.mpg", {**produce_dict, "framerate": 8, "quality": 50}
+    )
+    assert command[command.index("-framerate") + 1] == "8"
+    assert command[command.index("-r") + 1] == "24"
+
+
+def test_encode_preview_failed(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # Writes part of the movie and fails like an encoder refusing its options
+    def pipe_command(filename: str, produce_dict: Dict[str, Any]) -> List[str]:
+        code = "import sys; open(sys.argv[1], 'wb').write(b'part'); sys.exit(234)"
+        return [sys.executable, "-c", code, filename]
+
+    monkeypatch.setattr(render, "pipe_command", pipe_command)
+    filename = tmp_path / "test_preview.mpg"
+    with pytest.raises(subprocess.CalledProcessError):
+        encode_preview(str(filename), {1: b"frame"}, {})
+    assert not filename.exists()
+    assert not (tmp_path / "test_preview.part.mpg").exists()
+
+
+def test_preview_settings() -> None:
+    surface_quality = cmd.get("surface_quality")
+    with preview_settings():
+        assert cmd.get("surface_quality") == "-1"
+    assert cmd.get("surface_quality") == surface_quality
+
+
+def test_produce_preview(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    # Writes the frames piped to the encoder to the movie file instead of encoding them
+    def pipe_command(filename: str, produce_dict: Dict[str, Any]) -> List[str]:
+        code = "import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, open(sys.argv[1], 'wb'))"
+        return [sys.executable, "-c", code, filename]
+
+    monkeypatch.setattr(render, "pipe_command", pipe_command)
+    cmd.fragment("ala", "test_produce_preview")
+    movie_maker = MovieMaker()
+    movie_maker.setup_scene(
+        {
+            "scene": "preview",
+            "frame": 1,
+            "objects": [{"name": "test_produce_preview", "state": 1}],
+        }
+    )
+    produce_dict = {
+        "filename": str(tmp_path / "test"),
+        "mode": "ray",
+        "width": 64,
+        "height": 48,
+        "framerate": 30,
+        "quality": 50,
+        "frames": 9,
+    }
+    filename = movie_maker.produce_preview(
+        produce_dict, stride=4, scale=0.5, refine=True
+    )
+    assert filename == str(tmp_path / "test_preview.mpg")
+    # The last pass renders all frames at full size
+    movie = Path(filename).read_bytes()
+    assert movie.count(b"\x89PNG") == 9
+    assert movie[16:24] == (64).to_bytes(4, "big") + (48).to_bytes(4, "big")
+    assert not (tmp_path / "test_preview.part.mpg").exists()
+    assert capsys.readouterr().out.splitlines()[-3:] == [
+        "preview: 3 frames at 50% written",
+        "preview: 9 frames at 50% written",
+        "preview: 9 frames at 100% written",
+    ]
+    cmd.delete("test_produce_preview")
+    cmd.mset()
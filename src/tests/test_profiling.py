@@ -0,0 +1,73 @@
+"""Test profiler."""
+import json
+import resource
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from pymol_movie.__main__ import main
+from pymol_movie.movie.profiling import Profiler, peak_rss_mb
+
+
+def test_profiler(tmp_path: Path) -> None:
+    profiler = Profiler()
+    with profiler.phase("produce"):
+        for _ in range(2):
+            with profiler.phase("color", "action", selection="all"):
+                sum(range(10000))
+
+    assert [event["name"] for event in profiler.events] == ["color", "color", "produce"]
+    assert profiler.events[0]["args"]["selection"] == "all"
+    assert profiler.summary()["action:color"]["count"] == 2
+    assert profiler.events[2]["dur"] >= profiler.events[0]["dur"]
+
+    profiler.write(tmp_path / "trace.json")
+    trace = json.loads((tmp_path / "trace.json").read_text())
+    assert trace["traceEvents"][2]["ph"] == "X"
+    assert trace["otherData"]["process_peak_rss_mb"] > 0
+
+
+def test_profiler_peak_growth() -> None:
+    profiler = Profiler()
+    with profiler.phase("allocate"):
+        # Fill more memory than the process used before
+        buffer = b"\x01" * (int(peak_rss_mb()) + 64) * 2**20
+    del buffer
+    with profiler.phase("idle"):
+        pass
+    profiler.record("concurrent", "load", 0.0, 1.0)
+
+    assert profiler.events[0]["args"]["peak_rss_growth_mb"] > 32
+    assert profiler.events[1]["args"]["peak_rss_growth_mb"] == 0
+    assert "peak_rss_growth_mb" not in profiler.events[2]["args"]
+
+
+def test_profiler_disabled() -> None:
+    profiler = Profiler(enabled=False)
+    with profiler.phase("produce"):
+        pass
+    assert not profiler.events
+
+
+def test_peak_rss_mb(monkeypatch: pytest.MonkeyPatch) -> None:
+    usage = SimpleNamespace(ru_maxrss=2**30)
+    monkeypatch.setattr(resource, "getrusage", lambda who: usage)
+    monkeypatch.setattr(sys, "platform", "darwin")
+    assert peak_rss_mb() == 1024
+    monkeypatch.setattr(sys, "platform", "linux")
+    assert peak_rss_mb() == 2**20
+
+
+def test_profile_failed_render(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    config = tmp_path / "movie.yaml"
+    config.write_text("setup: {}\n", encoding="utf-8")
+    trace = tmp_path / "trace.json"
+    monkeypatch.setattr(
+        sys, "argv", ["pymol_movie", str(config), "--profile", str(trace)]
+    )
+    with pytest.raises(SystemExit):
+        main()
+    events = json.loads(trace.read_text())["traceEvents"]
+    assert [event["name"] for event in events] == ["compile yaml"]
@@ -0,0 +1,75 @@
+"""Test trajectory readers."""
+import pickle
+
+import numpy as np
+import pytest
+
+from pymol_movie.movie.coordinates import parse_pdb_coordinates
+from pymol_movie.movie.readers import (
+    DCDReader,
+    MultiModelPDBReader,
+    XTCReader,
+    iter_frames,
+    open_trajectory,
+)
+
+TOPOLOGY = "./tests/samples/trajectories/topology.pdb"
+
+
+def expected_coordinates(state: int) -> np.ndarray:
+    return parse_pdb_coordinates(
+        f"./tests/samples/object_trajs/example_object_1/traj_{state}.pdb"
+    )[:300]
+
+
+@pytest.mark.parametrize(
+    ("trajectory", "reader_type", "frames", "tolerance"),
+    [
+        ("./tests/samples/trajectories/traj.dcd", DCDReader, 6, 1e-6),
+        ("./tests/samples/trajectories/traj.xtc", XTCReader, 6, 5e-3 + 1e-5),
+        ("./tests/samples/trajectories/multi_model.pdb", MultiModelPDBReader, 3, 0),
+    ],
+)
+def test_open_trajectory(
+    trajectory: str, reader_type: type, frames: int, tolerance: float
+) -> None:
+    reader = open_trajectory(trajectory, TOPOLOGY)
+    assert isinstance(reader, reader_type)
+    assert len(reader) == frames
+    assert reader.atoms() == 300
+    for index in range(frames):
+        np.testing.assert_allclose(
+            reader.read(index), expected_coordinates(index + 1), atol=tolerance
+        )
+
+
+def test_reader_stride_and_range() -> None:
+    reader = open_trajectory(
+        "./tests/samples/trajectories/traj.dcd", TOPOLOGY, start=1, stop=6, stride=2
+    )
+    assert list(reader.frames) == [1, 3, 5]
+    np.testing.assert_allclose(reader.read(1), expected_coordinates(4), atol=1e-6)
+
+
+def test_reader_pickle_and_workers() -> None:
+    reader = open_trajectory("./tests/samples/trajectories/traj.xtc", TOPOLOGY)
+    unpickled_reader = pickle.loads(pickle.dumps(reader))
+    np.testing.assert_array_equal(unpickled_reader.read(2), reader.read(2))
+    for index, coords in enumerate(iter_frames(reader, range(6), workers=2)):
+        np.testing.assert_array_equal(coords, reader.read(index))
+
+
+def test_multi_model_topology() -> None:
+    reader = open_trajectory("./tests/samples/trajectories/multi_model.pdb")
+    assert reader.read_topology().startswith(b"MODEL")
+    assert reader.read_topology().rstrip().endswith(b"ENDMDL")
+
+
+def test_reader_errors() -> None:
+    with pytest.raises(ValueError, match="No trajectory reader"):
+        open_trajectory("./tests/samples/trajectories/traj.trr", TOPOLOGY)
+    with pytest.raises(ValueError, match="atoms"):
+        open_trajectory(
+            "./tests/samples/trajectories/traj.dcd",
+            "./tests/samples/object_trajs/example_object_1/traj_1.pdb",
+        )
@@ -0,0 +1,127 @@
+"""Test rendering."""
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from pymol import cmd
+
+from pymol_movie.movie.cache import FrameCache
+from pymol_movie.movie.render import (
+    FrameEncoder,
+    frame_path,
+    pipe_command,
+    render_cached_frame,
+    render_frames,
+    render_session,
+    split_frames,
+)
+
+PRODUCE_DICT = {
+    "filename": "test",
+    "mode": "normal",
+    "width": 32,
+    "height": 24,
+    "framerate": 30,
+    "quality": 100,
+    "frames": 3,
+}
+
+
+def test_render_frames(tmp_path: Path) -> None:
+    cmd.fragment("ala", "test_render_frames")
+    cmd.mset("1x3")
+    rendered_frames = []
+    paths = render_frames(
+        tmp_path, [2, 3], PRODUCE_DICT, before_frame=rendered_frames.append
+    )
+    assert rendered_frames == [2, 3]
+    assert paths == [frame_path(tmp_path, 2), frame_path(tmp_path, 3)]
+    assert all(path.read_bytes().startswith(b"\x89PNG") for path in paths)
+    cmd.delete("test_render_frames")
+
+
+def test_render_cached_frame(tmp_path: Path) -> None:
+    cmd.fragment("ala", "test_render_cached_frame")
+    frame_cache = FrameCache(str(tmp_path))
+    frames = [
+        render_cached_frame(1, PRODUCE_DICT, frame_cache, lambda frame: "fingerprint")
+        for _ in range(2)
+    ]
+    assert frames[0] == frames[1]
+    assert (frame_cache.hits, frame_cache.misses) == (1, 1)
+    cmd.delete("test_render_cached_frame")
+
+
+def test_split_frames() -> None:
+    assert split_frames(range(1, 11), 3) == [range(1, 5), range(5, 8), range(8, 11)]
+    assert split_frames([1, 2], 4) == [[1], [2]]
+
+
+@pytest.mark.usefixtures("empty_session")
+def test_render_session(tmp_path: Path) -> None:
+    # The object moves between states and the scenes change its representation and the view
+    cmd.fragment("trp", "test_render_session")
+    for state in range(2, 4):
+        cmd.create("test_render_session", "test_render_session", 1, state)
+        cmd.translate([2 * state, 0, 0], "test_render_session", state=state, camera=0)
+    cmd.mset("1x9")
+    cmd.scene("test_render_session_1", "store")
+    cmd.mview("store", 1, scene="test_render_session_1")
+    cmd.mview("store", 1, object="test_render_session", state=1)
+    cmd.turn("y", 90)
+    cmd.show_as("spheres")
+    cmd.scene("test_render_session_2", "store")
+    cmd.mview("store", 5, scene="test_render_session_2")
+    cmd.mview("store", 9, scene="test_render_session_2")
+    cmd.mview("store", 9, object="test_render_session", state=3)
+    session = tmp_path / "session.pse"
+    cmd.save(str(session))
+    (tmp_path / "serial").mkdir()
+    (tmp_path / "parallel").mkdir()
+
+    produce_dict = {**PRODUCE_DICT, "frames": 9}
+    serial_paths = render_frames(tmp_path / "serial", range(1, 10), produce_dict)
+    parallel_paths = render_session(session, tmp_path / "parallel", produce_dict, 3)
+
+    assert parallel_paths == [
+        frame_path(tmp_path / "parallel", f) for f in range(1, 10)
+    ]
+    # Workers start their range from the frame the session was saved at
+    assert [path.read_bytes() for path in serial_paths] == [
+        path.read_bytes() for path in parallel_paths
+    ]
+    # A frame renders the same whatever frame was shown before it
+    assert render_frames(tmp_path, [4], produce_dict)[0].read_bytes() == (
+        serial_paths[3].read_bytes()
+    )
+
+
+def test_pipe_command() -> None:
+    command = pipe_command("test.mpg", PRODUCE_DICT)
+    assert command[command.index("-i") + 1] == "-"
+    assert command[command.index("-f") + 1] == "image2pipe"
+    assert command[-1] == "test.mpg"
+
+
+def test_frame_encoder(tmp_path: Path) -> None:
+    output = tmp_path / "output"
+    command = [
+        sys.executable,
+        "-c",
+        f"import sys, time; time.sleep(0.2); "
+        f"open({str(output)!r}, 'wb').write(sys.stdin.buffer.read())",
+    ]
+    frames = [bytes([frame]) * 1000 for frame in range(20)]
+    with FrameEncoder(command, max_frames=2) as encoder:
+        for frame in frames:
+            encoder.write(frame)
+            assert encoder._queue.qsize() <= 2
+    assert output.read_bytes() == b"".join(frames)
+
+
+def test_frame_encoder_error() -> None:
+    encoder = FrameEncoder([sys.executable, "-c", "import sys; sys.exit(1)"])
+    encoder.write(b"frame")
+    with pytest.raises(subprocess.CalledProcessError):
+        encoder.close()
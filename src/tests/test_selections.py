@@ -0,0 +1,66 @@
+"""Test selection cache."""
+from pymol import cmd
+
+from pymol_movie.movie.movie import MovieMaker
+from pymol_movie.movie.selections import SelectionCache, select, use_selection_cache
+
+
+def test_selection_cache() -> None:
+    cmd.fragment("ala", "test_selection_cache")
+    selection_cache = SelectionCache()
+
+    selection = selection_cache.get("test_selection_cache", "elem C")
+    assert selection_cache.get("test_selection_cache", "elem C") == selection
+    assert cmd.count_atoms(selection) == 3
+    assert selection in cmd.get_names("selections", enabled_only=0)
+
+    dynamic = selection_cache.get("test_selection_cache", "elem C within 2 of elem N")
+    assert dynamic == "test_selection_cache and elem C within 2 of elem N"
+    assert selection_cache.stats() == {"hits": 1, "misses": 2, "hit_rate": 1 / 3}
+
+    selection_cache.clear()
+    assert selection not in cmd.get_names("selections", enabled_only=0)
+    cmd.delete("test_selection_cache")
+
+
+def test_selection_cache_release() -> None:
+    cmd.fragment("ala", "test_selection_cache_release")
+    selection_cache = SelectionCache()
+    color = {"color": {"selection": "elem C", "color": "red"}}
+    scene_dicts = [
+        {"objects": [{"name": "test_selection_cache_release", "actions": [color]}]},
+        {"objects": [{"name": "test_selection_cache_release", "actions": [color]}]},
+        {"objects": [{"name": "test_selection_cache_release"}]},
+    ]
+    selection_cache.plan(scene_dicts)
+
+    with use_selection_cache(selection_cache):
+        selection = select("test_selection_cache_release", "elem C")
+    selection_cache.release(0)
+    assert selection in cmd.get_names("selections", enabled_only=0)
+    selection_cache.release(1)
+    assert selection not in cmd.get_names("selections", enabled_only=0)
+    assert select("test_selection_cache_release", "elem C") == (
+        "test_selection_cache_release and elem C"
+    )
+    cmd.delete("test_selection_cache_release")
+
+
+def test_movie_maker_selection_stats() -> None:
+    cmd.fragment("ala", "test_movie_maker_selection_stats")
+    movie_maker = MovieMaker()
+    scene_dict = {
+        "scene": "test_movie_maker_selection_stats",
+        "frame": 1,
+        "objects": [
+            {
+                "name": "test_movie_maker_selection_stats",
+                "state": 1,
+                "actions": [{"surface_sticks": {"selection": "elem C"}}],
+            }
+        ],
+    }
+    movie_maker.setup_scene(scene_dict)
+    assert movie_maker.stats()["selection_cache"]["hits"] == 2
+    assert movie_maker.stats()["selection_cache"]["misses"] == 1
+    cmd.delete("test_movie_maker_selection_stats")
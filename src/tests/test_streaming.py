@@ -0,0 +1,48 @@
+"""Test state window."""
+import numpy as np
+import pytest
+
+from pymol_movie.movie.streaming import StateWindow
+
+
+def read_state(state: int) -> np.ndarray:
+    return np.full((1000, 3), state, dtype=np.float32)
+
+
+@pytest.mark.parametrize("states", [50, 500])
+@pytest.mark.parametrize(("max_states", "max_mb"), [(3, None), (None, 0.05)])
+def test_state_window_peak_bytes(states: int, max_states: int, max_mb: float) -> None:
+    frame_states = [state for state in range(1, states + 1) for _ in range(2)]
+    window = StateWindow(read_state, frame_states, max_states, max_mb)
+    for state in frame_states:
+        assert window.get(state)[0, 0] == state
+    window.close()
+
+    state_bytes = read_state(1).nbytes
+    if max_states:
+        assert window.peak_bytes == max_states * state_bytes
+    else:
+        assert window.peak_bytes == 50000 // state_bytes * state_bytes
+
+
+def test_state_window_revisits_states() -> None:
+    window = StateWindow(read_state, [1, 2, 1, 1, 3], max_states=1)
+    assert [window.get(state)[0, 0] for state in [1, 2, 1, 1, 3]] == [1, 2, 1, 1, 3]
+    assert window.peak_bytes == read_state(1).nbytes
+    window.close()
+
+
+def test_state_window_errors() -> None:
+    window = StateWindow(read_state, [1, 2])
+    window.get(2)
+    with pytest.raises(KeyError):
+        window.get(1)
+    window.close()
+
+    def read_missing_state(state: int) -> np.ndarray:
+        raise FileNotFoundError(state)
+
+    window = StateWindow(read_missing_state, [1])
+    with pytest.raises(FileNotFoundError):
+        window.get(1)
+    window.close()
@@ -0,0 +1,141 @@
+"""Test tiles."""
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pytest
+from pymol import cmd
+
+from pymol_movie.movie import tiles
+from pymol_movie.movie.render import render_frame
+from pymol_movie.movie.tiles import (
+    Tile,
+    TileRenderer,
+    encode_png,
+    read_ppm,
+    split_tiles,
+    tile_view,
+)
+
+
+def render_ppm(path: Path, width: int, height: int) -> np.ndarray:
+    cmd.png(str(path), width=width, height=height, ray=1, quiet=1, format=1)
+    return read_ppm(path.read_bytes())
+
+
+def decode_png(data: bytes) -> np.ndarray:
+    # Only decodes the unfiltered rgb pngs written by `encode_png`
+    width = int.from_bytes(data[16:20], "big")
+    height = int.from_bytes(data[20:24], "big")
+    start = data.index(b"IDAT") + 4
+    rows = np.frombuffer(zlib.decompress(data[start:]), np.uint8).reshape(height, -1)
+    assert not rows[:, 0].any()
+    return rows[:, 1:].reshape(height, width, 3)
+
+
+def test_split_tiles() -> None:
+    assert split_tiles(10, 6, 4) == [
+        Tile(0, 0, 5, 3),
+        Tile(5, 0, 5, 3),
+        Tile(0, 3, 5, 3),
+        Tile(5, 3, 5, 3),
+    ]
+    assert len(split_tiles(11, 7, 6)) == 6
+    assert split_tiles(3, 1, 4) == [
+        Tile(0, 0, 1, 1),
+        Tile(1, 0, 1, 1),
+        Tile(2, 0, 1, 1),
+    ]
+
+    covered = np.zeros((37, 53), int)
+    for tile in split_tiles(53, 37, 7):
+        covered[
+            slice(tile.y, tile.y + tile.height), slice(tile.x, tile.x + tile.width)
+        ] += 1
+    assert (covered == 1).all()
+
+
+def test_tile_view() -> None:
+    view = [1, 0, 0, 0, 1, 0, 0, 0, 1, 0, 0, -50, 0, 0, 0, 40, 60, 20]
+    centered = tile_view(view, 100, 50, Tile(25, 0, 50, 50), margin=0)
+    assert centered[:17] == pytest.approx(view[:17])
+    assert centered[17] == pytest.approx(20)
+
+    corner = tile_view(view, 100, 50, Tile(0, 0, 50, 25), margin=0)
+    assert corner[9] > 0 > corner[10]
+    assert corner[17] < 20
+    with pytest.raises(ValueError):
+        tile_view([*view[:17], -20], 100, 50, Tile(0, 0, 50, 25))
+
+
+def test_encode_png() -> None:
+    image = np.random.default_rng(0).integers(0, 256, (5, 7, 3), np.uint8)
+    data = encode_png(image)
+    assert data.startswith(b"\x89PNG")
+    np.testing.assert_array_equal(decode_png(data), image)
+
+
+@pytest.mark.usefixtures("empty_session")
+@pytest.mark.parametrize("antialias", [0, 1])
+def test_render_tile(tmp_path: Path, antialias: int) -> None:
+    cmd.fragment("trp", "test_render_tile")
+    cmd.show("spheres", "elem C")
+    cmd.set("orthoscopic", 1)
+    cmd.set("antialias", antialias)
+    cmd.turn("x", 30)
+    view = cmd.get_view()
+    whole = render_ppm(tmp_path / "whole.ppm", 45, 31)
+
+    stitched = np.zeros_like(whole)
+    for tile in split_tiles(45, 31, 6):
+        stitched[
+            slice(tile.y, tile.y + tile.height), slice(tile.x, tile.x + tile.width)
+        ] = tiles.render_tile(view, 45, 31, tile)
+        cmd.set_view(view)
+
+    difference = np.abs(stitched.astype(int) - whole)
+    if antialias:
+        # Supersampled pixels can round differently in the last bit
+        assert difference.max() <= 1
+        assert (difference > 0).mean() < 0.01
+    else:
+        assert not difference.any()
+    cmd.set("orthoscopic", 0)
+    cmd.set("antialias", 1)
+    cmd.delete("test_render_tile")
+
+
+@pytest.mark.usefixtures("empty_session")
+def test_tile_renderer(tmp_path: Path, capsys: pytest.CaptureFixture) -> None:
+    cmd.fragment("trp", "test_tile_renderer")
+    cmd.set("orthoscopic", 1)
+    cmd.set("antialias", 0)
+    cmd.mset("1x2")
+    cmd.mview("store", 1)
+    cmd.turn("y", 90)
+    cmd.mview("store", 2)
+    session = tmp_path / "session.pse"
+    cmd.save(str(session))
+    produce_dict = {"width": 40, "height": 30, "mode": "tiled"}
+
+    with tiles.use_tile_renderer(TileRenderer(session, tiles=4, workers=2)):
+        for frame in (1, 2):
+            cmd.frame(frame)
+            stitched = decode_png(render_frame(produce_dict))
+            np.testing.assert_array_equal(
+                stitched, render_ppm(tmp_path / f"{frame}.ppm", 40, 30)
+            )
+    assert tiles.active_renderer() is None
+
+    # Perspective frames are ray traced whole
+    cmd.set("orthoscopic", 0)
+    with tiles.use_tile_renderer(TileRenderer(session, tiles=4, workers=1)):
+        assert render_frame(produce_dict) == cmd.png(
+            None, width=40, height=30, ray=1, quiet=1
+        )
+    assert (
+        "produce: perspective frames can not be split into tiles and are ray traced whole. "
+        "Set orthoscopic to render them as tiles.\n"
+    ) in capsys.readouterr().out
+    cmd.set("antialias", 1)
+    cmd.delete("test_tile_renderer")